@@ -1,11 +1,9 @@
-import cv2
 import numpy as np
-from ultralytics import YOLO
 import time
 import streamlit as st
-import pyttsx3
-import threading
-import sqlite3
+
+from emissions import class_counts, compute_emissions, emissions_dict
+from startup import get_auth_service, get_model_loader, get_speech_worker, load_model
 
 # --- Constants ---
 PLANT_SUGGESTIONS = {
@@ -14,7 +12,6 @@ PLANT_SUGGESTIONS = {
     "High": {"plants": "Areca Palm, Boston Fern, Rubber Plant", "reduction": 20},
     "Severe": {"plants": "Areca Palm, Boston Fern, Rubber Plant", "reduction": 30},
 }
-EMISSION_FACTORS = {"CO2": 120, "NOx": 0.6, "PM2.5": 0.005}
 PIXEL_TO_M2_FACTOR = 0.05
 
 
@@ -325,26 +322,17 @@ def generate_summary(idx, counts, unused, emis, plants):
     # Create a simple summary without external dependencies
     summary = f"Road {idx + 1}: {counts[idx]} vehicles detected, {unused[idx]:.1f}m² unused area, {plants[idx][1]} air quality. Plants recommended: {plants[idx][3][:50]}..."
 
-    def speak():
-        try:
-            engine = pyttsx3.init()
-            engine.say(summary)
-            engine.runAndWait()
-        except:
-            pass  # Skip if pyttsx3 has issues
-
-    threading.Thread(target=speak).start()
+    get_speech_worker().say(summary, key="summary")
     return summary
 
 
-def check_login():
+def check_login(started=None):
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
 
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS users(username TEXT, password TEXT)')
-    conn.commit()
+    auth = get_auth_service()
+    if st.session_state.logged_in and auth.session_user(st.session_state.get("auth_token")) is None:
+        st.session_state.logged_in = False  # session expired
 
     if not st.session_state.logged_in:
         load_css()
@@ -373,9 +361,10 @@ def check_login():
         with col2:
             if st.button("🚀 Login to Dashboard"):
                 if username and password:
-                    c.execute('SELECT * FROM users WHERE username = ? AND password = ?', (username, password))
-                    if c.fetchone():
+                    token = auth.login(username, password)
+                    if token:
                         st.session_state.logged_in = True
+                        st.session_state.auth_token = token
                         st.rerun()
                     else:
                         st.error("❌ Invalid credentials. Please try again.")
@@ -402,7 +391,8 @@ def check_login():
         </div>
         """, unsafe_allow_html=True)
 
-        conn.close()
+        if started is not None:
+            get_model_loader().record("login page", started)
         st.stop()
 
 
@@ -414,7 +404,9 @@ def main():
         initial_sidebar_state="collapsed"
     )
 
-    check_login()
+    started = time.perf_counter()
+    get_model_loader()
+    check_login(started)
 
     # Show success message and redirect
     st.markdown("""
@@ -453,11 +445,18 @@ def run_dashboard():
             st.rerun()
 
         if st.button("🚪 Logout"):
+            # End the server-side session too, not just this browser's flag
+            get_auth_service().logout(st.session_state.pop("auth_token", None))
             st.session_state.logged_in = False
             st.rerun()
 
-    model = YOLO('yolov8n.pt')
-    caps = [cv2.VideoCapture(f'Road_{i + 1}.mp4') for i in range(4)]
+    model = load_model()
+    # Imported here, after login: the background loader has been importing it since startup
+    import cv2
+    from supervisor import STALE_READING_SECONDS, CameraSource, no_signal_frame
+    # Supervised: a missing or broken feed reads as no frame and reconnects in the background
+    caps = [CameraSource(f'Road_{i + 1}.mp4', f"Road {i + 1}") for i in range(4)]
+    held = {}   # road -> its last good reading, shown while its feed is down
     signal_states = ['red'] * 4
     durations = [5] * 4
     current = 0
@@ -473,19 +472,28 @@ def run_dashboard():
         for i, cap in enumerate(caps):
             ret, frame = cap.read()
             if not ret:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                ret, frame = cap.read()
-            frame = cv2.resize(frame, (400, 225))
-            res = model(frame)
-            count = sum(int(r.cls) in [2, 3, 5, 7] for r in res[0].boxes)
-            for r in res[0].boxes:
-                if int(r.cls) in [2, 3, 5, 7]:
-                    x1, y1, x2, y2 = map(int, r.xyxy[0])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            emis = {k: count * v for k, v in EMISSION_FACTORS.items()}
-            unused = calculate_unused_area(frame, res)
-            prate, plevel, air, sug, red = get_pollution_info(count)
-            plant_val = (plevel, air, int(unused / 2), sug, red * int(unused / 2))
+                if i in held and time.time() - cap.last_frame_ts <= STALE_READING_SECONDS:
+                    frame, count, emis, unused, plant_val = held[i]
+                else:
+                    frame = no_signal_frame((400, 225), f"{cap.name}: {cap.state}")
+                    count, unused = 0, 0.0
+                    emis = emissions_dict(compute_emissions(class_counts([])))
+                    prate, plevel, air, sug, red = get_pollution_info(count)
+                    plant_val = (plevel, air, 0, sug, 0)
+            else:
+                frame = cv2.resize(frame, (400, 225))
+                res = model(frame)
+                counts_by_class = class_counts(res[0].boxes.cls.cpu().numpy())
+                count = int(counts_by_class.sum())
+                for r in res[0].boxes:
+                    if int(r.cls) in [2, 3, 5, 7]:
+                        x1, y1, x2, y2 = map(int, r.xyxy[0])
+                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                emis = emissions_dict(compute_emissions(counts_by_class))
+                unused = calculate_unused_area(frame, res)
+                prate, plevel, air, sug, red = get_pollution_info(count)
+                plant_val = (plevel, air, int(unused / 2), sug, red * int(unused / 2))
+                held[i] = (frame, count, emis, unused, plant_val)
             frames.append(frame)
             counts.append(count)
             emis_list.append(emis)
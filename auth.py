@@ -0,0 +1,237 @@
+import hashlib
+import hmac
+import logging
+import os
+import queue
+import secrets
+import sqlite3
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+USERS_DB = 'users.db'
+DEFAULT_KDF = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+SCRYPT_N = 2 ** 14            # work factor: ~16 MB and tens of ms per hash
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600000
+SALT_BYTES = 16
+POOL_SIZE = 4
+MAX_CONCURRENT_HASHES = os.cpu_count() or 2   # more logins than cores only queue up
+SESSION_TTL_SECONDS = 12 * 3600
+
+USERS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    created REAL
+)'''
+# Other passwords a legacy table held for the same username, until a login settles which one is meant
+LEGACY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS legacy_credentials (
+    username TEXT NOT NULL,
+    password_hash TEXT NOT NULL
+)'''
+
+
+def hash_password(password, kdf=DEFAULT_KDF, work=None):
+    """Salted KDF hash as a self-describing 'kdf$work$salt$digest' string"""
+    salt = secrets.token_bytes(SALT_BYTES)
+    if kdf == "scrypt":
+        work = work or SCRYPT_N
+        digest = hashlib.scrypt(password.encode('utf-8'), salt=salt, n=work, r=SCRYPT_R, p=SCRYPT_P,
+                                maxmem=256 * SCRYPT_R * work)
+    else:
+        work = work or PBKDF2_ITERATIONS
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, work)
+    return f"{kdf}${work}${salt.hex()}${digest.hex()}"
+
+
+def check_password(password, stored):
+    kdf, work, salt, digest = stored.split('$')
+    work, salt = int(work), bytes.fromhex(salt)
+    if kdf == "scrypt":
+        candidate = hashlib.scrypt(password.encode('utf-8'), salt=salt, n=work, r=SCRYPT_R, p=SCRYPT_P,
+                                   maxmem=256 * SCRYPT_R * work)
+    else:
+        candidate = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, work)
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+class AuthService:
+    """Users table access for the dashboards' login forms
+
+    One instance per process (st.cache_resource) holds a small pool of
+    SQLite connections, so reruns no longer connect and create the table.
+    Passwords are stored as KDF hashes; a legacy plaintext users table is
+    converted in place on first use (other passwords its duplicate rows
+    held stay valid until that user's next login), and hashes made with
+    an older work factor are upgraded at the next successful login. Verified logins get a
+    session token checked in memory, without touching SQLite.
+    """
+
+    def __init__(self, path=USERS_DB, kdf=DEFAULT_KDF, work=None, pool_size=POOL_SIZE):
+        self.path = path
+        self.kdf = kdf
+        self.work = work or (SCRYPT_N if kdf == "scrypt" else PBKDF2_ITERATIONS)
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._pool.put(conn)
+        self._hashing = threading.BoundedSemaphore(MAX_CONCURRENT_HASHES)
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        # A real hash to check unknown usernames against, so they take as long as wrong passwords
+        self._dummy_hash = hash_password(secrets.token_hex(8), kdf, self.work)
+        self._migrate()
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _hash(self, password):
+        with self._hashing:
+            return hash_password(password, self.kdf, self.work)
+
+    def _check(self, password, stored):
+        with self._hashing:
+            return check_password(password, stored)
+
+    def _migrate(self):
+        with self._connection() as conn:
+            conn.execute(LEGACY_SCHEMA)
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(users)')]
+            if "password_hash" in columns:
+                return
+            conn.execute(USERS_SCHEMA.replace('users', 'users_new', 1))
+            if columns:
+                # Legacy plaintext table: hash every password. A username can appear more than once there;
+                # the first row becomes its password and any other distinct passwords are kept aside
+                rows = conn.execute('SELECT username, password FROM users WHERE username IS NOT NULL '
+                                    'AND password IS NOT NULL ORDER BY rowid').fetchall()
+                passwords = {}
+                for username, password in rows:
+                    passwords.setdefault(username, [])
+                    if password not in passwords[username]:
+                        passwords[username].append(password)
+                now = time.time()
+                conn.executemany('INSERT INTO users_new(username, password_hash, created) VALUES(?, ?, ?)',
+                                 [(username, self._hash(kept[0]), now) for username, kept in passwords.items()])
+                others = [(username, self._hash(password))
+                          for username, kept in passwords.items() for password in kept[1:]]
+                conn.executemany('INSERT INTO legacy_credentials(username, password_hash) VALUES(?, ?)', others)
+                if len(rows) > len(passwords):
+                    logger.warning("Migrated %d legacy user rows into %d users; %d repeated rows dropped, "
+                                   "%d other passwords kept until their users next log in: %s",
+                                   len(rows), len(passwords), len(rows) - len(passwords) - len(others),
+                                   len(others), ", ".join(sorted({username for username, _ in others})) or "-")
+                conn.execute('DROP TABLE users')
+            conn.execute('ALTER TABLE users_new RENAME TO users')
+
+    def _check_legacy(self, username, password):
+        """Whether the password is one a legacy duplicate row held; the first login with one settles it"""
+        with self._connection() as conn:
+            hashes = [row[0] for row in conn.execute(
+                'SELECT password_hash FROM legacy_credentials WHERE username = ?', (username,))]
+        if not any(self._check(password, stored) for stored in hashes):
+            return False
+        with self._connection() as conn:
+            conn.execute('UPDATE users SET password_hash = ? WHERE username = ?', (self._hash(password), username))
+            conn.execute('DELETE FROM legacy_credentials WHERE username = ?', (username,))
+        logger.warning("User %s logged in with a password from a duplicate legacy row; it is now their password",
+                       username)
+        return True
+
+    def user_count(self):
+        with self._connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def add_user(self, username, password):
+        """Create a user; False if the username is taken"""
+        try:
+            with self._connection() as conn:
+                conn.execute('INSERT INTO users(username, password_hash, created) VALUES(?, ?, ?)',
+                             (username, self._hash(password), time.time()))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def verify(self, username, password):
+        with self._connection() as conn:
+            row = conn.execute('SELECT password_hash FROM users WHERE username = ?', (username,)).fetchone()
+        if row is None:
+            self._check(password, self._dummy_hash)
+            return False
+        if not self._check(password, row[0]):
+            return self._check_legacy(username, password)
+        kdf, work = row[0].split('$')[:2]
+        with self._connection() as conn:
+            if (kdf, int(work)) != (self.kdf, self.work):
+                conn.execute('UPDATE users SET password_hash = ? WHERE username = ?', (self._hash(password), username))
+            # Logging in with the first password settles any duplicates the migration kept
+            conn.execute('DELETE FROM legacy_credentials WHERE username = ?', (username,))
+        return True
+
+    def login(self, username, password):
+        """Session token for valid credentials, else None"""
+        if not self.verify(username, password):
+            return None
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._sessions_lock:
+            self._sessions = {t: s for t, s in self._sessions.items() if s[1] > now}
+            self._sessions[token] = (username, now + SESSION_TTL_SECONDS)
+        return token
+
+    def session_user(self, token):
+        """Username of a live session token, or None; never queries SQLite"""
+        with self._sessions_lock:
+            session = self._sessions.get(token)
+        if session is None or session[1] <= time.time():
+            return None
+        return session[0]
+
+    def logout(self, token):
+        with self._sessions_lock:
+            self._sessions.pop(token, None)
+
+
+def benchmark(kdf=DEFAULT_KDF, works=None, concurrency=(1, 4, 16), logins=32):
+    """Login hash latency (median and p95 ms) per work factor, with that many logins at once"""
+    works = works or ((2 ** 13, 2 ** 14, 2 ** 15) if kdf == "scrypt" else (200000, 600000, 1200000))
+    gate = threading.BoundedSemaphore(MAX_CONCURRENT_HASHES)
+    results = []
+    for work in works:
+        stored = hash_password("benchmark", kdf, work)
+
+        def one_login(_):
+            start = time.perf_counter()
+            with gate:
+                check_password("benchmark", stored)
+            return (time.perf_counter() - start) * 1000
+
+        for workers in concurrency:
+            with ThreadPoolExecutor(workers) as pool:
+                latencies = sorted(pool.map(one_login, range(max(logins, workers))))
+            results.append({"kdf": kdf, "work": work, "concurrent": workers,
+                            "median_ms": statistics.median(latencies),
+                            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))]})
+    return results
+
+
+if __name__ == "__main__":
+    for row in benchmark():
+        print(f"{row['kdf']} work={row['work']:>8} concurrent={row['concurrent']:>3}  "
+              f"median {row['median_ms']:7.1f} ms  p95 {row['p95_ms']:7.1f} ms")
@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from camera_config import DEFAULT_RESIZE, load_cameras
+from emissions import class_counts
+from inference import Detections
+from memory import rss_bytes
+from metrics import FrameTracer, LatencyHistogram, StageMetrics
+from pipeline import FRAME_SIZE, CameraPipeline, calculate_unused_area, draw_detections, filter_vehicles
+from startup import MODEL_WEIGHTS, ModelLoader
+from synthetic import parse_size, synthetic_cameras
+
+# --- Constants ---
+BENCHMARK_CLIPS = ("Road_1.mp4", "Road_2.mp4", "Road_4.mp4")
+BENCHMARK_FRAMES = 300
+LOAD_TICKS = 50               # each tick reads every camera once, as the dashboard loop does
+WARMUP_FRAMES = 10            # not timed: first inferences pay for lazy init
+MICRO_BOXES = 40
+MICRO_SEED = 0
+MICRO_REPEATS = 5
+RESULTS_FILE = 'benchmark_results.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+REGRESSION_TOLERANCE = 0.10
+VEHICLE_AND_OTHER_CLASSES = (0, 1, 2, 3, 5, 7, 9)
+
+
+def peak_rss_mb():
+    """Highest resident set size of this process so far: a whole-run figure, it never goes down"""
+    if resource is None:
+        rss = rss_bytes()
+        return rss / 2 ** 20 if rss is not None else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def benchmark_camera(clip):
+    """The clip's cameras.yaml entry (ROI, lanes, calibration), or a bare camera without one"""
+    for camera in load_cameras():
+        if camera["source"] == clip:
+            return camera
+    return {"name": clip, "source": clip, "resize": DEFAULT_RESIZE}
+
+
+def stage_summary(metrics):
+    """All-time p50/p99/mean per stage in milliseconds, over every camera"""
+    merged = {}
+    for (stage, _), histogram in sorted(metrics.histograms.items()):
+        merged.setdefault(stage, LatencyHistogram()).merge(histogram)
+    stages = {}
+    for stage, histogram in merged.items():
+        p50, p99 = histogram.quantiles((0.5, 0.99), all_time=True)
+        stages[stage] = {"p50_ms": round(p50 * 1000, 3), "p99_ms": round(p99 * 1000, 3),
+                         "mean_ms": round(histogram.sum / histogram.count() * 1000, 3)}
+    return stages
+
+
+def decode_fps(source, frames):
+    cap = cv2.VideoCapture(source)
+    decoded = 0
+    start = time.perf_counter()
+    while decoded < frames:
+        ret, _ = cap.read()
+        if not ret:
+            if not decoded:
+                break
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        decoded += 1
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return decoded / elapsed if decoded else 0.0
+
+
+def benchmark_clip(clip, model, frames=BENCHMARK_FRAMES, warmup=WARMUP_FRAMES):
+    """Decode, inference and end-to-end throughput plus per-stage latency for one clip"""
+    if not os.path.exists(clip):
+        raise FileNotFoundError(clip)
+    pipeline = CameraPipeline(benchmark_camera(clip), model, clip)
+    for _ in range(warmup):
+        pipeline.step(time.time())
+    pipeline.metrics, pipeline.tracer = StageMetrics(), FrameTracer()
+    rss_before = rss_bytes()
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        pipeline.step(time.time())
+    elapsed = time.perf_counter() - start
+
+    stages = stage_summary(pipeline.metrics)
+    inference = pipeline.metrics.histograms.get(("inference", clip))
+    rss_after = rss_bytes()
+    pipeline.cap.release()
+    return {
+        "frames": frames,
+        "decode_fps": round(decode_fps(clip, frames), 2),
+        "inference_fps": round(inference.count() / inference.sum, 2) if inference and inference.sum else None,
+        "end_to_end_fps": round(frames / elapsed, 2),
+        "stages": stages,
+        "rss_growth_mb": round((rss_after - rss_before) / 2 ** 20, 2) if None not in (rss_before, rss_after) else None,
+    }
+
+
+def benchmark_load(cameras, model, ticks=LOAD_TICKS, warmup=WARMUP_FRAMES):
+    """Aggregate throughput with every camera processed once per tick, one after another"""
+    pipelines = [CameraPipeline(camera, model, i + 1) for i, camera in enumerate(cameras)]
+    for _ in range(warmup):
+        for pipeline in pipelines:
+            pipeline.step(time.time())
+    metrics, tracer = StageMetrics(), FrameTracer()
+    for pipeline in pipelines:
+        pipeline.metrics, pipeline.tracer = metrics, tracer
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tick_start = time.perf_counter()
+        for pipeline in pipelines:
+            pipeline.step(time.time())
+        metrics.record("tick", time.perf_counter() - tick_start)
+    elapsed = time.perf_counter() - start
+    for pipeline in pipelines:
+        pipeline.cap.release()
+    return {
+        "cameras": len(cameras),
+        "ticks": ticks,
+        "camera_fps": round(len(cameras) * ticks / elapsed, 2),
+        "tick_fps": round(ticks / elapsed, 2),
+        "stages": stage_summary(metrics),
+    }
+
+
+def microbenchmarks(seed=MICRO_SEED, boxes=MICRO_BOXES, repeats=MICRO_REPEATS):
+    """Best-of-repeats time per call, in microseconds, on a fixed random scene"""
+    from recent import get_pollution_info, traffic_light_html
+
+    rng = np.random.default_rng(seed)
+    w, h = FRAME_SIZE
+    frame = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    corners = rng.uniform((0, 0), (w - 10, h - 10), (boxes, 2))
+    sizes = rng.uniform(10, 80, (boxes, 2))
+    xyxy = np.hstack([corners, np.minimum(corners + sizes, (w, h))])
+    det = Detections(xyxy, rng.choice(VEHICLE_AND_OTHER_CLASSES, boxes), rng.uniform(0.25, 1.0, boxes))
+
+    def box_postprocess():
+        vehicles = filter_vehicles(det)
+        class_counts(vehicles.cls)
+        draw_detections(frame, vehicles)
+
+    cases = {
+        "calculate_unused_area": lambda: calculate_unused_area(frame, xyxy),
+        "get_pollution_info": lambda: get_pollution_info(7),
+        "traffic_light_html": lambda: traffic_light_html("green", 12),
+        "box_postprocess": box_postprocess,
+    }
+    results = {}
+    for name, case in cases.items():
+        timer = timeit.Timer(case)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeats, number)) / number
+        results[name] = {"us_per_call": round(best * 1e6, 3), "calls": number}
+    return results
+
+
+def run(clips=BENCHMARK_CLIPS, frames=BENCHMARK_FRAMES, weights=MODEL_WEIGHTS, micro_only=False,
+        synthetic=(), synthetic_kind="scene", synthetic_size=None, ticks=LOAD_TICKS):
+    """Clip runs, or synthetic load tests at each camera count when any are given, then microbenchmarks
+
+    Peak RSS is reported once for the whole run: the OS only keeps the
+    process's high-water mark, so a per-clip figure would include every
+    clip before it. Per-clip memory is the RSS growth over the timed frames.
+    """
+    clips = [] if synthetic or micro_only else list(clips)
+    results = {
+        "settings": {"clips": clips, "frames": frames, "warmup": WARMUP_FRAMES, "weights": weights,
+                     "frame_size": list(FRAME_SIZE), "tiled": False, "micro_seed": MICRO_SEED,
+                     "micro_boxes": MICRO_BOXES, "synthetic": list(synthetic), "synthetic_kind": synthetic_kind,
+                     "synthetic_size": list(synthetic_size) if synthetic_size else None, "ticks": ticks,
+                     # What each clip ran with (ROI, lanes, calibration, resize), so a config edit shows up
+                     "cameras": {clip: benchmark_camera(clip) for clip in clips}},
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "processor": platform.processor(), "cpus": os.cpu_count(),
+                        "opencv": cv2.__version__, "numpy": np.__version__},
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "clips": {},
+        "load": {},
+    }
+    if not micro_only:
+        model = ModelLoader(weights).model()
+        for n in synthetic:
+            cameras = synthetic_cameras(n, synthetic_kind, synthetic_size)
+            results["load"][f"{n} cameras"] = benchmark_load(cameras, model, ticks)
+        for clip in clips:
+            results["clips"][clip] = benchmark_clip(clip, model, frames)
+    results["micro"] = microbenchmarks()
+    results["memory"] = {"peak_rss_mb": round(peak_rss_mb(), 1)}
+    return results
+
+
+def flatten(results):
+    """Comparable numbers as {'clips.Road_1.mp4.end_to_end_fps': value}"""
+    flat = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                walk(f"{prefix}.{key}", item)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and not prefix.endswith((".frames", ".calls", ".cameras", ".ticks", ".rss_growth_mb")):
+            flat[prefix] = value
+
+    for section in ("clips", "load", "micro", "memory"):
+        walk(section, results.get(section, {}))
+    return flat
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Rows of (metric, baseline, current, relative change, regressed) for metrics in both runs
+
+    fps is better higher, everything else (milliseconds, microseconds,
+    megabytes) better lower; a change beyond the tolerance the wrong way is
+    a regression.
+    """
+    old, new = flatten(baseline), flatten(results)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        if not old[key]:
+            continue
+        change = new[key] / old[key] - 1
+        regressed = change < -tolerance if key.endswith("_fps") else change > tolerance
+        rows.append((key, old[key], new[key], change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the traffic pipeline on the bundled clips.")
+    parser.add_argument("--clips", nargs="+", default=list(BENCHMARK_CLIPS))
+    parser.add_argument("--frames", type=int, default=BENCHMARK_FRAMES)
+    parser.add_argument("--weights", default=MODEL_WEIGHTS)
+    parser.add_argument("--micro-only", action="store_true", help="skip the clips, only run microbenchmarks")
+    parser.add_argument("--synthetic", type=int, nargs="+", default=[], metavar="N",
+                        help="load-test N synthetic cameras (e.g. 16 64 256) instead of the clips")
+    parser.add_argument("--synthetic-kind", choices=("scene", "remix"), default="scene")
+    parser.add_argument("--size", type=parse_size, help="synthetic source resolution, e.g. 1280x720")
+    parser.add_argument("--ticks", type=int, default=LOAD_TICKS)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="also write these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run(args.clips, args.frames, args.weights, args.micro_only,
+                  args.synthetic, args.synthetic_kind, args.size, args.ticks)
+    with open(args.output, "w", encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for clip, clip_results in results["clips"].items():
+        print(f"{clip}: decode {clip_results['decode_fps']} fps, inference {clip_results['inference_fps']} fps, "
+              f"end-to-end {clip_results['end_to_end_fps']} fps, RSS growth {clip_results['rss_growth_mb']} MB")
+        for stage, row in clip_results["stages"].items():
+            print(f"    {stage:<12} p50 {row['p50_ms']:8.2f} ms  p99 {row['p99_ms']:8.2f} ms")
+    for name, load in results["load"].items():
+        print(f"{name}: {load['camera_fps']} camera frames/s, {load['tick_fps']} ticks/s, "
+              f"tick p99 {load['stages']['tick']['p99_ms']:.1f} ms")
+    for name, row in results["micro"].items():
+        print(f"{name:<24} {row['us_per_call']:10.2f} µs/call")
+    print(f"Peak RSS over the whole run: {results['memory']['peak_rss_mb']} MB")
+
+    regressions = 0
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != results["settings"]:
+            print("Warning: baseline was recorded with different settings")
+        print(f"\nAgainst {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for key, old, new, change, regressed in compare(results, baseline, args.tolerance):
+            regressions += regressed
+            print(f"{'REGRESSION ' if regressed else '           '}{key:<50} {old:>10} -> {new:>10} ({change:+.1%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+
+
+class CameraCalibration:
+    """Image-to-ground-plane homography for one camera, computed once"""
+
+    def __init__(self, image_points, ground_points, frame_size):
+        self.image_points = np.asarray(image_points, dtype=np.float64)
+        self.ground_points = np.asarray(ground_points, dtype=np.float64)
+        self.frame_size = tuple(frame_size)
+        if len(self.image_points) == 4:
+            self.homography = cv2.getPerspectiveTransform(self.image_points.astype(np.float32),
+                                                          self.ground_points.astype(np.float32))
+        else:
+            self.homography, _ = cv2.findHomography(self.image_points, self.ground_points)
+
+    @classmethod
+    def from_config(cls, camera):
+        calib = camera.get("calibration")
+        if not calib:
+            return None
+        return cls(calib["image_points"], calib["ground_points"], camera["resize"])
+
+    def for_size(self, frame_size):
+        """Same calibration for frames resized to (width, height)"""
+        frame_size = tuple(frame_size)
+        if frame_size == self.frame_size:
+            return self
+        scale = np.array(frame_size, dtype=np.float64) / self.frame_size
+        return CameraCalibration(self.image_points * scale, self.ground_points, frame_size)
+
+    def to_ground(self, points):
+        """Project an (N, 2) array of pixel positions to ground metres in one batch"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        projected = points @ self.homography[:, :2].T + self.homography[:, 2]
+        return projected[:, :2] / projected[:, 2:3]
@@ -0,0 +1,178 @@
+import logging
+import os
+import time
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+CAMERA_CONFIG = 'cameras.yaml'
+DEFAULT_RESIZE = [400, 225]
+DEFAULT_JUNCTION = "Junction Alpha"
+MIN_GREEN_SECONDS = 5
+CONFIG_POLL_SECONDS = 2.0
+
+
+def default_cameras(n=4):
+    return [{"id": i + 1, "name": f"Road {i + 1}", "source": f"Road_{i + 1}.mp4", "resize": DEFAULT_RESIZE}
+            for i in range(n)]
+
+
+def _read(path):
+    with open(path, "r", encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def _points(value, minimum):
+    return (isinstance(value, list) and len(value) >= minimum
+            and all(isinstance(point, (list, tuple)) and len(point) == 2
+                    and all(isinstance(v, (int, float)) for v in point) for point in value))
+
+
+def _check_camera(camera, position):
+    """Raise ValueError naming the first required key or type a camera entry gets wrong"""
+    label = f"camera {position}"
+    if not isinstance(camera, dict):
+        raise ValueError(f"{label}: expected a mapping, got {type(camera).__name__}")
+    for key, types in (("name", str), ("source", (str, int))):
+        if key not in camera:
+            raise ValueError(f"{label}: missing {key!r}")
+        if not isinstance(camera[key], types) or isinstance(camera[key], bool):
+            raise ValueError(f"{label}: {key!r} must be a {'string' if key == 'name' else 'string or index'}")
+    label = f"camera {camera['name']!r}"
+    # History keys rows by road INTEGER, so ids are whole numbers
+    if "id" in camera and (not isinstance(camera["id"], int) or isinstance(camera["id"], bool)):
+        raise ValueError(f"{label}: 'id' must be an integer")
+    resize = camera.get("resize", DEFAULT_RESIZE)
+    if not (isinstance(resize, list) and len(resize) == 2
+            and all(isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in resize)):
+        raise ValueError(f"{label}: 'resize' must be [width, height] in whole pixels")
+    for key in ("roi", "location"):
+        value = camera.get(key)
+        if value is not None and not (_points(value, 3) if key == "roi" else _points([value], 1)):
+            raise ValueError(f"{label}: bad {key!r} {value!r}")
+    classes = camera.get("classes")
+    if classes is not None and not (isinstance(classes, list) and all(isinstance(c, int) for c in classes)):
+        raise ValueError(f"{label}: 'classes' must be a list of class ids")
+    for key in ("lanes", "far_field"):
+        if camera.get(key) is not None and not isinstance(camera[key], list):
+            raise ValueError(f"{label}: {key!r} must be a list")
+
+
+def _cameras(data):
+    """Validated cameras with ids; ValueError on a bad entry or a repeated id"""
+    if not isinstance(data, dict):
+        raise ValueError("expected a mapping with a 'cameras' list")
+    entries = data.get("cameras") or []
+    if not isinstance(entries, list):
+        raise ValueError("'cameras' must be a list")
+    for position, camera in enumerate(entries, 1):
+        _check_camera(camera, position)
+    taken = set()
+    for camera in entries:
+        if "id" in camera:
+            if camera["id"] in taken:
+                raise ValueError(f"camera {camera['name']!r}: id {camera['id']!r} is already used")
+            taken.add(camera["id"])
+    # Cameras without an id take their position in the file, or the next id nobody has set explicitly
+    cameras = []
+    for position, camera in enumerate(entries, 1):
+        camera_id = camera.get("id")
+        if camera_id is None:
+            camera_id = position
+            while camera_id in taken:
+                camera_id += 1
+            taken.add(camera_id)
+        cameras.append({"resize": DEFAULT_RESIZE, "calibration": None, **camera, "id": camera_id})
+    return cameras
+
+
+def load_cameras(path=CAMERA_CONFIG):
+    """Load per-camera settings, falling back to the bundled Road_N.mp4 clips"""
+    try:
+        return _cameras(_read(path))
+    except FileNotFoundError:
+        return default_cameras()
+
+
+def junctions_for(data, cameras):
+    """Junctions with their approaches as camera ids in phase order; one junction of every camera by default"""
+    by_name = {camera["name"]: camera["id"] for camera in cameras}
+    ids = {camera["id"] for camera in cameras}
+    junctions = []
+    entries = data.get("junctions") or []
+    if not isinstance(entries, list) or not all(isinstance(junction, dict) for junction in entries):
+        raise ValueError("'junctions' must be a list of mappings")
+    for i, junction in enumerate(entries):
+        approaches = []
+        if not isinstance(junction.get("approaches", []), list):
+            raise ValueError(f"junction {junction.get('name', i + 1)!r}: 'approaches' must be a list")
+        for approach in junction.get("approaches", []):
+            camera_id = by_name.get(approach, approach if approach in ids else None)
+            if camera_id is None:
+                logger.warning("Junction %s: unknown approach %r", junction.get("name", i + 1), approach)
+            elif camera_id in approaches:
+                logger.warning("Junction %s: approach %r listed twice", junction.get("name", i + 1), approach)
+            else:
+                approaches.append(camera_id)
+        min_green = junction.get("min_green", MIN_GREEN_SECONDS)
+        if not isinstance(min_green, (int, float)) or min_green <= 0:
+            raise ValueError(f"junction {junction.get('name', i + 1)!r}: 'min_green' must be a positive number")
+        junctions.append({"name": junction.get("name", f"Junction {i + 1}"), "approaches": approaches,
+                          "min_green": min_green})
+    placed = {camera_id for junction in junctions for camera_id in junction["approaches"]}
+    unplaced = [camera["id"] for camera in cameras if camera["id"] not in placed]
+    if unplaced:
+        name = DEFAULT_JUNCTION if not junctions else "Unassigned cameras"
+        junctions.append({"name": name, "approaches": unplaced, "min_green": MIN_GREEN_SECONDS})
+    return junctions
+
+
+def load_config(path=CAMERA_CONFIG):
+    """Cameras and junctions, falling back to the bundled clips as one four-way junction
+
+    Raises ValueError when a camera lacks a name or source, has a malformed
+    resize/roi/location, or repeats another camera's id.
+    """
+    try:
+        data = _read(path)
+    except FileNotFoundError:
+        data = {"cameras": default_cameras()}
+    cameras = _cameras(data)
+    return cameras, junctions_for(data, cameras)
+
+
+class ConfigWatcher:
+    """Reloads the camera config when the file changes, so cameras come and go without a restart"""
+
+    def __init__(self, path=CAMERA_CONFIG, poll_seconds=CONFIG_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.mtime = None
+        self._last_poll = 0.0
+
+    def poll(self):
+        """(cameras, junctions) on the first call and after each change to the file, else None"""
+        now = time.monotonic()
+        if self.mtime is not None and now - self._last_poll < self.poll_seconds:
+            return None
+        self._last_poll = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = 0.0
+        if mtime == self.mtime:
+            return None
+        try:
+            config = load_config(self.path)
+        except Exception as exc:
+            # A half-saved or broken edit keeps the running config, whatever is wrong with it
+            logger.warning("Ignoring %s: %s", self.path, exc)
+            if self.mtime is not None:
+                self.mtime = mtime
+                return None
+            cameras = default_cameras()
+            config = cameras, junctions_for({}, cameras)
+        self.mtime = mtime
+        return config
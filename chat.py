@@ -1,12 +1,14 @@
-import cv2
 import numpy as np
-from ultralytics import YOLO
 import time
 import streamlit as st
-import pyttsx3
-import threading
-import sqlite3
 import os
+from datetime import date, datetime, time as dt_time, timedelta
+
+from camera_config import load_cameras
+from emissions import compute_emissions, emissions_dict
+from history import HistoryStore
+from exporter import EXPORT_FORMATS, EXPORT_DATASETS, stream_export, export_to_tempfile
+from startup import get_auth_service as shared_auth_service, get_model_loader, get_speech_worker, load_model
 
 # --- Constants ---
 PLANT_SUGGESTIONS = {
@@ -15,7 +17,6 @@ PLANT_SUGGESTIONS = {
     "High": {"plants": "Areca Palm, Boston Fern, Rubber Plant", "reduction": 20},
     "Severe": {"plants": "Areca Palm, Boston Fern, Rubber Plant", "reduction": 30},
 }
-EMISSION_FACTORS = {"CO2": 120, "NOx": 0.6, "PM2.5": 0.005}
 PIXEL_TO_M2_FACTOR = 0.05
 
 
@@ -742,34 +743,29 @@ def generate_summary(idx, counts, unused, emis, plants):
 
     summary = f"Road {idx + 1}: {counts[idx]} vehicles detected with {plants[idx][1]} air quality. {unused[idx]:.1f}m² space available. Recommended plants: {plants[idx][3][:50]}... Expected {plants[idx][4]}% pollution reduction."
 
-    def speak():
-        try:
-            engine = pyttsx3.init()
-            engine.say(summary)
-            engine.runAndWait()
-        except:
-            pass
-
-    threading.Thread(target=speak).start()
+    get_speech_worker().say(summary, key="summary")
     return summary
 
 
-def check_login():
+@st.cache_resource
+def get_auth_service():
+    # The process-wide service, with a default admin while there are no users
+    auth = shared_auth_service()
+
+    # Create default admin user if no users exist
+    if auth.user_count() == 0:
+        auth.add_user("admin", "admin123")
+    return auth
+
+
+def check_login(started=None):
     """Enhanced login system with professional business styling"""
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
 
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS users(username TEXT, password TEXT)')
-
-    # Create default admin user if no users exist
-    c.execute('SELECT COUNT(*) FROM users')
-    if c.fetchone()[0] == 0:
-        c.execute('INSERT INTO users(username, password) VALUES(?, ?)', ("admin", "admin123"))
-        conn.commit()
-
-    conn.commit()
+    auth = get_auth_service()
+    if st.session_state.logged_in and auth.session_user(st.session_state.get("auth_token")) is None:
+        st.session_state.logged_in = False  # session expired
 
     if not st.session_state.logged_in:
         load_css()
@@ -811,9 +807,10 @@ def check_login():
         with col2:
             if st.button("🚀 Access Control Center"):
                 if username and password:
-                    c.execute('SELECT * FROM users WHERE username = ? AND password = ?', (username, password))
-                    if c.fetchone():
+                    token = auth.login(username, password)
+                    if token:
                         st.session_state.logged_in = True
+                        st.session_state.auth_token = token
                         st.success("✅ Access Granted! Redirecting to Control Center...")
                         st.rerun()
                     else:
@@ -862,16 +859,62 @@ def check_login():
                 </div>
                 """, unsafe_allow_html=True)
 
-        conn.close()
+        if started is not None:
+            get_model_loader().record("login page", started)
         return False
 
-    conn.close()
     return True
 
 
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+
+def export_panel():
+    """Filterable, streamed export of recorded traffic history"""
+    st.markdown("### 📊 Export Analysis Report")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        dataset = st.selectbox("Dataset:", list(EXPORT_DATASETS), key="export_dataset")
+    with col2:
+        fmt = st.selectbox("Format:", list(EXPORT_FORMATS), key="export_format")
+    with col3:
+        # History rows are keyed by the camera ids in cameras.yaml
+        names = {camera["id"]: camera["name"] for camera in load_cameras()}
+        roads = st.multiselect("Roads:", list(names), default=list(names),
+                               format_func=lambda r: names.get(r, f"Camera {r}"), key="export_roads")
+
+    today = date.today()
+    period = st.date_input("Time Range:", (today - timedelta(days=30), today), key="export_period")
+    if len(period) != 2:
+        st.info("💡 Select both a start and an end date")
+        return
+    if not roads:
+        # An empty road filter would otherwise mean every road
+        st.warning("⚠️ Select at least one road to export")
+        return
+    start = datetime.combine(period[0], dt_time.min).timestamp()
+    end = datetime.combine(period[1] + timedelta(days=1), dt_time.min).timestamp()
+
+    if st.button("⚙️ Prepare Export", key="export_prepare"):
+        chunks = stream_export(get_history_store(), dataset, fmt, start=start, end=end, roads=roads)
+        st.session_state.export_file = export_to_tempfile(chunks, fmt)
+        st.session_state.export_name = f"{EXPORT_DATASETS[dataset]}_{period[0]}_{period[1]}.{EXPORT_FORMATS[fmt]['ext']}"
+        st.session_state.export_mime = EXPORT_FORMATS[fmt]['mime']
+
+    if st.session_state.get('export_file') is not None:
+        st.download_button("⬇️ Download Report", data=st.session_state.export_file,
+                           file_name=st.session_state.export_name,
+                           mime=st.session_state.export_mime, key="export_download")
+
+
 # --- Main Application ---
 def main():
-    if not check_login():
+    started = time.perf_counter()
+    get_model_loader()
+    if not check_login(started):
         return
 
     load_css()
@@ -904,14 +947,12 @@ def main():
     col1, col2, col3 = st.columns([1, 2, 1])
     with col3:
         if st.button("🚪 Logout"):
+            # End the server-side session too, not just this browser's flag
+            get_auth_service().logout(st.session_state.pop("auth_token", None))
             st.session_state.logged_in = False
             st.rerun()
 
-    # Load YOLO model
-    @st.cache_resource
-    def load_model():
-        return YOLO('yolov8n.pt')
-
+    # YOLO model, loaded in the background since startup
     model = load_model()
 
     # Camera selection
@@ -956,6 +997,8 @@ def main():
 
         # Simulate camera feed analysis
         try:
+            # Imported here, after login: the background loader has been importing it since startup
+            import cv2
             cap = cv2.VideoCapture(0)  # Use default camera
 
             # Create placeholders for dynamic content
@@ -968,19 +1011,18 @@ def main():
             emissions_data = []
             plant_suggestions = []
 
+            # Simulate per-class vehicle detection (cars, motorcycles, buses, trucks) for all 4 roads
+            road_class_counts = np.random.randint(0, [8, 4, 2, 2], size=(4, 4))
+            road_emissions = compute_emissions(road_class_counts)
+
             # Simulate multiple road analysis
             for i in range(4):
-                # Simulate vehicle detection
-                vehicle_counts[i] = np.random.randint(0, 15)
+                vehicle_counts[i] = int(road_class_counts[i].sum())
                 unused_areas[i] = np.random.uniform(10.0, 100.0)
 
                 # Calculate emissions and plant suggestions
                 density, level, air_quality, plants, reduction = get_pollution_info(vehicle_counts[i])
-                emissions_data.append({
-                    'CO2': vehicle_counts[i] * EMISSION_FACTORS['CO2'],
-                    'NOx': vehicle_counts[i] * EMISSION_FACTORS['NOx'],
-                    'PM2.5': vehicle_counts[i] * EMISSION_FACTORS['PM2.5']
-                })
+                emissions_data.append(emissions_dict(road_emissions[i]))
                 plant_suggestions.append((density, level, air_quality, plants, reduction))
 
             # Display analysis results
@@ -1096,7 +1138,7 @@ def main():
 
     with col1:
         if st.button("📊 Export Analysis Report"):
-            st.success("✅ Analysis report exported successfully!")
+            st.session_state.show_export = True
 
     with col2:
         if st.button("⚙️ System Configuration"):
@@ -1106,6 +1148,9 @@ def main():
         if st.button("📈 Historical Data"):
             st.info("📋 Historical traffic data dashboard loaded")
 
+    if st.session_state.get('show_export'):
+        export_panel()
+
 
 # --- Application Entry Point ---
 if __name__ == "__main__":
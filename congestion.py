@@ -0,0 +1,187 @@
+import logging
+import queue
+import time
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+CongestionEvent = namedtuple("CongestionEvent", "ts road kind state value baseline z")
+
+BASELINE_ALPHA = 0.01   # slow EWMA: the road's normal level
+LEVEL_ALPHA = 0.2       # fast EWMA: the current level, smooths single-frame noise
+CONGESTION_ENTER_Z = 3.0
+CONGESTION_EXIT_Z = 1.0
+ANOMALY_ENTER_Z = 5.0
+ANOMALY_EXIT_Z = 2.0
+ANOMALY_MIN_TICKS = 3     # consecutive out-of-band readings before an anomaly starts
+MIN_CONGESTED_VEHICLES = 5
+MIN_STD = 1.0
+WARMUP_TICKS = 100
+SEASONAL_BINS = 24      # hour of day
+SLOW_ENTER_RATIO = 0.4  # road speed vs. its free-flow speed
+SLOW_EXIT_RATIO = 0.6
+FREE_FLOW_ALPHA = (0.05, 0.005)  # rise fast towards faster traffic, sink slowly
+OUTLIER_WEIGHT = 0.1    # outliers still teach the baseline a little, so a lasting level shift is absorbed
+
+
+class CongestionDetector:
+    """Streaming per-road congestion and anomaly detection with O(1) state per road
+
+    Each road keeps an EWMA mean/variance baseline (per hour of day when
+    seasonal) and a fast EWMA of the current level. Congestion is raised when
+    the current level sits well above the baseline, anomalies when a single
+    reading deviates sharply in either direction for a few ticks running
+    (e.g. a blocked camera). When road speeds are supplied, traffic crawling
+    well below the road's learned free-flow speed also counts as congestion.
+    Separate enter/exit thresholds give hysteresis so alerts don't flap.
+    """
+
+    def __init__(self, n_roads, seasonal=True, events=None, warmup=WARMUP_TICKS,
+                 baseline_alpha=BASELINE_ALPHA, level_alpha=LEVEL_ALPHA,
+                 congestion_z=(CONGESTION_ENTER_Z, CONGESTION_EXIT_Z),
+                 anomaly_z=(ANOMALY_ENTER_Z, ANOMALY_EXIT_Z),
+                 min_vehicles=MIN_CONGESTED_VEHICLES, anomaly_ticks=ANOMALY_MIN_TICKS):
+        self.n_roads = n_roads
+        self.seasonal = seasonal
+        self.events = events if events is not None else queue.Queue(maxsize=1000)
+        self.warmup = warmup
+        self.baseline_alpha = baseline_alpha
+        self.level_alpha = level_alpha
+        self.congestion_z = congestion_z
+        self.anomaly_z = anomaly_z
+        self.min_vehicles = min_vehicles
+        self.anomaly_ticks = anomaly_ticks
+
+        # Column 0 is the all-day baseline, columns 1..SEASONAL_BINS the hour-of-day baselines
+        columns = 1 + (SEASONAL_BINS if seasonal else 0)
+        self.mean = np.zeros((n_roads, columns))
+        self.var = np.zeros((n_roads, columns))
+        self.samples = np.zeros((n_roads, columns), dtype=np.int64)
+        self.level = np.zeros(n_roads)
+        self.congested = np.zeros(n_roads, dtype=bool)
+        self.anomalous = np.zeros(n_roads, dtype=bool)
+        self.outliers = np.zeros(n_roads, dtype=np.int64)
+        self.speed = np.full(n_roads, np.nan)
+        self.free_flow = np.full(n_roads, np.nan)
+        # Labels events carry for each row; set_roads() replaces them when cameras change
+        self.roads = list(range(n_roads))
+
+    def set_roads(self, roads):
+        """Follow a new set of road labels, keeping the learned state of roads that stay"""
+        rows = [self.roads.index(road) if road in self.roads else None for road in roads]
+        for name in ("mean", "var", "samples", "level", "congested", "anomalous", "outliers", "speed", "free_flow"):
+            old = getattr(self, name)
+            fresh = np.full((len(roads),) + old.shape[1:], np.nan if name in ("speed", "free_flow") else 0,
+                            dtype=old.dtype)
+            for new_row, row in enumerate(rows):
+                if row is not None:
+                    fresh[new_row] = old[row]
+            setattr(self, name, fresh)
+        self.roads = list(roads)
+        self.n_roads = len(roads)
+
+    def _speed_ratio(self, speeds):
+        """Smoothed road speed as a fraction of free-flow speed (nan where unknown)"""
+        speeds = np.asarray(speeds, dtype=np.float64)
+        known = ~np.isnan(speeds)
+        self.speed = np.where(known & np.isnan(self.speed), speeds, self.speed)
+        self.speed = np.where(known, self.speed + self.level_alpha * (speeds - self.speed), self.speed)
+        learn = known & ~self.congested
+        self.free_flow = np.where(learn & np.isnan(self.free_flow), self.speed, self.free_flow)
+        alpha = np.where(self.speed > self.free_flow, *FREE_FLOW_ALPHA)
+        self.free_flow = np.where(learn, self.free_flow + alpha * (self.speed - self.free_flow), self.free_flow)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.speed / self.free_flow
+
+    def update(self, counts, ts=None, speeds=None):
+        """Feed one tick of per-road vehicle counts (and optional speeds); returns the events it raised
+
+        A NaN count means the road has no fresh reading: its state is held
+        and it neither raises events nor teaches its baseline this tick.
+        """
+        ts = time.time() if ts is None else ts
+        x = np.asarray(counts, dtype=np.float64)
+        seen = ~np.isnan(x)
+        baselines = [0, 1 + time.localtime(ts).tm_hour] if self.seasonal else [0]
+
+        # Prefer the hour-of-day baseline once it has warmed up, else the all-day one
+        b = baselines[-1]
+        seasonal = self.samples[:, b] >= self.warmup
+        mean = np.where(seasonal, self.mean[:, b], self.mean[:, 0])
+        std = np.maximum(np.sqrt(np.where(seasonal, self.var[:, b], self.var[:, 0])), MIN_STD)
+        ready = self.samples[:, 0] >= self.warmup
+
+        # A road's first reading sets its level outright
+        first = self.samples[:, 0] == 0
+        self.level = np.where(seen, np.where(first, x, self.level + self.level_alpha * (x - self.level)), self.level)
+        level_z = (self.level - mean) / std
+        point_z = (x - mean) / std
+
+        busy = self.level >= self.min_vehicles
+        if speeds is None:
+            crawling = holding = np.zeros(self.n_roads, dtype=bool)
+        else:
+            ratio = self._speed_ratio(speeds)
+            crawling = busy & (ratio < SLOW_ENTER_RATIO)
+            holding = ratio < SLOW_EXIT_RATIO
+        congested = np.where(self.congested, (level_z > self.congestion_z[1]) | holding,
+                             ((level_z > self.congestion_z[0]) & busy) | crawling) & ready
+        outlier = np.abs(point_z) > self.anomaly_z[0]
+        self.outliers = np.where(seen, np.where(outlier, self.outliers + 1, 0), self.outliers)
+        anomalous = np.where(self.anomalous, np.abs(point_z) > self.anomaly_z[1],
+                             self.outliers >= self.anomaly_ticks) & ready
+        congested = np.where(seen, congested, self.congested)
+        anomalous = np.where(seen, anomalous, self.anomalous)
+        events = []
+        for kind, old, new, z, value in (("congestion", self.congested, congested, level_z, self.level),
+                                         ("anomaly", self.anomalous, anomalous, point_z, x)):
+            for road in np.flatnonzero(old != new):
+                events.append(CongestionEvent(ts, self.roads[road], kind, "start" if new[road] else "end",
+                                              float(value[road]), float(mean[road]), float(z[road])))
+        self.congested, self.anomalous = congested, anomalous
+
+        # Incremental EWMA mean/variance; once a road is warm, outliers only teach its baseline a little.
+        # Before then every reading counts, since z-scores against an untrained baseline mean nothing.
+        weight = np.where((anomalous | outlier) & ready, OUTLIER_WEIGHT, 1.0)
+        for b in baselines:
+            m, v, n = self.mean[:, b], self.var[:, b], self.samples[:, b]
+            alpha = np.maximum(self.baseline_alpha, 1.0 / (n + 1)) * weight
+            delta = x - m
+            self.mean[:, b] = np.where(seen, m + alpha * delta, m)
+            self.var[:, b] = np.where(seen, (1 - alpha) * (v + alpha * delta * delta), v)
+            self.samples[:, b] = n + seen
+
+        for event in events:
+            self._publish(event)
+        return events
+
+    def _publish(self, event):
+        log = logger.warning if event.state == "start" else logger.info
+        log("Road %s %s %s: value=%.1f baseline=%.1f z=%.1f",
+            event.road, event.kind, event.state, event.value, event.baseline, event.z)
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            # Keep the newest events; the UI only cares about what is happening now
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                pass
+            self.events.put_nowait(event)
+
+    def active(self, kind="congestion"):
+        flags = self.congested if kind == "congestion" else self.anomalous
+        return [self.roads[road] for road in np.flatnonzero(flags)]
+
+
+def drain_events(events):
+    """Take every pending event off a detector's queue without blocking"""
+    drained = []
+    while True:
+        try:
+            drained.append(events.get_nowait())
+        except queue.Empty:
+            return drained
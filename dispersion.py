@@ -0,0 +1,147 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+# --- Constants ---
+EARTH_RADIUS_M = 6371000.0
+GRID_CELL_M = 20.0
+GRID_MARGIN_M = 600.0        # grid extends this far past the outermost road
+CALM_SIGMA_M = 40.0          # spread around a source with no wind
+RESIDENCE_SECONDS = 120.0    # how long emissions drift before they count as dispersed
+MAX_DRIFT_M = 500.0
+ALONG_SPREAD = 0.25          # plume length (sigma) per metre of drift
+CROSS_SPREAD = 0.1           # plume width per metre of drift, about 6 degrees
+WIND_DIRECTION_STEP = 5      # degrees; kernels are cached per rounded wind
+WIND_SPEED_STEP = 0.5        # m/s
+KERNEL_CACHE_SIZE = 16
+
+
+def _fast_len(n):
+    """Smallest 2-3-5 smooth length >= n, which numpy's FFT handles fastest"""
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+def plume_kernel(wind_speed, wind_from_deg, cell_m=GRID_CELL_M):
+    """Normalised ground-level spread of one cell's emissions for a wind
+
+    A Gaussian puff that drifts downwind for RESIDENCE_SECONDS and widens as
+    it goes; with no wind it stays a round CALM_SIGMA_M blob. The kernel sums
+    to 1, so stronger wind smears the same emissions over a larger area.
+    """
+    drift = min(wind_speed * RESIDENCE_SECONDS, MAX_DRIFT_M)
+    sigma_along = CALM_SIGMA_M + ALONG_SPREAD * drift
+    sigma_cross = CALM_SIGMA_M + CROSS_SPREAD * drift
+    radius = int(math.ceil((drift / 2 + 3 * sigma_along) / cell_m))
+
+    # Wind blows *from* wind_from_deg (clockwise from north); grid y grows southwards
+    heading = math.radians(wind_from_deg + 180)
+    ux, uy = math.sin(heading), -math.cos(heading)
+    offsets = np.arange(-radius, radius + 1) * cell_m
+    dx, dy = np.meshgrid(offsets, offsets)
+    along = dx * ux + dy * uy - drift / 2
+    cross = dx * uy - dy * ux
+    kernel = np.exp(-0.5 * ((along / sigma_along) ** 2 + (cross / sigma_cross) ** 2))
+    return kernel / kernel.sum()
+
+
+class DispersionGrid:
+    """City grid that spreads every road's emissions into an exposure map
+
+    Roads are fixed (lat, lon) points, projected once onto a metric grid
+    around them. Each update drops the per-road emissions into their cells
+    with one bincount and convolves the grid with the wind's plume kernel
+    through a padded real FFT; kernel spectra are cached per rounded wind,
+    so a refresh costs one forward and one inverse FFT however many roads
+    there are.
+    """
+
+    def __init__(self, locations, cell_m=GRID_CELL_M, margin_m=GRID_MARGIN_M):
+        locations = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        self.cell_m = cell_m
+        self.origin_lat = float(locations[:, 0].mean())
+        self._m_per_deg_lat = math.radians(1) * EARTH_RADIUS_M
+        self._m_per_deg_lon = self._m_per_deg_lat * math.cos(math.radians(self.origin_lat))
+
+        # North-west corner of the grid, then road cells counted east (x) and south (y)
+        self.north = locations[:, 0].max() + margin_m / self._m_per_deg_lat
+        self.west = locations[:, 1].min() - margin_m / self._m_per_deg_lon
+        x = (locations[:, 1] - self.west) * self._m_per_deg_lon
+        y = (self.north - locations[:, 0]) * self._m_per_deg_lat
+        self.cols = int(x.max() + margin_m) // int(cell_m) + 1
+        self.rows = int(y.max() + margin_m) // int(cell_m) + 1
+        self.road_cells = (y // cell_m).astype(np.int64) * self.cols + (x // cell_m).astype(np.int64)
+        self.exposure = np.zeros((self.rows, self.cols))
+        self._kernels = OrderedDict()
+
+    def _spectrum(self, wind_speed, wind_from_deg):
+        key = (round(wind_speed / WIND_SPEED_STEP) * WIND_SPEED_STEP,
+               round(wind_from_deg / WIND_DIRECTION_STEP) * WIND_DIRECTION_STEP % 360)
+        if key in self._kernels:
+            self._kernels.move_to_end(key)
+            return self._kernels[key]
+        kernel = plume_kernel(*key, cell_m=self.cell_m)
+        radius = kernel.shape[0] // 2
+        shape = (_fast_len(self.rows + 2 * radius), _fast_len(self.cols + 2 * radius))
+        # Kernel centre at index (0, 0), the rest wrapped around, so the convolution isn't shifted
+        padded = np.zeros(shape)
+        padded[:kernel.shape[0], :kernel.shape[1]] = kernel
+        padded = np.roll(padded, (-radius, -radius), axis=(0, 1))
+        entry = (np.fft.rfft2(padded), shape)
+        self._kernels[key] = entry
+        if len(self._kernels) > KERNEL_CACHE_SIZE:
+            self._kernels.popitem(last=False)
+        return entry
+
+    def update(self, emissions, wind_speed=0.0, wind_from_deg=0.0):
+        """Exposure map (rows, cols) from one emission value per road, in the same units per cell"""
+        spectrum, shape = self._spectrum(wind_speed, wind_from_deg)
+        sources = np.bincount(self.road_cells, weights=np.asarray(emissions, dtype=np.float64),
+                              minlength=self.rows * self.cols).reshape(self.rows, self.cols)
+        spread = np.fft.irfft2(np.fft.rfft2(sources, shape) * spectrum, shape)
+        self.exposure = np.maximum(spread[:self.rows, :self.cols], 0)
+        return self.exposure
+
+    def cell_centres(self):
+        """(lat, lon) of every grid cell centre, as two (rows, cols) arrays"""
+        y = (np.arange(self.rows) + 0.5) * self.cell_m
+        x = (np.arange(self.cols) + 0.5) * self.cell_m
+        return (np.repeat((self.north - y / self._m_per_deg_lat)[:, None], self.cols, axis=1),
+                np.repeat((self.west + x / self._m_per_deg_lon)[None, :], self.rows, axis=0))
+
+    def layer(self, min_share=0.02, opacity=0.6):
+        """pydeck GridCellLayer of the cells above `min_share` of the peak exposure"""
+        import pydeck as pdk
+
+        peak = self.exposure.max()
+        ys, xs = np.nonzero(self.exposure > peak * min_share) if peak > 0 else (np.array([], int),) * 2
+        level = self.exposure[ys, xs] / peak if peak > 0 else np.array([])
+        # GridCellLayer positions are the cells' south-west corners
+        lat = self.north - (ys + 1) * self.cell_m / self._m_per_deg_lat
+        lon = self.west + xs * self.cell_m / self._m_per_deg_lon
+        data = [{"position": [lo, la], "exposure": float(e), "level": float(v)}
+                for la, lo, e, v in zip(lat.tolist(), lon.tolist(), self.exposure[ys, xs].tolist(), level.tolist())]
+        return pdk.Layer(
+            "GridCellLayer",
+            data=data,
+            get_position="position",
+            cell_size=self.cell_m,
+            extruded=False,
+            get_fill_color="[255, 220 * (1 - level), 0, 60 + 180 * level]",
+            opacity=opacity,
+            pickable=True,
+        )
+
+    def view_state(self, zoom=15):
+        import pydeck as pdk
+
+        lat = self.north - self.rows * self.cell_m / self._m_per_deg_lat / 2
+        lon = self.west + self.cols * self.cell_m / self._m_per_deg_lon / 2
+        return pdk.ViewState(latitude=lat, longitude=lon, zoom=zoom)
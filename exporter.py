@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+import shutil
+import sqlite3
+import tempfile
+
+import numpy as np
+
+from history import SCHEMA, TABLES
+
+# --- Constants ---
+EXPORT_FORMATS = {
+    "CSV": {"ext": "csv", "mime": "text/csv"},
+    "Parquet": {"ext": "parquet", "mime": "application/vnd.apache.parquet"},
+    "JSON Lines": {"ext": "jsonl", "mime": "application/x-ndjson"},
+}
+EXPORT_DATASETS = {
+    "Per-road Metrics": "road_metrics",
+    "Vehicle Detections": "detections",
+    "Signal Phase History": "signal_phases",
+    "Occupancy Heatmaps": "heatmaps",
+}
+HEATMAP_COLUMNS = ("ts", "road", "cell", "x", "y", "occupancy")
+HEATMAP_TYPES = ("REAL", "INTEGER", "INTEGER", "INTEGER", "INTEGER", "REAL")
+ARROW_TYPES = {"REAL": "float64", "INTEGER": "int64", "TEXT": "string", "BLOB": "binary"}
+BATCH_ROWS = 5000
+
+
+def iter_csv(batches, columns, types=None):
+    """Encode row batches as CSV, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(batches, columns, types=None):
+    """Encode row batches as JSON Lines, one chunk per batch"""
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows).encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def column_types(table):
+    """Declared SQLite type of each exported column, from the history schema"""
+    if table == "heatmaps":
+        return HEATMAP_TYPES
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.executescript(SCHEMA)
+        declared = {row[1]: row[2] for row in conn.execute(f'PRAGMA table_info({table})')}
+    finally:
+        conn.close()
+    return tuple(declared[column] for column in TABLES[table])
+
+
+def iter_parquet(batches, columns, types):
+    """Encode row batches as Parquet, one row group per batch
+
+    The schema comes from the declared column types rather than the first
+    batch, so an all-NULL column early on can't fix its type, and an empty
+    export is still a valid file with every column.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, getattr(pa, ARROW_TYPES[kind])()) for name, kind in zip(columns, types)])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    written = False
+    for rows in batches:
+        writer.write_table(pa.Table.from_pydict(
+            {name: list(values) for name, values in zip(columns, zip(*rows))}, schema=schema))
+        written = True
+        yield sink.drain()
+    if not written:
+        writer.write_table(schema.empty_table())
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"CSV": iter_csv, "Parquet": iter_parquet, "JSON Lines": iter_jsonl}
+
+
+def expand_heatmaps(batches):
+    """Heatmap snapshots -> one (ts, road, cell, x, y, occupancy) row per occupied cell"""
+    for rows in batches:
+        for ts, road, cell, frames, grid_rows, grid_cols, grid in rows:
+            grid = np.frombuffer(grid, dtype='<u4').reshape(grid_rows, grid_cols)
+            ys, xs = np.nonzero(grid)
+            occupancy = grid[ys, xs] / max(frames, 1)
+            if len(xs):
+                yield [(ts, road, cell, x * cell, y * cell, o)
+                       for x, y, o in zip(xs.tolist(), ys.tolist(), occupancy.tolist())]
+
+
+def stream_export(store, dataset, fmt, start=None, end=None, roads=None, batch_size=BATCH_ROWS):
+    """Stream one history table as encoded byte chunks with constant memory use"""
+    table = EXPORT_DATASETS.get(dataset, dataset)
+    if table == "heatmaps":
+        # One snapshot per batch: each expands to up to rows x cols cell rows
+        batches = expand_heatmaps(store.iter_rows(table, start=start, end=end, roads=roads, batch_size=1))
+        columns = HEATMAP_COLUMNS
+    else:
+        batches = store.iter_rows(table, start=start, end=end, roads=roads, batch_size=batch_size)
+        columns = TABLES[table]
+    for chunk in ENCODERS[fmt](batches, columns, column_types(table)):
+        if chunk:
+            yield chunk
+
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only file object over a chunk generator"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.leftover = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.leftover:
+            self.leftover = next(self.chunks, None)
+            if self.leftover is None:
+                self.leftover = b""
+                return 0
+        size = min(len(buffer), len(self.leftover))
+        buffer[:size] = self.leftover[:size]
+        self.leftover = self.leftover[size:]
+        return size
+
+
+class _SpooledExport(io.BufferedReader):
+    """A spooled export as the BufferedReader st.download_button accepts; holds on to its temp file"""
+
+    def __init__(self, spool):
+        super().__init__(spool.raw)
+        self.spool = spool
+
+
+def export_to_tempfile(chunks, fmt):
+    """Spool a chunk stream to disk and return a binary reader positioned at the start
+
+    A TemporaryFile is a BufferedRandom, which st.download_button rejects,
+    so the file is handed back as a BufferedReader over the same file.
+    """
+    out = tempfile.TemporaryFile(suffix=f".{EXPORT_FORMATS[fmt]['ext']}")
+    shutil.copyfileobj(_ChunkReader(chunks), out)
+    out.flush()
+    out.seek(0)
+    return _SpooledExport(out)
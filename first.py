@@ -1,12 +1,10 @@
-import cv2
 import numpy as np
-from ultralytics import YOLO
 import time
 import streamlit as st
-import pyttsx3
-from transformers import pipeline
-import threading
-import sqlite3
+
+from emissions import class_counts, compute_emissions, emissions_dict
+from startup import get_auth_service, get_model_loader, get_speech_worker, load_model
+from summarizer import BackgroundSummarizer
 
 # --- Constants ---
 PLANT_SUGGESTIONS = {
@@ -15,11 +13,8 @@ PLANT_SUGGESTIONS = {
     "High": {"plants": "Areca Palm, Boston Fern, Rubber Plant", "reduction": 20},
     "Severe": {"plants": "Areca Palm, Boston Fern, Rubber Plant", "reduction": 30},
 }
-EMISSION_FACTORS = {"CO2": 120, "NOx": 0.6, "PM2.5": 0.005}
 PIXEL_TO_M2_FACTOR = 0.05
-
-# Load summarizer model (lightweight)
-summarizer = pipeline("summarization", model="t5-small")
+UNUSED_AREA_STEP = 10  # m²; summaries are cached per rounded road state
 
 # --- Utility Functions ---
 def get_pollution_info(count):
@@ -66,60 +61,79 @@ def traffic_light_html(state, rem):
     """
     return html
 
+@st.cache_resource
+def get_summarizer():
+    # Loaded on a background thread on first use, not at import
+    return BackgroundSummarizer()
+
 def generate_summary(idx, counts, unused, emis, plants):
+    """Model summary if cached, else the template; also returns the model input still pending"""
+    # Rounded figures, so identical road states share one cached model summary
+    area = round(unused[idx] / UNUSED_AREA_STEP) * UNUSED_AREA_STEP
     text = (
         f"Road {idx+1} Report:\n"
         f"- Vehicles: {counts[idx]}\n"
-        f"- Unused Area: {unused[idx]:.2f} m²\n"
-        f"- Emissions: " + ", ".join([f"{k}: {v}" for k, v in emis[idx].items()]) + "\n"
+        f"- Unused Area: {area} m²\n"
+        f"- Emissions: " + ", ".join([f"{k}: {v:.2g}" for k, v in emis[idx].items()]) + "\n"
         f"- Suggested Plants: {plants[idx][3]}\n"
     )
-    summary = summarizer(text, max_length=100, min_length=30, do_sample=False)[0]['summary_text']
-    def speak():
-        engine = pyttsx3.init()
-        engine.say(summary)
-        engine.runAndWait()
-    threading.Thread(target=speak).start()
-    return summary
-
-def check_login():
+    summary = get_summarizer().summarize(text)
+    pending = None
+    if summary is None:
+        summary = f"Road {idx + 1}: {counts[idx]} vehicles detected, {unused[idx]:.1f}m² unused area, {plants[idx][1]} air quality. Plants recommended: {plants[idx][3][:50]}..."
+        pending = text
+    get_speech_worker().say(summary, key="summary")
+    return summary, pending
+
+def check_login(started=None):
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
 
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS users(username TEXT, password TEXT)')
-    conn.commit()
+    auth = get_auth_service()
+    if st.session_state.logged_in and auth.session_user(st.session_state.get("auth_token")) is None:
+        st.session_state.logged_in = False  # session expired
 
     if not st.session_state.logged_in:
         st.header("Login")
         username = st.text_input("Username")
         password = st.text_input("Password", type='password')
         if st.button("Login"):
-            c.execute('SELECT * FROM users WHERE username = ? AND password = ?', (username, password))
-            if c.fetchone():
+            token = auth.login(username, password)
+            if token:
                 st.session_state.logged_in = True
+                st.session_state.auth_token = token
                 st.rerun()
 
             else:
                 st.error("Incorrect username or password")
+        if started is not None:
+            get_model_loader().record("login page", started)
         st.stop()
 
 def main():
     st.set_page_config(page_title="Smart Traffic Monitoring", layout="wide")
     st.title("🚦 Smart Traffic Monitoring System")
-    check_login()
+    started = time.perf_counter()
+    get_model_loader()
+    get_summarizer().start()
+    check_login(started)
     st.success("Login Successful. You are now being redirected to the Dashboard.")
     run_dashboard()
 
 def run_dashboard():
-    model = YOLO('yolov8n.pt')
-    caps = [cv2.VideoCapture(f'Road_{i+1}.mp4') for i in range(4)]
+    model = load_model()
+    # Imported here, after login: the background loader has been importing it since startup
+    import cv2
+    from supervisor import STALE_READING_SECONDS, CameraSource, no_signal_frame
+    # Supervised: a missing or broken feed reads as no frame and reconnects in the background
+    caps = [CameraSource(f'Road_{i + 1}.mp4', f"Road {i + 1}") for i in range(4)]
+    held = {}   # road -> its last good reading, shown while its feed is down
     signal_states = ['red'] * 4
     durations = [5] * 4
     current = 0
     start = time.time()
     last_summary = None
+    pending_summary = None
 
     placeholders = [st.empty() for _ in range(4)]
     summary_box = st.empty()
@@ -130,19 +144,28 @@ def run_dashboard():
         for i, cap in enumerate(caps):
             ret, frame = cap.read()
             if not ret:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                ret, frame = cap.read()
-            frame = cv2.resize(frame, (320, 180))
-            res = model(frame)
-            count = sum(int(r.cls) in [2, 3, 5, 7] for r in res[0].boxes)
-            for r in res[0].boxes:
-                if int(r.cls) in [2, 3, 5, 7]:
-                    x1, y1, x2, y2 = map(int, r.xyxy[0])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            emis = {k: count * v for k, v in EMISSION_FACTORS.items()}
-            unused = calculate_unused_area(frame, res)
-            prate, plevel, air, sug, red = get_pollution_info(count)
-            plant_val = (plevel, air, int(unused / 2), sug, red * int(unused / 2))
+                if i in held and time.time() - cap.last_frame_ts <= STALE_READING_SECONDS:
+                    frame, count, emis, unused, plant_val = held[i]
+                else:
+                    frame = no_signal_frame((320, 180), f"{cap.name}: {cap.state}")
+                    count, unused = 0, 0.0
+                    emis = emissions_dict(compute_emissions(class_counts([])))
+                    prate, plevel, air, sug, red = get_pollution_info(count)
+                    plant_val = (plevel, air, 0, sug, 0)
+            else:
+                frame = cv2.resize(frame, (320, 180))
+                res = model(frame)
+                counts_by_class = class_counts(res[0].boxes.cls.cpu().numpy())
+                count = int(counts_by_class.sum())
+                for r in res[0].boxes:
+                    if int(r.cls) in [2, 3, 5, 7]:
+                        x1, y1, x2, y2 = map(int, r.xyxy[0])
+                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                emis = emissions_dict(compute_emissions(counts_by_class))
+                unused = calculate_unused_area(frame, res)
+                prate, plevel, air, sug, red = get_pollution_info(count)
+                plant_val = (plevel, air, int(unused / 2), sug, red * int(unused / 2))
+                held[i] = (frame, count, emis, unused, plant_val)
             frames.append(frame)
             counts.append(count)
             emis_list.append(emis)
@@ -177,9 +200,15 @@ def run_dashboard():
                     st.write(f"Est. Reduction: {plant_info[i][4]}")
 
         if current != last_summary:
-            summary = generate_summary(current, counts, unused_list, emis_list, plant_info)
+            summary, pending_summary = generate_summary(current, counts, unused_list, emis_list, plant_info)
             summary_box.markdown(f"### 🚦 Road {current+1} Summary:\n{summary}")
             last_summary = current
+        elif pending_summary is not None:
+            # Swap the template for the model's summary once the worker has it
+            summary = get_summarizer().result(pending_summary)
+            if summary is not None:
+                summary_box.markdown(f"### 🚦 Road {current+1} Summary:\n{summary}")
+                pending_summary = None
 
         time.sleep(0.1)
 
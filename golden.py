@@ -0,0 +1,201 @@
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmark import BENCHMARK_CLIPS, BENCHMARK_FRAMES, benchmark_camera
+from pipeline import CameraPipeline
+from startup import MODEL_WEIGHTS, ModelLoader
+from tiling import TileBudget
+
+# --- Constants ---
+GOLDEN_FILE = 'golden_counts.json'
+MATCH_IOU = 0.5
+# Worst acceptable result per metric; 'min' metrics must stay at or above, the rest at or below
+TOLERANCES = {
+    "count_mae": 0.5,           # mean absolute vehicle-count error per frame
+    "count_max_error": 3,       # worst single-frame count error
+    "count_drift": 0.05,        # relative change in total vehicles counted
+    "unused_rel_error": 0.05,   # mean relative unused-area error
+    "box_f1_min": 0.90,         # boxes matched to the reference at MATCH_IOU
+}
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of two (N, 4) xyxy box arrays"""
+    a, b = np.asarray(a, dtype=np.float64).reshape(-1, 4), np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_boxes(reference, boxes, threshold=MATCH_IOU):
+    """Greedy one-to-one matches, highest IoU first; returns the number matched"""
+    if not len(reference) or not len(boxes):
+        return 0
+    iou = iou_matrix(reference, boxes)
+    matched = 0
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < threshold:
+            return matched
+        matched += 1
+        iou[i, :] = -1
+        iou[:, j] = -1
+
+
+def run_clip(clip, model, frames, tiled=False, stride=1):
+    """Per-frame counts, boxes and unused area for one clip, with the throughput it ran at
+
+    With stride > 1 only every stride-th source frame is processed (the
+    rest are grabbed and not decoded), as frame skipping would. Skipped
+    frames still get an entry, holding the last processed result as the
+    dashboard would, so the cost of skipping shows up in the scores. Each
+    entry carries its source frame index so it is scored against the same frame.
+    """
+    pipeline = CameraPipeline(benchmark_camera(clip), model, clip, TileBudget() if tiled else None)
+    # One pass only, so every frame index is scored once
+    length = int(pipeline.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = min(frames, length) if length > 0 else frames
+    results, entry, processed = [], None, 0
+    start = time.perf_counter()
+    for offset in range(frames):
+        index = int(pipeline.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if offset % stride == 0:
+            result = pipeline.step(time.time(), tiled=tiled)
+            if result is None:
+                break
+            entry = {"count": result.count, "by_class": [int(n) for n in result.counts_by_class],
+                     "boxes": np.round(result.boxes, 1).tolist(), "unused": round(float(result.unused), 2)}
+            processed += 1
+            results.append({"index": index, **entry})
+        elif pipeline.cap.grab():
+            results.append({"index": index, **entry, "held": True})
+        else:
+            break
+    elapsed = time.perf_counter() - start
+    inference = pipeline.metrics.histograms.get(("inference", clip))
+    pipeline.cap.release()
+    # Throughput over the source frames actually consumed, which is fewer than asked if the clip ran out
+    return results, {"fps": round(processed / elapsed, 2), "source_fps": round(len(results) / elapsed, 2),
+                     "inference_ms": round(inference.sum / inference.count() * 1000, 3) if inference else None}
+
+
+def record(clips=BENCHMARK_CLIPS, frames=BENCHMARK_FRAMES, weights=MODEL_WEIGHTS):
+    """Reference outputs of the FP32 detector, full frame rate, no tiling"""
+    model = ModelLoader(weights).model()
+    golden = {"settings": {"weights": weights, "frames": frames, "tiled": False, "stride": 1},
+              "created": time.strftime('%Y-%m-%dT%H:%M:%S'), "clips": {}}
+    for clip in clips:
+        golden["clips"][clip], _ = run_clip(clip, model, frames)
+    return golden
+
+
+def score(reference, candidate):
+    """Accuracy of a candidate run against the reference frames it shares an index with"""
+    by_index = {entry["index"]: entry for entry in reference}
+    pairs = [(by_index[entry["index"]], entry) for entry in candidate if entry["index"] in by_index]
+    if not pairs:
+        return None
+    errors = np.array([abs(c["count"] - r["count"]) for r, c in pairs])
+    ref_total = sum(r["count"] for r, _ in pairs)
+    cand_total = sum(c["count"] for _, c in pairs)
+    unused = np.array([abs(c["unused"] - r["unused"]) / max(r["unused"], 1e-9) for r, c in pairs])
+    matched = sum(match_boxes(r["boxes"], c["boxes"]) for r, c in pairs)
+    ref_boxes = sum(len(r["boxes"]) for r, _ in pairs)
+    cand_boxes = sum(len(c["boxes"]) for _, c in pairs)
+    f1 = 2 * matched / (ref_boxes + cand_boxes) if ref_boxes + cand_boxes else 1.0
+    return {"frames": len(pairs),
+            "count_mae": round(float(errors.mean()), 3),
+            "count_max_error": int(errors.max()),
+            "count_drift": round((cand_total - ref_total) / ref_total, 4) if ref_total else 0.0,
+            "unused_rel_error": round(float(unused.mean()), 4),
+            "box_f1_min": round(f1, 4)}
+
+
+def failures(scores, tolerances=TOLERANCES):
+    """Metrics outside tolerance, as readable strings"""
+    failed = []
+    for key, limit in tolerances.items():
+        value = scores.get(key)
+        if value is None:
+            continue
+        if key.endswith("_min"):
+            if value < limit:
+                failed.append(f"{key} {value} < {limit}")
+        elif abs(value) > limit:
+            failed.append(f"{key} {value} > {limit}")
+    return failed
+
+
+def compare(golden, weights=MODEL_WEIGHTS, tiled=False, stride=1, tolerances=TOLERANCES):
+    """Run a pipeline configuration on the golden clips; throughput and accuracy per clip"""
+    model = ModelLoader(weights).model()
+    frames = golden["settings"]["frames"]
+    report = {"settings": {"weights": weights, "tiled": tiled, "stride": stride}, "clips": {}}
+    for clip, reference in golden["clips"].items():
+        candidate, throughput = run_clip(clip, model, frames, tiled, stride)
+        scores = score(reference, candidate)
+        report["clips"][clip] = {**throughput, **(scores or {}),
+                                 "failures": failures(scores, tolerances) if scores else ["no shared frames"]}
+    return report
+
+
+def parse_tolerances(items):
+    tolerances = dict(TOLERANCES)
+    for item in items or ():
+        key, _, value = item.partition("=")
+        if key not in TOLERANCES:
+            raise SystemExit(f"Unknown tolerance {key!r}; expected one of {', '.join(TOLERANCES)}")
+        tolerances[key] = float(value)
+    return tolerances
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Golden-count accuracy checks for pipeline configurations.")
+    parser.add_argument("command", choices=("record", "compare"))
+    parser.add_argument("--golden", default=GOLDEN_FILE)
+    parser.add_argument("--clips", nargs="+", default=list(BENCHMARK_CLIPS))
+    parser.add_argument("--frames", type=int, default=BENCHMARK_FRAMES)
+    parser.add_argument("--weights", default=MODEL_WEIGHTS)
+    parser.add_argument("--tiled", action="store_true")
+    parser.add_argument("--stride", type=int, default=1, help="process every Nth frame")
+    parser.add_argument("--tolerance", action="append", metavar="KEY=VALUE")
+    parser.add_argument("--output", help="write the comparison report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        with open(args.golden, "w", encoding='utf-8') as f:
+            json.dump(record(args.clips, args.frames, args.weights), f)
+        print(f"Golden counts written to {args.golden}")
+        return 0
+
+    with open(args.golden, "r", encoding='utf-8') as f:
+        golden = json.load(f)
+    report = compare(golden, args.weights, args.tiled, args.stride, parse_tolerances(args.tolerance))
+    if args.output:
+        with open(args.output, "w", encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{'clip':<12} {'fps':>8} {'src fps':>8} {'infer ms':>9} {'cnt MAE':>8} {'drift':>7} "
+          f"{'box F1':>7} {'unused':>7}  result")
+    failed = False
+    for clip, row in report["clips"].items():
+        failed |= bool(row["failures"])
+        print(f"{clip:<12} {row['fps']:>8} {row['source_fps']:>8} {row['inference_ms']!s:>9} "
+              f"{row.get('count_mae', '-')!s:>8} {row.get('count_drift', '-')!s:>7} "
+              f"{row.get('box_f1_min', '-')!s:>7} {row.get('unused_rel_error', '-')!s:>7}  "
+              f"{'; '.join(row['failures']) or 'ok'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
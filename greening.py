@@ -0,0 +1,102 @@
+import cv2
+import numpy as np
+
+# --- Constants ---
+FREE_ENTER = 0.02            # a cell joins the free map once occupied in at most 2% of frames
+FREE_EXIT = 0.08             # and leaves it only above 8%, so sites don't flicker
+MIN_PLANNING_FRAMES = 300
+MIN_SITE_AREA_M2 = 4.0
+EXPOSURE_RING_CELLS = 3      # neighbourhood whose traffic a site would screen
+REFERENCE_CO2 = 600.0        # g/km of about five cars: exposure factor 2 at full nearby occupancy
+EMISSION_ALPHA = 0.1
+SITE_MATCH_IOU = 0.3
+
+
+class GreeningPlanner:
+    """Ranks persistently free road patches as planter sites for one camera
+
+    Works on the camera's OccupancyHeatmap: cells that stay free (with
+    hysteresis) are grouped into connected regions, scored by ground area
+    and by the traffic and emissions right around them. Regions are only
+    re-labelled when the free map actually changes, and keep their ids
+    across updates so recommendations stay put.
+    """
+
+    def __init__(self, cell, grid_shape, road_mask=None, weights=None, pixel_area=0.05):
+        self.cell = cell
+        self.road = (np.ones(grid_shape, dtype=bool) if road_mask is None
+                     else self._downsample(road_mask.astype(np.float64), grid_shape) > 0.5 * cell * cell)
+        self.cell_area = (np.full(grid_shape, cell * cell * pixel_area) if weights is None
+                          else self._downsample(weights.astype(np.float64), grid_shape))
+        self.free = np.zeros(grid_shape, dtype=bool)
+        self.labels = np.zeros(grid_shape, dtype=np.int32)
+        self.sites = []
+        self.next_id = 1
+        self.co2 = None
+        self._ring = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * EXPOSURE_RING_CELLS + 1,) * 2)
+
+    def _downsample(self, values, grid_shape):
+        """Sum frame pixels into grid cells"""
+        rows, cols = grid_shape
+        padded = np.zeros((rows * self.cell, cols * self.cell))
+        padded[:values.shape[0], :values.shape[1]] = values
+        return padded.reshape(rows, self.cell, cols, self.cell).sum(axis=(1, 3))
+
+    def update(self, heatmap, co2=0.0):
+        """Refresh the ranked site list from the latest heatmap and road emissions"""
+        self.co2 = co2 if self.co2 is None else self.co2 + EMISSION_ALPHA * (co2 - self.co2)
+        if heatmap.frames < MIN_PLANNING_FRAMES:
+            return self.sites
+
+        occupancy = heatmap.occupancy()
+        free = np.where(self.free, occupancy <= FREE_EXIT, occupancy <= FREE_ENTER) & self.road
+        if (free != self.free).any() or not self.sites:
+            self.free = free
+            self._relabel()
+        self._score(occupancy)
+        return self.sites
+
+    def _relabel(self):
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(self.free.astype(np.uint8), connectivity=4)
+        areas = np.bincount(labels.ravel(), weights=self.cell_area.ravel(), minlength=count)
+
+        previous, self.labels = self.sites, labels
+        sites = []
+        for label in range(1, count):
+            if areas[label] < MIN_SITE_AREA_M2:
+                continue
+            x, y, w, h = stats[label, :4]
+            sites.append({"label": label, "area_m2": float(areas[label]),
+                          "box": tuple(int(v) * self.cell for v in (x, y, x + w, y + h))})
+
+        # Keep ids for regions that largely overlap a site from the last labelling
+        unused = {site["id"]: site for site in previous}
+        for site in sites:
+            best, best_iou = None, SITE_MATCH_IOU
+            for old in unused.values():
+                iou = _box_iou(site["box"], old["box"])
+                if iou > best_iou:
+                    best, best_iou = old["id"], iou
+            if best is None:
+                best, self.next_id = self.next_id, self.next_id + 1
+            else:
+                del unused[best]
+            site["id"] = best
+        self.sites = sites
+
+    def _score(self, occupancy):
+        for site in self.sites:
+            region = (self.labels == site["label"]).astype(np.uint8)
+            ring = (cv2.dilate(region, self._ring) > 0) & (region == 0)
+            nearby = float(occupancy[ring].mean()) if ring.any() else 0.0
+            site["exposure"] = nearby * self.co2
+            site["score"] = site["area_m2"] * (1.0 + site["exposure"] / REFERENCE_CO2)
+        self.sites.sort(key=lambda site: site["score"], reverse=True)
+
+
+def _box_iou(a, b):
+    w = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    h = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = w * h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
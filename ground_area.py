@@ -0,0 +1,100 @@
+import hashlib
+import os
+
+import numpy as np
+
+# --- Constants ---
+CACHE_DIR = 'cache'
+MAX_GROUND_DISTANCE_M = 150.0  # pixels mapping further away (or above the horizon) weigh nothing
+
+
+def pixel_area_map(calibration, frame_size):
+    """Ground area in m² covered by every pixel of a (width, height) frame
+
+    Each pixel's four corners are projected through the homography and the
+    area of the resulting quadrilateral taken with the shoelace formula.
+    """
+    w, h = frame_size
+    xs, ys = np.meshgrid(np.arange(w + 1, dtype=np.float64), np.arange(h + 1, dtype=np.float64))
+    corners = np.column_stack([xs.ravel(), ys.ravel()]) @ calibration.homography[:, :2].T + calibration.homography[:, 2]
+    depth = corners[:, 2].reshape(h + 1, w + 1)
+    ground = (corners[:, :2] / corners[:, 2:3]).reshape(h + 1, w + 1, 2)
+
+    # Corners in order: top-left, top-right, bottom-right, bottom-left
+    quad = np.stack([ground[:-1, :-1], ground[:-1, 1:], ground[1:, 1:], ground[1:, :-1]])
+    x, y = quad[..., 0], quad[..., 1]
+    area = 0.5 * np.abs((x * np.roll(y, -1, axis=0) - np.roll(x, -1, axis=0) * y).sum(axis=0))
+
+    origin = calibration.ground_points.min(axis=0)
+    in_front = (depth[:-1, :-1] > 0) & (depth[1:, 1:] > 0) & (depth[:-1, 1:] > 0) & (depth[1:, :-1] > 0)
+    near = np.linalg.norm(quad.mean(axis=0) - origin, axis=-1) <= MAX_GROUND_DISTANCE_M
+    return np.where(in_front & near & np.isfinite(area), area, 0.0).astype(np.float32)
+
+
+class GroundAreaMap:
+    """Per-pixel ground-area weights for one camera, with an integral image for box sums"""
+
+    def __init__(self, weights):
+        self.weights = weights
+        self.height, self.width = weights.shape
+        self.integral = np.zeros((self.height + 1, self.width + 1))
+        np.cumsum(np.cumsum(weights, axis=0, dtype=np.float64), axis=1, out=self.integral[1:, 1:])
+        self.total = float(self.integral[-1, -1])
+        self._mask = np.zeros(weights.shape, dtype=bool)
+
+    @classmethod
+    def load(cls, name, calibration, frame_size, cache_dir=CACHE_DIR):
+        """Build a camera's weight map once and reuse it from disk afterwards"""
+        key = hashlib.sha1(calibration.homography.tobytes() + np.asarray(frame_size).tobytes()).hexdigest()[:12]
+        path = os.path.join(cache_dir, f"ground_area_{name.replace(' ', '_')}_{key}.npy")
+        try:
+            weights = np.load(path)
+        except (FileNotFoundError, ValueError):
+            weights = pixel_area_map(calibration, frame_size)
+            os.makedirs(cache_dir, exist_ok=True)
+            np.save(path, weights)
+        return cls(weights)
+
+    @classmethod
+    def uniform(cls, mask, pixel_area):
+        """Flat per-pixel area over a region, for cameras without a calibration"""
+        return cls(mask * np.float32(pixel_area))
+
+    def within(self, mask):
+        """Same map with everything outside mask (e.g. the road ROI) weighted zero"""
+        return GroundAreaMap(self.weights * mask)
+
+    def _clip(self, boxes):
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        x = np.clip(boxes[:, [0, 2]], 0, self.width)
+        y = np.clip(boxes[:, [1, 3]], 0, self.height)
+        return x[:, 0], y[:, 0], x[:, 1], y[:, 1]
+
+    def box_areas(self, boxes):
+        """Ground area under each (N, 4) xyxy box, four integral-image lookups per box"""
+        x1, y1, x2, y2 = self._clip(boxes)
+        I = self.integral
+        return np.where((x2 > x1) & (y2 > y1), I[y2, x2] - I[y1, x2] - I[y2, x1] + I[y1, x1], 0.0)
+
+    def free_area(self, boxes, use_integral=False):
+        """Ground area in m² not covered by any vehicle box
+
+        The default rasterises the boxes into a reused mask, exact for any
+        overlap. use_integral subtracts box sums and pairwise overlaps from the
+        integral image instead, exact unless three or more boxes share a pixel.
+        """
+        x1, y1, x2, y2 = self._clip(boxes)
+        if use_integral:
+            covered = self.box_areas(np.column_stack([x1, y1, x2, y2])).sum()
+            if len(x1) > 1:
+                i, j = np.triu_indices(len(x1), k=1)
+                overlaps = np.column_stack([np.maximum(x1[i], x1[j]), np.maximum(y1[i], y1[j]),
+                                            np.minimum(x2[i], x2[j]), np.minimum(y2[i], y2[j])])
+                covered -= self.box_areas(overlaps).sum()
+            return self.total - covered
+
+        mask = self._mask
+        mask[:] = False
+        for bx1, by1, bx2, by2 in zip(x1, y1, x2, y2):
+            mask[by1:by2, bx1:bx2] = True
+        return self.total - float(self.weights[mask].sum(dtype=np.float64))
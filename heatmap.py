@@ -0,0 +1,76 @@
+import time
+
+import cv2
+import numpy as np
+
+# --- Constants ---
+HEATMAP_CELL = 4               # frame pixels per grid cell side
+HEATMAP_DECAY_SECONDS = 7 * 24 * 3600   # counts halve every week, so the map weighs the last few weeks
+
+
+class OccupancyHeatmap:
+    """Per-camera count of frames each grid cell was covered by a vehicle
+
+    The grid is a downsampled uint16/uint32 accumulator updated in place;
+    nothing is allocated per frame beyond the few box coordinates. On the
+    schedule the counts either halve (decay) or are handed to on_rollover
+    and cleared.
+    """
+
+    def __init__(self, frame_size, cell=HEATMAP_CELL, dtype=np.uint32,
+                 decay_seconds=HEATMAP_DECAY_SECONDS, rollover_seconds=None, on_rollover=None):
+        w, h = frame_size
+        self.cell = cell
+        self.grid = np.zeros((-(-h // cell), -(-w // cell)), dtype=dtype)
+        self.frames = 0
+        self.limit = np.iinfo(dtype).max
+        self.decay_seconds = decay_seconds
+        self.rollover_seconds = rollover_seconds
+        self.on_rollover = on_rollover
+        self.period_start = None
+        self._covered = np.zeros(self.grid.shape, dtype=bool)
+
+    def _schedule(self, ts):
+        if self.period_start is None:
+            self.period_start = ts
+        elapsed = ts - self.period_start
+        if self.rollover_seconds and elapsed >= self.rollover_seconds:
+            if self.on_rollover is not None:
+                self.on_rollover(self.period_start, self.grid, self.frames)
+            self.grid[:] = 0
+            self.frames = 0
+            self.period_start = ts
+        elif self.decay_seconds and elapsed >= self.decay_seconds:
+            self.halve()
+            self.period_start = ts
+
+    def halve(self):
+        np.right_shift(self.grid, 1, out=self.grid)
+        self.frames >>= 1
+
+    def add(self, boxes, ts=None):
+        """Accumulate one frame's (N, 4) xyxy vehicle boxes"""
+        self._schedule(time.time() if ts is None else ts)
+        if self.frames >= self.limit:
+            self.halve()
+
+        covered = self._covered
+        covered[:] = False
+        if len(boxes):
+            cells = np.asarray(boxes, dtype=np.float64) / self.cell
+            x1, y1 = np.floor(cells[:, 0]).astype(np.int64), np.floor(cells[:, 1]).astype(np.int64)
+            x2, y2 = np.ceil(cells[:, 2]).astype(np.int64), np.ceil(cells[:, 3]).astype(np.int64)
+            for bx1, by1, bx2, by2 in zip(np.maximum(x1, 0), np.maximum(y1, 0), x2, y2):
+                covered[by1:by2, bx1:bx2] = True
+        np.add(self.grid, covered, out=self.grid, casting='unsafe')
+        self.frames += 1
+
+    def occupancy(self):
+        """Share of accumulated frames each cell was occupied (0-1)"""
+        return self.grid / max(self.frames, 1)
+
+    def overlay(self, frame, alpha=0.5):
+        """Heatmap blended over a frame for display"""
+        heat = cv2.resize((self.occupancy() * 255).astype(np.uint8), (frame.shape[1], frame.shape[0]),
+                          interpolation=cv2.INTER_NEAREST)
+        return cv2.addWeighted(frame, 1 - alpha, cv2.applyColorMap(heat, cv2.COLORMAP_JET), alpha, 0)
@@ -0,0 +1,151 @@
+import sqlite3
+import threading
+import time
+
+# --- Constants ---
+HISTORY_DB = 'traffic_history.db'
+FLUSH_ROWS = 500
+FLUSH_SECONDS = 2.0
+
+TABLES = {
+    "road_metrics": ("ts", "road", "vehicles", "cars", "motorcycles", "buses", "trucks",
+                     "unused_area", "speed_kmh", "co2", "nox", "pm25", "frame_id"),
+    "detections": ("ts", "road", "cls", "conf", "x1", "y1", "x2", "y2"),
+    "signal_phases": ("ts", "road", "state", "duration", "frame_id"),
+    "heatmaps": ("ts", "road", "cell", "frames", "grid_rows", "grid_cols", "grid"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS road_metrics(
+    ts REAL NOT NULL, road INTEGER NOT NULL, vehicles INTEGER,
+    cars INTEGER, motorcycles INTEGER, buses INTEGER, trucks INTEGER, unused_area REAL,
+    speed_kmh REAL, co2 REAL, nox REAL, pm25 REAL, frame_id INTEGER);
+CREATE TABLE IF NOT EXISTS detections(
+    ts REAL NOT NULL, road INTEGER NOT NULL, cls INTEGER, conf REAL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER);
+CREATE TABLE IF NOT EXISTS signal_phases(
+    ts REAL NOT NULL, road INTEGER NOT NULL, state TEXT, duration REAL, frame_id INTEGER);
+CREATE TABLE IF NOT EXISTS heatmaps(
+    ts REAL NOT NULL, road INTEGER NOT NULL, cell INTEGER, frames INTEGER,
+    grid_rows INTEGER, grid_cols INTEGER, grid BLOB);
+CREATE INDEX IF NOT EXISTS idx_road_metrics_ts ON road_metrics(ts);
+CREATE INDEX IF NOT EXISTS idx_road_metrics_road_ts ON road_metrics(road, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections(ts);
+CREATE INDEX IF NOT EXISTS idx_detections_road_ts ON detections(road, ts);
+CREATE INDEX IF NOT EXISTS idx_signal_phases_ts ON signal_phases(ts);
+CREATE INDEX IF NOT EXISTS idx_heatmaps_road_ts ON heatmaps(road, ts);
+"""
+
+
+class HistoryStore:
+    """SQLite store for per-road metrics, detections and signal phases"""
+
+    def __init__(self, path=HISTORY_DB, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._pending = {table: [] for table in TABLES}
+        self._pending_count = 0
+        self._last_flush = time.time()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.commit()
+
+    def _migrate(self):
+        """Add columns introduced after a history database was created"""
+        for table, columns in TABLES.items():
+            existing = {row[1] for row in self._conn.execute(f'PRAGMA table_info({table})')}
+            for column in columns:
+                if column not in existing:
+                    self._conn.execute(f'ALTER TABLE {table} ADD COLUMN {column}')
+
+    # --- Writing ---
+    def _append(self, table, rows):
+        with self._lock:
+            self._pending[table].extend(rows)
+            self._pending_count += len(rows)
+            due = (self._pending_count >= self.flush_rows
+                   or time.time() - self._last_flush >= self.flush_seconds)
+        if due:
+            self.flush()
+
+    def record_metrics(self, ts, road, class_counts, unused_area, emis, speed_kmh=None, frame_id=None):
+        """class_counts: cars, motorcycles, buses, trucks; frame_id: the traced frame they came from"""
+        cars, motorcycles, buses, trucks = (int(n) for n in class_counts)
+        if speed_kmh is not None and speed_kmh != speed_kmh:  # nan: no estimate this tick
+            speed_kmh = None
+        self._append("road_metrics", [(ts, road, cars + motorcycles + buses + trucks,
+                                       cars, motorcycles, buses, trucks, unused_area, speed_kmh,
+                                       emis['CO2'], emis['NOx'], emis['PM2.5'], frame_id)])
+
+    def record_detections(self, ts, road, rows):
+        """rows: iterable of (cls, conf, x1, y1, x2, y2)"""
+        self._append("detections", [(ts, road, *row) for row in rows])
+
+    def record_phase(self, ts, road, state, duration, frame_id=None):
+        """frame_id: the frame whose counts decided the phase"""
+        self._append("signal_phases", [(ts, road, state, duration, frame_id)])
+
+    def record_heatmap(self, ts, road, heatmap):
+        """Snapshot of an OccupancyHeatmap; the grid is stored as little-endian uint32"""
+        rows, cols = heatmap.grid.shape
+        self._append("heatmaps", [(ts, road, heatmap.cell, heatmap.frames, rows, cols,
+                                   heatmap.grid.astype('<u4').tobytes())])
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {table: [] for table in TABLES}
+            self._pending_count = 0
+            self._last_flush = time.time()
+            for table, rows in pending.items():
+                if rows:
+                    placeholders = ", ".join("?" * len(TABLES[table]))
+                    self._conn.executemany(
+                        f'INSERT INTO {table}({", ".join(TABLES[table])}) VALUES({placeholders})', rows)
+            self._conn.commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def update_rows(self, table, columns, rows):
+        """rows: iterable of (*values, rowid)"""
+        assignments = ", ".join(f'{column} = ?' for column in columns)
+        with self._lock:
+            self._conn.executemany(f'UPDATE {table} SET {assignments} WHERE rowid = ?', rows)
+            self._conn.commit()
+
+    # --- Reading ---
+    def iter_rows(self, table, start=None, end=None, roads=None, batch_size=5000, columns=None):
+        """Yield batches of rows in timestamp order without loading the table into memory"""
+        if table not in TABLES:
+            raise ValueError(f"Unknown history table: {table}")
+        self.flush()
+
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('ts < ?')
+            params.append(end)
+        if roads:
+            clauses.append(f'road IN ({", ".join("?" * len(roads))})')
+            params.extend(roads)
+        where = f' WHERE {" AND ".join(clauses)}' if clauses else ''
+
+        # A dedicated read connection keeps the live writer unblocked (WAL mode)
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(f'SELECT {", ".join(columns or TABLES[table])} FROM {table}{where} ORDER BY ts', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
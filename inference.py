@@ -0,0 +1,55 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# --- Constants ---
+Detections = namedtuple("Detections", "xyxy cls conf")
+MODEL_STRIDE = 32
+FULL_FRAME_IMGSZ = 640     # YOLO's default input size; a full frame's long side is scaled to it
+CROP_PAD = 8               # pixels kept around the road region
+
+
+def from_results(results, offset=(0, 0)):
+    """Ultralytics results -> Detections arrays, shifted by a crop's (x, y) offset"""
+    boxes = results[0].boxes
+    xyxy = boxes.xyxy.cpu().numpy().astype(np.float64)
+    xyxy[:, [0, 2]] += offset[0]
+    xyxy[:, [1, 3]] += offset[1]
+    return Detections(xyxy, boxes.cls.cpu().numpy().astype(np.int64), boxes.conf.cpu().numpy())
+
+
+def crop_bounds(mask, pad=CROP_PAD):
+    """Bounding (x1, y1, x2, y2) of a region mask, padded; None if it spans the whole frame"""
+    ys, xs = np.nonzero(mask)
+    if not len(xs):
+        return None
+    h, w = mask.shape
+    bounds = (max(0, xs.min() - pad), max(0, ys.min() - pad), min(w, xs.max() + 1 + pad), min(h, ys.max() + 1 + pad))
+    return None if bounds == (0, 0, w, h) else tuple(int(v) for v in bounds)
+
+
+def full_frame_scale(frame_size):
+    """Model pixels per frame pixel when a (width, height) frame is run whole"""
+    return FULL_FRAME_IMGSZ / max(frame_size)
+
+
+def input_size(width, height, scale):
+    """Model input (height, width) for a crop, at `scale` model pixels per frame pixel"""
+    return (max(MODEL_STRIDE, math.ceil(height * scale / MODEL_STRIDE) * MODEL_STRIDE),
+            max(MODEL_STRIDE, math.ceil(width * scale / MODEL_STRIDE) * MODEL_STRIDE))
+
+
+def detect(model, frame, crop=None, scale=None, **kwargs):
+    """Run the detector on the whole frame or only on a crop, boxes in full-frame coordinates
+
+    A crop is run at the frame's full-frame `scale` (taken from the frame
+    when not given), so objects get as many model pixels as they would whole.
+    """
+    if crop is None:
+        return from_results(model(frame, **kwargs))
+    if scale is None:
+        scale = full_frame_scale((frame.shape[1], frame.shape[0]))
+    x1, y1, x2, y2 = crop
+    region = frame[y1:y2, x1:x2]
+    return from_results(model(region, imgsz=input_size(x2 - x1, y2 - y1, scale), **kwargs), offset=(x1, y1))
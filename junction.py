@@ -0,0 +1,50 @@
+import time
+
+from camera_config import MIN_GREEN_SECONDS
+
+
+class SignalController:
+    """Green phases over one junction's approaches, in order, each held for its queue
+
+    Approaches are camera ids. They can be changed while running: the
+    approach that is green stays green if it is still there, otherwise the
+    next phase starts at once.
+    """
+
+    def __init__(self, name, approaches, min_green=MIN_GREEN_SECONDS):
+        self.name = name
+        self.approaches = list(approaches)
+        self.min_green = min_green
+        self.index = 0
+        self.green = None
+        self.duration = min_green
+        self.start = time.time()
+
+    def set_approaches(self, approaches, min_green=None):
+        self.approaches = list(approaches)
+        self.min_green = min_green or self.min_green
+        if self.green in self.approaches:
+            self.index = self.approaches.index(self.green)
+        elif self.green is not None:
+            self.green = None
+            self.duration = 0
+        self.index = min(self.index, max(len(self.approaches) - 1, 0))
+
+    def update(self, demand, now=None):
+        """Advance the phase when its time is up; returns the approach that just turned green, if any"""
+        now = time.time() if now is None else now
+        if not self.approaches or now - self.start < self.duration:
+            return None
+        self.index = (self.index + 1) % len(self.approaches)
+        self.green = self.approaches[self.index]
+        # Green time follows the approach's queue where lanes are configured
+        self.duration = max(self.min_green, demand.get(self.green, 0))
+        self.start = now
+        return self.green
+
+    def state(self, camera_id):
+        return 'green' if camera_id == self.green else 'red'
+
+    def remaining(self, now=None):
+        now = time.time() if now is None else now
+        return int(self.duration - (now - self.start))
@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+
+# --- Constants ---
+MIN_LANE_OVERLAP = 0.3     # share of a box that must lie in a lane to count for it
+QUEUE_SPEED_KMH = 8.0      # slower than this (or unknown) counts as queued
+QUEUE_GAP_M = 10.0         # max gap between queued vehicles, and from the stop line
+QUEUE_GAP_PX = 40.0        # same for uncalibrated cameras
+
+
+def rasterise(polygon, frame_size):
+    w, h = frame_size
+    mask = np.zeros((h, w), np.uint8)
+    cv2.fillPoly(mask, [np.round(np.asarray(polygon)).astype(np.int32)], 1)
+    return mask.astype(bool)
+
+
+def _integral(values):
+    h, w = values.shape[-2:]
+    out = np.zeros(values.shape[:-2] + (h + 1, w + 1))
+    np.cumsum(np.cumsum(values, axis=-2, dtype=np.float64), axis=-1, out=out[..., 1:, 1:])
+    return out
+
+
+class LaneLayout:
+    """Road ROI and lane masks for one camera, rasterised once
+
+    Each lane keeps an integral image of its mask (and of its ground-area
+    weights when calibrated), so every frame's box-vs-lane overlaps are four
+    lookups per box and lane, done for all of them in one vectorized step.
+    """
+
+    def __init__(self, camera, frame_size, calibration=None, weights=None):
+        self.frame_size = tuple(frame_size)
+        self.calibration = calibration
+        scale = np.array(frame_size, dtype=np.float64) / camera["resize"]
+        w, h = self.frame_size
+
+        roi = camera.get("roi")
+        self.roi_mask = rasterise(np.asarray(roi) * scale, frame_size) if roi else np.ones((h, w), bool)
+        lanes = camera.get("lanes") or []
+        self.names = [lane["name"] for lane in lanes]
+        self.lane_masks = np.array([rasterise(np.asarray(lane["polygon"]) * scale, frame_size) & self.roi_mask
+                                    for lane in lanes]).reshape(len(lanes), h, w)
+        self.lane_integral = _integral(self.lane_masks.astype(np.float64))
+        weights = np.ones((h, w)) if weights is None else weights
+        self.area_integral = _integral(self.lane_masks * weights)
+        self.lane_area = self.area_integral[:, -1, -1]
+
+        # Stop lines as (point, unit normal) in ground metres, or pixels when uncalibrated
+        self.stop_lines = []
+        for lane in lanes:
+            line = np.asarray(lane.get("stop_line") or [[0, camera["resize"][1]], camera["resize"]],
+                              dtype=np.float64) * scale
+            if calibration is not None:
+                line = calibration.to_ground(line)
+            direction = line[1] - line[0]
+            normal = np.array([-direction[1], direction[0]]) / np.linalg.norm(direction)
+            self.stop_lines.append((line[0], normal))
+
+    @classmethod
+    def from_config(cls, camera, frame_size, calibration=None, weights=None):
+        if not camera.get("roi") and not camera.get("lanes"):
+            return None
+        return cls(camera, frame_size, calibration, weights)
+
+    def in_roi(self, boxes):
+        """Whether each (N, 4) xyxy box touches the road inside the ROI"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        w, h = self.frame_size
+        x = np.clip(((boxes[:, 0] + boxes[:, 2]) / 2).astype(np.int64), 0, w - 1)
+        y = np.clip(boxes[:, 3].astype(np.int64), 0, h - 1)
+        return self.roi_mask[y, x]
+
+    def _box_sums(self, integral, boxes):
+        w, h = self.frame_size
+        x1, x2 = np.clip(boxes[:, 0], 0, w), np.clip(boxes[:, 2], 0, w)
+        y1, y2 = np.clip(boxes[:, 1], 0, h), np.clip(boxes[:, 3], 0, h)
+        return integral[:, y2, x2] - integral[:, y1, x2] - integral[:, y2, x1] + integral[:, y1, x1]
+
+    def assign(self, boxes):
+        """Lane index for each (N, 4) xyxy box, -1 when it mostly lies outside every lane"""
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        if not len(self.names) or not len(boxes):
+            return np.full(len(boxes), -1)
+        box_area = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 1)
+        share = self._box_sums(self.lane_integral, boxes) / box_area
+        lane = share.argmax(axis=0)
+        return np.where(share.max(axis=0) >= MIN_LANE_OVERLAP, lane, -1)
+
+    def measure(self, boxes, speeds=None):
+        """Per-lane vehicles, occupancy (0-1) and queue (vehicles, metres) for one frame"""
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        lanes = self.assign(boxes)
+        speeds = np.full(len(boxes), np.nan) if speeds is None else np.asarray(speeds, dtype=np.float64)
+        covered = self._box_sums(self.area_integral, boxes) if len(boxes) else np.zeros((len(self.names), 0))
+
+        contact = np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]]).astype(np.float64)
+        if self.calibration is not None and len(contact):
+            contact = self.calibration.to_ground(contact)
+        gap = QUEUE_GAP_M if self.calibration is not None else QUEUE_GAP_PX
+
+        results = []
+        for k, name in enumerate(self.names):
+            members = lanes == k
+            occupancy = min(1.0, covered[k, members].sum() / self.lane_area[k]) if self.lane_area[k] else 0.0
+
+            # Queue: chain of slow vehicles starting at the stop line with no gap above the limit
+            point, normal = self.stop_lines[k]
+            queued = members & ~(speeds >= QUEUE_SPEED_KMH)
+            dist = np.sort(np.abs((contact[queued] - point) @ normal))
+            chain = np.flatnonzero(np.diff(np.concatenate([[0.0], dist])) > gap)
+            length = chain[0] if len(chain) else len(dist)
+            results.append({
+                "name": name,
+                "vehicles": int(members.sum()),
+                "occupancy": float(occupancy),
+                "queue_vehicles": int(length),
+                "queue_m": float(dist[length - 1]) if length and self.calibration is not None else float('nan'),
+            })
+        return results
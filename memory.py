@@ -0,0 +1,166 @@
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# --- Constants ---
+MEMORY_SAMPLE_TICKS = 100
+HISTORY_SAMPLES = 720         # RSS/thread samples kept for the trend
+TRACE_FRAMES = 1
+TOP_LINES = 10
+MIN_TREND_SAMPLES = 10
+RSS_LEAK_MB_PER_HOUR = 50.0
+THREAD_LEAK_GROWTH = 5        # threads more than at the first sample
+LINE_LEAK_BYTES = 10 * 2 ** 20  # one source line holding this much more than when tracing started
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where it can't be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def thread_groups(threads):
+    """Thread counts by name with numbers removed, so 'Thread-12 (speak)' groups with its siblings"""
+    return Counter(re.sub(r"\d+", "N", thread.name) for thread in threads)
+
+
+class MemoryMonitor:
+    """RSS and thread tracking for long runs, with an optional tracemalloc mode
+
+    RSS and live threads are sampled every MEMORY_SAMPLE_TICKS ticks at all
+    times. With diagnostics enabled, tracemalloc also runs: stage laps add
+    the traced memory each stage leaves behind, and each sample compares a
+    snapshot with the one taken when tracing started to list the source
+    lines that grew most. Sustained RSS growth, piling-up threads and single
+    lines holding ever more memory are raised as flags.
+    """
+
+    def __init__(self, sample_ticks=MEMORY_SAMPLE_TICKS):
+        self.sample_ticks = sample_ticks
+        self.samples = deque(maxlen=HISTORY_SAMPLES)
+        self.stage_growth = Counter()
+        self.window_ticks = 0
+        self.top_growth = []
+        self.flags = []
+        self._flag_kinds = set()
+        self._ticks = 0
+        self._baseline = None
+        self._first_threads = None
+
+    @property
+    def enabled(self):
+        return self._baseline is not None
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        self._baseline = self._snapshot()
+        self.stage_growth.clear()
+        self.window_ticks = 0
+
+    def disable(self):
+        self._baseline = None
+        self.top_growth = []
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def traced(self):
+        return tracemalloc.get_traced_memory()[0]
+
+    def record(self, stage, camera, delta):
+        """Bytes a stage left allocated at its end (negative when it freed earlier allocations)"""
+        self.stage_growth[(stage, "all" if camera is None else str(camera))] += delta
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def tick(self):
+        """Call once per tick; samples every sample_ticks ticks"""
+        self._ticks += 1
+        self.window_ticks += 1
+        if self._ticks % self.sample_ticks == 0:
+            self.sample()
+
+    def sample(self):
+        threads = threading.enumerate()
+        traced = self.traced() if self.enabled else None
+        self.samples.append((time.time(), rss_bytes(), len(threads), traced))
+        if self._first_threads is None:
+            self._first_threads = len(threads)
+        if self.enabled:
+            stats = self._snapshot().compare_to(self._baseline, 'lineno')
+            self.top_growth = [(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                                stat.size_diff, stat.count_diff)
+                               for stat in stats[:TOP_LINES] if stat.size_diff > 0]
+
+        flags = self._check(threads)
+        for kind, message in flags.items():
+            if kind not in self._flag_kinds:
+                logger.warning("Possible leak: %s", message)
+        self._flag_kinds = set(flags)
+        self.flags = list(flags.values())
+
+    def stage_table(self):
+        """Per-stage bytes retained per tick since diagnostics were enabled, largest first"""
+        ticks = max(self.window_ticks, 1)
+        rows = [{"stage": stage, "camera": camera, "KB/tick": round(total / ticks / 1024, 2)}
+                for (stage, camera), total in self.stage_growth.items()]
+        return sorted(rows, key=lambda row: -abs(row["KB/tick"]))
+
+    def rss_trend(self):
+        """RSS growth in MB per hour over the kept samples, None with too few"""
+        points = [(ts, rss) for ts, rss, _, _ in self.samples if rss is not None]
+        if len(points) < MIN_TREND_SAMPLES:
+            return None
+        ts, rss = np.array(points, dtype=np.float64).T
+        if ts[-1] - ts[0] <= 0:
+            return None
+        return float(np.polyfit(ts - ts[0], rss, 1)[0]) * 3600 / 2 ** 20
+
+    def _check(self, threads):
+        """Current flags by kind, so a flag is only logged when it first appears"""
+        flags = {}
+        trend = self.rss_trend()
+        if trend is not None and trend > RSS_LEAK_MB_PER_HOUR:
+            flags["rss"] = f"RSS growing {trend:.0f} MB/hour"
+        if len(threads) - self._first_threads >= THREAD_LEAK_GROWTH:
+            name, count = thread_groups(threads).most_common(1)[0]
+            flags["threads"] = f"{len(threads)} threads (started with {self._first_threads}); most are '{name}' x{count}"
+        for location, size_diff, _ in self.top_growth:
+            if size_diff >= LINE_LEAK_BYTES:
+                flags[location] = f"{location} holds {size_diff / 2 ** 20:.0f} MB more than when tracing started"
+        return flags
+
+    def prometheus(self):
+        lines = []
+        if self.samples:
+            _, rss, threads, traced = self.samples[-1]
+            if rss is not None:
+                lines += ["# TYPE traffic_process_rss_bytes gauge", f"traffic_process_rss_bytes {rss}"]
+            lines += ["# TYPE traffic_process_threads gauge", f"traffic_process_threads {threads}"]
+            if traced is not None:
+                lines += ["# TYPE traffic_traced_memory_bytes gauge", f"traffic_traced_memory_bytes {traced}"]
+        lines += ["# TYPE traffic_leak_flags gauge", f"traffic_leak_flags {len(self.flags)}"]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,253 @@
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+METRICS_PORT = 9108
+BUCKETS_PER_DOUBLING = 8      # ~9% wide log buckets, like an HDR histogram at 1 significant digit
+MIN_SECONDS = 1e-6
+BUCKET_COUNT = BUCKETS_PER_DOUBLING * 27   # 1 µs up to ~134 s; slower samples land in the last bucket
+WINDOW_SLICES = 6
+SLICE_SECONDS = 10.0          # rolling percentiles cover the last minute
+EXPORT_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.9, 0.99)
+FrameStamp = namedtuple("FrameStamp", "frame_id camera captured decoded")
+
+# Upper edge of every bucket, in seconds
+BUCKET_EDGES = MIN_SECONDS * 2.0 ** (np.arange(1, BUCKET_COUNT + 1) / BUCKETS_PER_DOUBLING)
+
+
+def bucket_index(seconds):
+    if seconds <= MIN_SECONDS:
+        return 0
+    return min(BUCKET_COUNT - 1, int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_DOUBLING))
+
+
+class LatencyHistogram:
+    """Log-bucketed latency counts: all-time totals plus a rolling window
+
+    The window is a ring of WINDOW_SLICES sub-histograms; recording is one
+    log2 and two array increments, and the oldest slice is cleared as time
+    moves on rather than storing individual samples.
+    """
+
+    def __init__(self):
+        self.total = np.zeros(BUCKET_COUNT, dtype=np.int64)
+        self.sum = 0.0
+        self.max = 0.0
+        self.window = np.zeros((WINDOW_SLICES, BUCKET_COUNT), dtype=np.int64)
+        self.slice_id = int(time.monotonic() // SLICE_SECONDS)
+
+    def _rotate(self, now):
+        slice_id = int(now // SLICE_SECONDS)
+        for stale in range(max(self.slice_id + 1, slice_id - WINDOW_SLICES + 1), slice_id + 1):
+            self.window[stale % WINDOW_SLICES] = 0
+        self.slice_id = max(self.slice_id, slice_id)
+
+    def record(self, seconds, now=None):
+        now = time.monotonic() if now is None else now
+        if now // SLICE_SECONDS != self.slice_id:
+            self._rotate(now)
+        index = bucket_index(seconds)
+        self.total[index] += 1
+        self.window[self.slice_id % WINDOW_SLICES, index] += 1
+        self.sum += seconds
+        self.max = max(self.max, float(seconds))
+
+    def count(self):
+        return int(self.total.sum())
+
+    def merge(self, other):
+        """Add another histogram's samples, e.g. to total one stage over many cameras"""
+        self.total += other.total
+        self.window += other.window
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantiles(self, quantiles=QUANTILES, now=None, all_time=False):
+        """Window (or all-time) quantiles in seconds (bucket upper edges), NaN when empty"""
+        if all_time:
+            counts = np.cumsum(self.total)
+        else:
+            self._rotate(time.monotonic() if now is None else now)
+            counts = np.cumsum(self.window.sum(axis=0))
+        if not counts[-1]:
+            return [float('nan')] * len(quantiles)
+        return [float(BUCKET_EDGES[np.searchsorted(counts, q * counts[-1])]) for q in quantiles]
+
+    def cumulative(self, bounds=EXPORT_BOUNDS):
+        """All-time counts at or below each bound, for Prometheus `le` buckets"""
+        counts = np.cumsum(self.total)
+        return [int(counts[np.searchsorted(BUCKET_EDGES, bound, side='right') - 1]) if bound >= BUCKET_EDGES[0] else 0
+                for bound in bounds]
+
+
+class Laps:
+    """Times consecutive stages of one camera's tick: each lap() closes the stage just finished"""
+
+    def __init__(self, registry, camera=None):
+        self.registry = registry
+        self.camera = camera
+        # With memory diagnostics on, each lap also books the traced memory the stage left behind
+        self.memory = registry.memory if registry.memory is not None and registry.memory.enabled else None
+        self.traced = self.memory.traced() if self.memory is not None else 0
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.registry.record(stage, now - self.last, self.camera)
+        self.last = now
+        if self.memory is not None:
+            traced = self.memory.traced()
+            self.memory.record(stage, self.camera, traced - self.traced)
+            self.traced = traced
+
+
+class StageMetrics:
+    """Latency histograms per (stage, camera) for the live pipeline"""
+
+    def __init__(self, name="traffic_stage_seconds", description="Pipeline stage latency.", memory=None):
+        self.name = name
+        self.description = description
+        self.memory = memory
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, camera=None):
+        key = (stage, "all" if camera is None else str(camera))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def laps(self, camera=None):
+        return Laps(self, camera)
+
+    def table(self):
+        """Rows of window p50/p90/p99 and all-time max in milliseconds, for the dashboard"""
+        with self._lock:
+            items = sorted(self.histograms.items())
+            rows = []
+            for (stage, camera), histogram in items:
+                p50, p90, p99 = histogram.quantiles()
+                rows.append({"stage": stage, "camera": camera, "count": histogram.count(),
+                             "p50 ms": round(p50 * 1000, 2), "p90 ms": round(p90 * 1000, 2),
+                             "p99 ms": round(p99 * 1000, 2), "max ms": round(histogram.max * 1000, 2)})
+        return rows
+
+    def prometheus(self):
+        """Prometheus text exposition of every histogram"""
+        name = self.name
+        lines = [f"# HELP {name} {self.description}", f"# TYPE {name} histogram"]
+        window = [f"# HELP {name}_window Quantiles of {name} over the last minute.",
+                  f"# TYPE {name}_window gauge"]
+        with self._lock:
+            for (stage, camera), histogram in sorted(self.histograms.items()):
+                labels = f'stage="{stage}",camera="{camera}"'
+                for bound, count in zip(EXPORT_BOUNDS, histogram.cumulative()):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count()}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{{labels}}} {histogram.count()}')
+                for q, value in zip(QUANTILES, histogram.quantiles()):
+                    if not math.isnan(value):
+                        window.append(f'{name}_window{{{labels},quantile="{q}"}} {value:.6f}')
+        return "\n".join(lines + window) + "\n"
+
+
+class FrameTracer:
+    """Frame ids and capture times, so a frame's age can be taken at every stage
+
+    Video files carry their own clock: a clip is treated as a live feed that
+    started when its first frame was read, so a pipeline slower than the
+    clip's frame rate shows up as frames getting older. Sources without a
+    clock are stamped when read. Drops are counted per point: failed reads,
+    and gaps in the source's frame numbers.
+    """
+
+    def __init__(self):
+        self.ages = StageMetrics("traffic_frame_age_seconds", "Time since capture when a frame reaches each stage.")
+        self.drops = {}
+        self.next_id = 1
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def capture(self, camera, position=None, frame_index=None):
+        """Stamp a just-decoded frame; position is the source clock in seconds, frame_index its frame number"""
+        now = time.time()
+        with self._lock:
+            origin, last_position, last_index = self._sources.get(camera, (None, None, None))
+            if frame_index is not None and last_index is not None and frame_index > last_index + 1:
+                self._drop("source", camera, int(frame_index - last_index - 1))
+            if position:
+                # Re-anchor on the first frame, when a clip loops, and if the clip runs ahead of real time
+                if origin is None or position < last_position or origin + position > now:
+                    origin = now - position
+                captured = origin + position
+            else:
+                captured = now
+            self._sources[camera] = (origin, position, frame_index)
+            stamp = FrameStamp(self.next_id, camera, captured, now)
+            self.next_id += 1
+        self.ages.record("decoded", now - captured, camera)
+        return stamp
+
+    def reached(self, stamp, stage):
+        """Record the frame's age on reaching a stage; returns it in seconds"""
+        age = time.time() - stamp.captured
+        self.ages.record(stage, age, stamp.camera)
+        return age
+
+    def _drop(self, point, camera, count):
+        key = (point, str(camera))
+        self.drops[key] = self.drops.get(key, 0) + count
+
+    def drop(self, point, camera, count=1):
+        with self._lock:
+            self._drop(point, camera, count)
+
+    def prometheus(self):
+        lines = ["# HELP traffic_frames_dropped_total Frames lost before processing, by point.",
+                 "# TYPE traffic_frames_dropped_total counter"]
+        with self._lock:
+            for (point, camera), count in sorted(self.drops.items()):
+                lines.append(f'traffic_frames_dropped_total{{point="{point}",camera="{camera}"}} {count}')
+        return self.ages.prometheus() + "\n".join(lines) + "\n"
+
+
+def start_metrics_server(sources, port=METRICS_PORT, host="127.0.0.1"):
+    """Serve /metrics from each source's prometheus() on a daemon thread; None if the port is taken"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = "".join(source.prometheus() for source in sources).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError:
+        logger.warning("Metrics endpoint not started: port %d is in use", port)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Metrics at http://%s:%d/metrics", host, port)
+    return server
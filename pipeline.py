@@ -0,0 +1,164 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from calibration import CameraCalibration
+from emissions import VEHICLE_CLASSES, class_counts, compute_emissions, emissions_dict
+from ground_area import GroundAreaMap
+from heatmap import OccupancyHeatmap
+from inference import Detections, crop_bounds, detect, full_frame_scale
+from lanes import LaneLayout
+from metrics import FrameTracer, StageMetrics
+from supervisor import CameraSource
+from tiling import TiledDetector, merge_detections
+from tracking import SpeedEstimator, road_speed
+
+# --- Constants ---
+FRAME_SIZE = (400, 225)
+PIXEL_TO_M2_FACTOR = 0.05
+
+CameraResult = namedtuple("CameraResult", "frame stamp count counts_by_class boxes speed lanes demand "
+                                          "emissions unused detections")
+
+
+def calculate_unused_area(frame, vehicle_boxes):
+    h, w, _ = frame.shape
+    mask = np.zeros((h, w), np.uint8)
+    for box in vehicle_boxes:
+        x1, y1, x2, y2 = map(int, box)
+        mask[y1:y2, x1:x2] = 1
+    return np.sum(mask == 0) * PIXEL_TO_M2_FACTOR
+
+
+def filter_vehicles(det, lanes=None, classes=VEHICLE_CLASSES):
+    """Detections of the counted classes, inside the road ROI when there is one"""
+    vehicles = np.isin(det.cls, classes)
+    if lanes is not None:
+        vehicles &= lanes.in_roi(det.xyxy)
+    return Detections(det.xyxy[vehicles], det.cls[vehicles], det.conf[vehicles])
+
+
+def draw_detections(frame, det):
+    """Draw boxes on the frame; returns (cls, conf, x1, y1, x2, y2) rows for the history store"""
+    detections = []
+    for cls, conf, box in zip(det.cls, det.conf, det.xyxy):
+        x1, y1, x2, y2 = map(int, box)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        detections.append((int(cls), float(conf), x1, y1, x2, y2))
+    return detections
+
+
+class CameraPipeline:
+    """One camera's per-frame processing, from decode to per-road metrics
+
+    Holds everything configured once per camera (calibration, area map,
+    lanes and ROI crop, far-field tiles, speed tracker, heatmap) and runs a
+    frame through it in step(). Each stage is timed in `metrics` and the
+    frame's age taken in `tracer`, so the live dashboard and the benchmarks
+    measure the same code.
+    """
+
+    def __init__(self, camera, model, road, tile_budget=None, heatmap=None, history=None,
+                 metrics=None, tracer=None, frame_size=None, supervisor=None):
+        self.camera = camera
+        self.model = model
+        self.road = road
+        self.frame_size = tuple(frame_size or camera.get("resize") or FRAME_SIZE)
+        # COCO class ids counted on this camera; defaults to every vehicle class
+        self.classes = camera.get("classes") or VEHICLE_CLASSES
+        self.history = history
+        self.metrics = metrics if metrics is not None else StageMetrics()
+        self.tracer = tracer if tracer is not None else FrameTracer()
+        self.last = None
+
+        # Ground-plane calibration for speeds and metric areas (None: uncalibrated)
+        calibration = CameraCalibration.from_config(camera)
+        self.calibration = calibration.for_size(self.frame_size) if calibration else None
+        self.speed_estimator = SpeedEstimator(self.calibration) if self.calibration else None
+        area_map = (GroundAreaMap.load(camera["name"], self.calibration, self.frame_size)
+                    if self.calibration else None)
+
+        # Road ROI and lanes: counts, unused area and queues only look at road pixels
+        self.lanes = LaneLayout.from_config(camera, self.frame_size, self.calibration,
+                                            area_map.weights if area_map else None)
+        if self.lanes is not None:
+            area_map = (area_map.within(self.lanes.roi_mask) if area_map is not None
+                        else GroundAreaMap.uniform(self.lanes.roi_mask, PIXEL_TO_M2_FACTOR))
+        self.area_map = area_map
+        # Inference only runs on the bounding crop of the road region
+        self.crop = crop_bounds(self.lanes.roi_mask) if self.lanes is not None else None
+        # ...at the scale the whole frame would run at, whatever size this camera resizes to
+        self.input_scale = full_frame_scale(self.frame_size)
+        # Optional high-resolution tiles over distant road, within a shared tiles-per-second budget
+        self.tiler = TiledDetector(camera, tile_budget) if tile_budget is not None else None
+        self.heatmap = heatmap if heatmap is not None else OccupancyHeatmap(self.frame_size)
+        # Opened last, so a camera whose settings fail above never takes over (and releases) a running source.
+        # Supervised: a missing or failing feed reads as no frame and reconnects in the background
+        self.cap = (supervisor.open(road, camera["source"]) if supervisor is not None
+                    else CameraSource(camera["source"], road))
+
+    def read(self):
+        """Next source frame and its trace stamp, or (None, None) while the source is degraded"""
+        ret, frame = self.cap.read()
+        if not ret:
+            if self.cap.state != "connecting":
+                self.tracer.drop("read", self.road)
+            return None, None
+        stamp = self.tracer.capture(self.road, self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000,
+                                    self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        return frame, stamp
+
+    def step(self, tick_ts, tiled=False):
+        """Process the next frame; None when the camera has no frame to give"""
+        laps = self.metrics.laps(self.road)
+        source, stamp = self.read()
+        laps.lap("read")
+        if source is None:
+            return None
+        frame = cv2.resize(source, self.frame_size)
+        laps.lap("resize")
+        det = detect(self.model, frame, self.crop, self.input_scale)
+        laps.lap("inference")
+        if tiled and self.tiler is not None and self.tiler.regions:
+            tiles = self.tiler.detect(self.model, source, self.frame_size)
+            if tiles:
+                det = merge_detections([det] + tiles)
+            laps.lap("tiles")
+        self.tracer.reached(stamp, "detected")
+
+        vehicles = filter_vehicles(det, self.lanes, self.classes)
+        vehicle_boxes = vehicles.xyxy
+        counts_by_class = class_counts(vehicles.cls)
+        count = int(counts_by_class.sum())
+
+        speed, vehicle_speeds = float('nan'), None
+        if self.speed_estimator is not None:
+            # Video time when the source has it, so looping clips give real speeds
+            frame_ts = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000 or tick_ts
+            vehicle_speeds = self.speed_estimator.update(vehicle_boxes, frame_ts)
+            speed = road_speed(vehicle_speeds)
+
+        self.heatmap.add(vehicle_boxes, tick_ts)
+
+        lanes = self.lanes.measure(vehicle_boxes, vehicle_speeds) if self.lanes else []
+        demand = sum(lane["queue_vehicles"] for lane in lanes) if lanes else count
+        laps.lap("analysis")
+
+        detections = draw_detections(frame, vehicles)
+        laps.lap("boxes")
+        emis = emissions_dict(compute_emissions(counts_by_class, speed))
+        if self.area_map is not None:
+            unused = self.area_map.free_area(vehicle_boxes)
+        else:
+            unused = calculate_unused_area(frame, vehicle_boxes)
+        laps.lap("unused_area")
+
+        if self.history is not None:
+            self.history.record_metrics(tick_ts, self.road, counts_by_class, unused, emis, speed, stamp.frame_id)
+            self.history.record_detections(tick_ts, self.road, detections)
+            self.tracer.reached(stamp, "metrics")
+            laps.lap("history")
+        self.last = CameraResult(frame, stamp, count, counts_by_class, vehicle_boxes, speed, lanes, demand,
+                                 emis, unused, detections)
+        return self.last
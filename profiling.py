@@ -0,0 +1,167 @@
+import cProfile
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+PROFILE_DIR = 'profiles'
+PROFILE_TICKS = 100
+PROFILE_MODES = ("cprofile", "sampling")
+SAMPLE_INTERVAL = 0.005       # seconds between stack samples
+TRIGGER_FILE = 'request'      # touch profiles/request (optionally "<ticks> <mode>") to start a capture
+TRIGGER_POLL_SECONDS = 1.0
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a timer, as collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class TickProfiler:
+    """Profiles the next N ticks of a running loop, on request
+
+    request() arms a capture (from a dashboard button, a signal handler or
+    the trigger file); the loop calls tick() at the top of every tick, which
+    starts and stops the capture on tick boundaries. Every capture writes a
+    timestamped profile (cProfile .prof, or a sample summary in sampling
+    mode) and a .collapsed stack file for flame graph tools. A stack sampler
+    runs in both modes, since cProfile alone has no full call stacks.
+    """
+
+    def __init__(self, out_dir=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.last_files = []
+        self._requested = None
+        self._active = None
+        self._last_poll = 0.0
+
+    @property
+    def active(self):
+        return self._active is not None
+
+    def request(self, ticks=PROFILE_TICKS, mode="cprofile"):
+        # A single assignment, so this is safe to call from a signal handler
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self._requested = (ticks, mode)
+
+    def _poll_trigger(self):
+        now = time.monotonic()
+        if now - self._last_poll < TRIGGER_POLL_SECONDS:
+            return
+        self._last_poll = now
+        path = os.path.join(self.out_dir, TRIGGER_FILE)
+        try:
+            with open(path, "r", encoding='utf-8') as f:
+                words = f.read().split()
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        try:
+            self.request(int(words[0]) if words else PROFILE_TICKS, words[1] if len(words) > 1 else "cprofile")
+        except ValueError:
+            logger.warning("Ignoring profile trigger %r", " ".join(words))
+
+    def tick(self):
+        """Call at the start of every tick"""
+        self._poll_trigger()
+        if self._active is not None:
+            self._active["remaining"] -= 1
+            if self._active["remaining"] <= 0:
+                self._finish()
+        if self._active is None and self._requested is not None:
+            (ticks, mode), self._requested = self._requested, None
+            self._start(ticks, mode)
+
+    def _start(self, ticks, mode):
+        sampler = _StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        profile = None
+        if mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+        self._active = {"mode": mode, "ticks": ticks, "remaining": ticks, "started": time.time(),
+                        "sampler": sampler, "profile": profile}
+        logger.info("Profiling the next %d ticks (%s)", ticks, mode)
+
+    def _finish(self):
+        active, self._active = self._active, None
+        if active["profile"] is not None:
+            active["profile"].disable()
+        active["sampler"].stop()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(active['started']))}"
+                                          f"-{active['ticks']}ticks-{active['mode']}")
+        stacks = active["sampler"].stacks
+        with open(base + ".collapsed", "w", encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        if active["profile"] is not None:
+            active["profile"].dump_stats(base + ".prof")
+            self.last_files = [base + ".prof", base + ".collapsed"]
+        else:
+            self._write_summary(base + ".txt", stacks)
+            self.last_files = [base + ".txt", base + ".collapsed"]
+        logger.info("Profile written to %s", ", ".join(self.last_files))
+
+    def _write_summary(self, path, stacks):
+        """Top functions by samples on-CPU (self) and on the stack (total)"""
+        own, total = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        samples = sum(stacks.values()) or 1
+        with open(path, "w", encoding='utf-8') as f:
+            f.write(f"{samples} samples every {self.interval * 1000:.0f} ms\n\n  self%  total%  function\n")
+            for name, _ in total.most_common(40):
+                f.write(f"{100 * own[name] / samples:7.1f} {100 * total[name] / samples:7.1f}  {name}\n")
+
+
+def install_signal_handler(profiler, signum=None):
+    """Start a capture on SIGUSR1 (kill -USR1 <pid>); False where signals can't be installed
+
+    Python only installs handlers from the main thread, which is not the
+    one Streamlit runs scripts on; the trigger file works everywhere.
+    """
+    signum = signum or getattr(signal, "SIGUSR1", None)
+    if signum is None:
+        return False
+    try:
+        signal.signal(signum, lambda *_: profiler.request())
+    except ValueError:
+        return False
+    return True
@@ -1,13 +1,23 @@
-import cv2
+import logging
 import numpy as np
-from ultralytics import YOLO
 import time
 import streamlit as st
-import pyttsx3
 import threading
-import sqlite3
 import os
 
+from camera_config import ConfigWatcher
+from dispersion import DispersionGrid
+from congestion import CongestionDetector, drain_events
+from history import HistoryStore
+from junction import SignalController
+from memory import MemoryMonitor
+from metrics import FrameTracer, StageMetrics, start_metrics_server
+from profiling import PROFILE_TICKS, TickProfiler, install_signal_handler
+from startup import get_auth_service, get_model_loader, get_speech_worker, load_model
+from tiling import TileBudget
+
+logger = logging.getLogger(__name__)
+
 # --- Constants ---
 PLANT_SUGGESTIONS = {
     "Low": {"plants": "Lavender, Aloe Vera, Snake Plant", "reduction": 5},
@@ -15,8 +25,13 @@ PLANT_SUGGESTIONS = {
     "High": {"plants": "Areca Palm, Boston Fern, Rubber Plant", "reduction": 20},
     "Severe": {"plants": "Areca Palm, Boston Fern, Rubber Plant", "reduction": 30},
 }
-EMISSION_FACTORS = {"CO2": 120, "NOx": 0.6, "PM2.5": 0.005}
-PIXEL_TO_M2_FACTOR = 0.05
+HEATMAP_SNAPSHOT_SECONDS = 600
+HEATMAP_REFRESH_SECONDS = 5
+PLANNER_REFRESH_SECONDS = 10
+DISPERSION_REFRESH_SECONDS = 5
+LATENCY_REFRESH_SECONDS = 2
+HEATMAP_COLUMNS = 4
+CO2_PER_CAR = 120.0   # g/km, to turn a site's nearby emissions into a car-equivalent pollution level
 
 
 def simple_summarizer(text, max_length=100):
@@ -54,16 +69,6 @@ def get_pollution_info(count):
     return count * 0.2, level, air, PLANT_SUGGESTIONS[level]["plants"], PLANT_SUGGESTIONS[level]["reduction"]
 
 
-def calculate_unused_area(frame, results):
-    h, w, _ = frame.shape
-    mask = np.zeros((h, w), np.uint8)
-    for r in results[0].boxes:
-        if int(r.cls) in [2, 3, 5, 7]:
-            x1, y1, x2, y2 = map(int, r.xyxy[0])
-            mask[y1:y2, x1:x2] = 1
-    return np.sum(mask == 0) * PIXEL_TO_M2_FACTOR
-
-
 def traffic_light_html(state, rem):
     top_color = "#ff4444" if state == "red" else "#333333"
     bottom_color = "#44ff44" if state == "green" else "#333333"
@@ -89,21 +94,125 @@ def traffic_light_html(state, rem):
     """
 
 
-def generate_summary(idx, counts, unused, emis, plants):
-    summary = f"Road {idx + 1}: {counts[idx]} vehicles detected, {unused[idx]:.1f}m² unused area, {plants[idx][1]} air quality. Plants recommended: {plants[idx][3][:50]}..."
+def site_html(site, planters):
+    """Plants-card line for the top-ranked planter site, if there is one yet"""
+    if site is None:
+        return ""
+    x1, y1, x2, y2 = site["box"]
+    return (f"<div><strong>Site #{site['id']}:</strong> {site['area_m2']:.0f} m² free at "
+            f"({(x1 + x2) // 2}, {(y1 + y2) // 2}), {planters} planters</div>")
 
-    def speak():
-        try:
-            engine = pyttsx3.init()
-            engine.say(summary)
-            engine.runAndWait()
-        except:
-            pass
 
-    threading.Thread(target=speak).start()
+def generate_summary(road, count, unused, plants):
+    summary = f"{road}: {count} vehicles detected, {unused:.1f}m² unused area, {plants[1]} air quality. Plants recommended: {plants[3][:50]}..."
+
+    get_speech_worker().say(summary, key="summary")
     return summary
 
 
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+
+def get_congestion_detector():
+    # Per browser session, kept across its reruns: every open dashboard runs its own camera loop,
+    # so a shared detector would be fed once per viewer each tick. Roads follow the configured cameras
+    if "congestion_detector" not in st.session_state:
+        st.session_state.congestion_detector = CongestionDetector(0)
+    return st.session_state.congestion_detector
+
+
+@st.cache_resource
+def get_frame_tracer():
+    return FrameTracer()
+
+
+@st.cache_resource
+def get_memory_monitor():
+    return MemoryMonitor()
+
+
+@st.cache_resource
+def get_camera_supervisor():
+    from supervisor import CameraSupervisor
+    return CameraSupervisor()
+
+
+@st.cache_resource
+def get_stage_metrics():
+    # Cached so histograms and the /metrics endpoint outlive reruns
+    metrics = StageMetrics(memory=get_memory_monitor())
+    start_metrics_server([metrics, get_frame_tracer(), metrics.memory, get_camera_supervisor()])
+    return metrics
+
+
+@st.cache_resource
+def get_tick_profiler():
+    # Also armed by SIGUSR1 where the handler can be installed, or by touching profiles/request
+    profiler = TickProfiler()
+    install_signal_handler(profiler)
+    return profiler
+
+
+def get_camera_state():
+    """This session's pipelines, planners, signal controllers, heatmaps and tile budget
+
+    Kept in the session, not the process: each open dashboard runs its own
+    loop, so shared heatmaps would count every frame once per viewer. Kept
+    across reruns, so sources stay open and occupancy keeps accumulating;
+    heatmaps are keyed by (camera id, frame size).
+    """
+    if "camera_state" not in st.session_state:
+        st.session_state.camera_state = {"pipelines": {}, "planners": {}, "controllers": {}, "heatmaps": {},
+                                         "tile_budget": TileBudget()}
+    return st.session_state.camera_state
+
+
+def road_name(cameras, camera_id):
+    camera = cameras.get(camera_id)
+    return camera["name"] if camera else f"Camera {camera_id}"
+
+
+def sync_pipelines(cameras, pipelines, planners, heatmaps, model, tile_budget, history, metrics, tracer,
+                   supervisor):
+    """Start pipelines for new or edited cameras and stop those no longer configured"""
+    # The camera stack pulls in OpenCV, which the login page doesn't need
+    from greening import GreeningPlanner
+    from heatmap import OccupancyHeatmap
+    from pipeline import PIXEL_TO_M2_FACTOR, CameraPipeline
+
+    for camera_id in [camera_id for camera_id in pipelines if camera_id not in cameras]:
+        pipelines.pop(camera_id).cap.release()
+        planners.pop(camera_id, None)
+    for camera_id, camera in list(cameras.items()):
+        if camera_id in pipelines and pipelines[camera_id].camera == camera:
+            continue
+        size = tuple(camera["resize"])
+        try:
+            heatmap = heatmaps.get((camera_id, size)) or OccupancyHeatmap(size)
+            pipeline = CameraPipeline(camera, model, camera_id, tile_budget, heatmap, history, metrics, tracer,
+                                      supervisor=supervisor)
+        except Exception as exc:
+            # A camera whose settings can't be applied keeps running as it was, or stays off if it is new
+            logger.warning("Camera %s not (re)started: %s", camera_id, exc)
+            if camera_id in pipelines:
+                cameras[camera_id] = pipelines[camera_id].camera
+            else:
+                del cameras[camera_id]
+            continue
+        heatmaps[(camera_id, size)] = heatmap
+        if camera_id in pipelines:
+            pipelines[camera_id].cap.release()
+        pipelines[camera_id] = pipeline
+        # Planter sites come from free space accumulated over time, not from a single frame
+        planners[camera_id] = GreeningPlanner(
+            heatmap.cell, heatmap.grid.shape,
+            road_mask=pipeline.lanes.roi_mask if pipeline.lanes is not None else None,
+            weights=pipeline.area_map.weights if pipeline.area_map is not None else None,
+            pixel_area=PIXEL_TO_M2_FACTOR)
+
+
 def play_alert_sound():
     """Play alert sound for high traffic"""
 
@@ -117,7 +226,7 @@ def play_alert_sound():
     threading.Thread(target=play_sound).start()
 
 
-def check_login():
+def check_login(started=None):
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
 
@@ -128,11 +237,16 @@ def check_login():
         st.session_state.fullscreen_mode = False
     if "sound_alerts" not in st.session_state:
         st.session_state.sound_alerts = True
+    if "tiled_inference" not in st.session_state:
+        st.session_state.tiled_inference = False
+    if "show_latency" not in st.session_state:
+        st.session_state.show_latency = False
+    if "memory_diagnostics" not in st.session_state:
+        st.session_state.memory_diagnostics = False
 
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS users(username TEXT, password TEXT)')
-    conn.commit()
+    auth = get_auth_service()
+    if st.session_state.logged_in and auth.session_user(st.session_state.get("auth_token")) is None:
+        st.session_state.logged_in = False  # session expired
 
     if not st.session_state.logged_in:
         load_css()
@@ -166,9 +280,10 @@ def check_login():
         with col2:
             if st.button("🚀 Access Dashboard"):
                 if username and password:
-                    c.execute('SELECT * FROM users WHERE username = ? AND password = ?', (username, password))
-                    if c.fetchone():
+                    token = auth.login(username, password)
+                    if token:
                         st.session_state.logged_in = True
+                        st.session_state.auth_token = token
                         st.session_state.username = username
                         st.rerun()
                     else:
@@ -177,7 +292,8 @@ def check_login():
                     st.error("⚠️ Please enter credentials")
 
         st.markdown("</div>", unsafe_allow_html=True)
-        conn.close()
+        if started is not None:
+            get_model_loader().record("login page", started)
         st.stop()
 
 
@@ -189,7 +305,7 @@ def settings_panel():
     </div>
     """, unsafe_allow_html=True)
 
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5, col6, col7, col8 = st.columns(8)
 
     with col1:
         if st.button("🌙 Dark Mode" if not st.session_state.dark_mode else "☀️ Light Mode"):
@@ -207,7 +323,37 @@ def settings_panel():
             st.rerun()
 
     with col4:
+        if st.button("🔬 Far-field Tiles ON" if st.session_state.tiled_inference else "🔬 Far-field Tiles OFF"):
+            st.session_state.tiled_inference = not st.session_state.tiled_inference
+            st.rerun()
+
+    with col5:
+        if st.button("📈 Latency ON" if st.session_state.show_latency else "📈 Latency OFF"):
+            st.session_state.show_latency = not st.session_state.show_latency
+            st.rerun()
+
+    with col6:
+        profiler = get_tick_profiler()
+        if st.button("🧪 Profiling..." if profiler.active else f"🧪 Profile {PROFILE_TICKS} ticks",
+                     disabled=profiler.active):
+            profiler.request()
+        if profiler.last_files:
+            st.caption(f"Last profile: {profiler.last_files[0]}")
+
+    with col7:
+        if st.button("🧠 Memory ON" if st.session_state.memory_diagnostics else "🧠 Memory OFF"):
+            st.session_state.memory_diagnostics = not st.session_state.memory_diagnostics
+            # tracemalloc slows every allocation, so it only runs while diagnostics are shown
+            if st.session_state.memory_diagnostics:
+                get_memory_monitor().enable()
+            else:
+                get_memory_monitor().disable()
+            st.rerun()
+
+    with col8:
         if st.button("🚪 Logout"):
+            # End the server-side session too, not just this browser's flag
+            get_auth_service().logout(st.session_state.pop("auth_token", None))
             st.session_state.logged_in = False
             st.rerun()
 
@@ -275,146 +421,342 @@ def run_dashboard():
     """, unsafe_allow_html=True)
 
     # Main dashboard functionality
-    model = YOLO('yolov8n.pt')
-    caps = [cv2.VideoCapture(f'Road_{i + 1}.mp4') for i in range(4)]
-    signal_states = ['red'] * 4
-    durations = [5] * 4
-    current = 0
-    start = time.time()
+    loader = get_model_loader()
+    model = load_model()
+    # Imported here, after login: the background loader has been importing it since startup
+    import cv2
+    from supervisor import STALE_READING_SECONDS
+    st.caption("Startup: " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in loader.timings.items()))
     last_summary = None
-    alert_triggered = False
-
-    placeholders = [st.empty() for _ in range(4)]
+    history = get_history_store()
+    detector = get_congestion_detector()
+    event_log = []
+
+    # Per-stage, per-camera latency histograms, also served at :9108/metrics
+    metrics = get_stage_metrics()
+    # Every frame gets an id and capture time; its age is taken at each stage up to the screen
+    tracer = get_frame_tracer()
+    # Each source reconnects on its own with backoff; a dead feed never stops the others
+    supervisor = get_camera_supervisor()
+
+    # Cameras and junctions come from cameras.yaml and follow edits to it while running
+    watcher = ConfigWatcher()
+    cameras, junctions = {}, []
+    state = get_camera_state()
+    pipelines, planners, controllers, heatmaps = (state["pipelines"], state["planners"], state["controllers"],
+                                                  state["heatmaps"])
+    # Optional high-resolution tiles over distant road, within one tiles-per-second budget
+    tile_budget = state["tile_budget"]
+    dispersion, located = None, []
+    focus = None   # the approach the summary is about: whichever last turned green
+
+    cameras_box = st.empty()
     summary_box = st.empty()
+    events_box = st.empty()
+    st.markdown("### 🔥 Vehicle Occupancy Heatmaps")
+    heatmap_box = st.empty()
+    last_snapshot = last_heatmap_render = time.time()
+    last_plan = 0.0
+
+    # City-grid CO2 exposure from every located road, spread by the wind
+    import pydeck as pdk
+    st.markdown("### 🗺️ CO2 Exposure Map")
+    wind_col1, wind_col2 = st.columns(2)
+    with wind_col1:
+        wind_speed = st.slider("Wind speed (m/s)", 0.0, 10.0, 2.0, 0.5)
+    with wind_col2:
+        wind_from = st.slider("Wind from (° from north)", 0, 355, 270, 5)
+    dispersion_box = st.empty()
+    last_dispersion = 0.0
+
+    profiler = get_tick_profiler()
+    memory = metrics.memory
+    if st.session_state.memory_diagnostics:
+        st.markdown("### 🧠 Memory Diagnostics")
+        memory_box = st.empty()
+    last_memory_sample = None
+    if st.session_state.show_latency:
+        st.markdown("### 📈 Stage Latency (last minute)")
+        latency_box = st.empty()
+    last_latency_render = 0.0
 
     while True:
-        frames, counts, emis_list, unused_list, plant_info = [], [], [], [], []
-        total_vehicles = 0
-
-        for i, cap in enumerate(caps):
-            ret, frame = cap.read()
-            if not ret:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                ret, frame = cap.read()
-            frame = cv2.resize(frame, (400, 225))
-            res = model(frame)
-            count = sum(int(r.cls) in [2, 3, 5, 7] for r in res[0].boxes)
-            total_vehicles += count
-
-            for r in res[0].boxes:
-                if int(r.cls) in [2, 3, 5, 7]:
-                    x1, y1, x2, y2 = map(int, r.xyxy[0])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            emis = {k: count * v for k, v in EMISSION_FACTORS.items()}
-            unused = calculate_unused_area(frame, res)
+        config = watcher.poll()
+        if config is not None:
+            configured, junctions = config
+            cameras = {camera["id"]: camera for camera in configured}
+            sync_pipelines(cameras, pipelines, planners, heatmaps, model, tile_budget, history, metrics, tracer,
+                           supervisor)
+            for junction in junctions:
+                if junction["name"] in controllers:
+                    controllers[junction["name"]].set_approaches(junction["approaches"], junction["min_green"])
+                else:
+                    controllers[junction["name"]] = SignalController(junction["name"], junction["approaches"],
+                                                                     junction["min_green"])
+            for name in set(controllers) - {junction["name"] for junction in junctions}:
+                del controllers[name]
+            detector.set_roads(list(pipelines))
+            located = [camera_id for camera_id, camera in cameras.items() if camera.get("location")]
+            dispersion = DispersionGrid([cameras[camera_id]["location"] for camera_id in located]) if located else None
+            last_summary = None
+
+        frames, counts, emis_list, unused_list, plant_info, speed_list = {}, {}, {}, {}, {}, {}
+        lane_stats, demand, stamps = {}, {}, {}
+        profiler.tick()
+        tick_ts = time.time()
+        tick_laps = metrics.laps()
+
+        for camera_id, pipeline in pipelines.items():
+            result = pipeline.step(tick_ts, tiled=st.session_state.tiled_inference)
+            if result is None:
+                # Degraded source: the junction carries on with this camera's last reading for a while,
+                # then leaves the camera out of demand, planning and the map until it is back
+                result = pipeline.last
+                if result is None or tick_ts - pipeline.cap.last_frame_ts > STALE_READING_SECONDS:
+                    continue
+            else:
+                stamps[camera_id] = result.stamp
+            count, unused = result.count, result.unused
+            lane_stats[camera_id] = result.lanes
+            demand[camera_id] = result.demand
             prate, plevel, air, sug, red = get_pollution_info(count)
-            plant_val = (plevel, air, int(unused / 2), sug, red * int(unused / 2))
-            frames.append(frame)
-            counts.append(count)
-            emis_list.append(emis)
-            unused_list.append(unused)
-            plant_info.append(plant_val)
-
-        # Sound alerts for high traffic
-        if st.session_state.sound_alerts and total_vehicles > 30 and not alert_triggered:
-            play_alert_sound()
-            alert_triggered = True
-        elif total_vehicles <= 30:
-            alert_triggered = False
-
-        if time.time() - start >= durations[current]:
-            current = (current + 1) % 4
-            durations[current] = max(5, counts[current])
-            start = time.time()
-            signal_states = ['red'] * 4
-            signal_states[current] = 'green'
-
-        for i in range(4):
-            with placeholders[i].container():
-                st.markdown(f"""
-                <div class="road-card">
-                    <div class="road-title">Road {i + 1} - Traffic Junction Alpha-{i + 1}</div>
-                """, unsafe_allow_html=True)
-
-                col1, col2, col3, col4 = st.columns([4, 1, 2, 2])
-
-                with col1:
-                    st.image(cv2.cvtColor(frames[i], cv2.COLOR_BGR2RGB), channels="RGB", use_container_width=True)
-
-                rem = int(durations[i] - (time.time() - start)) if signal_states[i] == 'green' else None
-                with col2:
-                    st.markdown(traffic_light_html(signal_states[i], rem), unsafe_allow_html=True)
-
-                with col3:
+            planner = planners[camera_id]
+            if planner.sites:
+                site = planner.sites[0]
+                planters = int(site["area_m2"] / 2)
+                _, _, _, sug, red = get_pollution_info(round(site["exposure"] / CO2_PER_CAR))
+            else:
+                site, planters = None, int(unused / 2)
+            frames[camera_id] = result.frame
+            counts[camera_id] = count
+            emis_list[camera_id] = result.emissions
+            unused_list[camera_id] = unused
+            plant_info[camera_id] = (plevel, air, planters, sug, red * planters, site)
+            speed_list[camera_id] = result.speed
+        tick_laps.lap("cameras")
+
+        if tick_ts - last_snapshot >= HEATMAP_SNAPSHOT_SECONDS:
+            for camera_id, pipeline in pipelines.items():
+                history.record_heatmap(tick_ts, camera_id, pipeline.heatmap)
+            last_snapshot = tick_ts
+
+        if tick_ts - last_plan >= PLANNER_REFRESH_SECONDS:
+            for camera_id, emis in emis_list.items():
+                planners[camera_id].update(pipelines[camera_id].heatmap, emis['CO2'])
+            last_plan = tick_ts
+
+        if tick_ts - last_heatmap_render >= HEATMAP_REFRESH_SECONDS:
+            with heatmap_box.container():
+                ids = list(frames)
+                for row in range(0, len(ids), HEATMAP_COLUMNS):
+                    for col, camera_id in zip(st.columns(HEATMAP_COLUMNS), ids[row:row + HEATMAP_COLUMNS]):
+                        heatmap = pipelines[camera_id].heatmap
+                        overlay = heatmap.overlay(frames[camera_id])
+                        for site in planners[camera_id].sites[:3]:
+                            x1, y1, x2, y2 = site["box"]
+                            cv2.rectangle(overlay, (x1, y1), (x2, y2), (255, 255, 255), 1)
+                            cv2.putText(overlay, f"#{site['id']}", (x1 + 2, y1 + 12), cv2.FONT_HERSHEY_SIMPLEX,
+                                        0.4, (255, 255, 255), 1)
+                        with col:
+                            st.image(cv2.cvtColor(overlay, cv2.COLOR_BGR2RGB), channels="RGB",
+                                     caption=f"{cameras[camera_id]['name']}: {heatmap.frames} frames",
+                                     use_container_width=True)
+            last_heatmap_render = tick_ts
+
+        if dispersion is not None and tick_ts - last_dispersion >= DISPERSION_REFRESH_SECONDS:
+            dispersion.update([emis_list[camera_id]['CO2'] if camera_id in emis_list else 0.0 for camera_id in located],
+                              wind_speed, wind_from)
+            dispersion_box.pydeck_chart(pdk.Deck(layers=[dispersion.layer()],
+                                                 initial_view_state=dispersion.view_state(),
+                                                 tooltip={"text": "CO2 exposure: {exposure}"}))
+            last_dispersion = tick_ts
+
+        # Congestion and anomaly alerts against each road's own baseline
+        # Only fresh readings: a held or missing count would read as congestion and be learned as normal
+        detector.update([counts[road] if road in stamps else float('nan') for road in detector.roads], tick_ts,
+                        speeds=[speed_list[road] if road in stamps else float('nan') for road in detector.roads])
+        new_events = drain_events(detector.events)
+        if new_events:
+            if st.session_state.sound_alerts and any(e.kind == "congestion" and e.state == "start"
+                                                     for e in new_events):
+                play_alert_sound()
+            event_log = (new_events[::-1] + event_log)[:8]
+            events_box.markdown("<br>".join(
+                f"{'⚠️' if e.state == 'start' else '✅'} {time.strftime('%H:%M:%S', time.localtime(e.ts))} "
+                f"{road_name(cameras, e.road)} {e.kind} {e.state} "
+                f"({e.value:.0f} vehicles vs. usual {e.baseline:.0f})"
+                for e in event_log), unsafe_allow_html=True)
+
+        tick_laps.lap("analytics")
+
+        for controller in controllers.values():
+            green = controller.update(demand)
+            if green is not None:
+                stamp = stamps.get(green)
+                history.record_phase(controller.start, green, 'green', controller.duration,
+                                     stamp.frame_id if stamp is not None else None)
+                if stamp is not None:
+                    tracer.reached(stamp, "signal")
+                focus = green
+
+        with cameras_box.container():
+            for junction in junctions:
+                controller = controllers[junction["name"]]
+                st.markdown(f"#### 🚦 {junction['name']}")
+                for camera_id in junction["approaches"]:
+                    health = pipelines[camera_id].cap.health() if camera_id in pipelines else None
+                    if camera_id not in frames:
+                        if health is not None and health["state"] == "connecting":
+                            st.info(f"📷 {cameras[camera_id]['name']}: connecting…")
+                        elif health is not None:
+                            st.warning(f"📷 {cameras[camera_id]['name']}: no signal ({health['error']}), "
+                                       f"retrying in {health['retry in s'] or 0:.0f}s")
+                        continue
                     st.markdown(f"""
-                    <div class="metric-card">
-                        <div class="metric-value">{counts[i]}</div>
-                        <div class="metric-label">🚗 Active Vehicles</div>
-                    </div>
-                    <div class="metric-card">
-                        <div class="metric-value">{unused_list[i]:.1f}</div>
-                        <div class="metric-label">📏 Unused Area (m²)</div>
-                    </div>
+                    <div class="road-card">
+                        <div class="road-title">{cameras[camera_id]['name']} - {junction['name']}</div>
                     """, unsafe_allow_html=True)
 
-                    # Air quality with density
-                    air_status = plant_info[i][1]
-                    status_class = "status-good" if air_status == "Good" else "status-moderate" if air_status == "Moderate" else "status-poor"
-                    density_level = "LOW" if counts[i] <= 3 else "MEDIUM" if counts[i] <= 7 else "HIGH"
-
-                    st.markdown(f"""
-                    <div class="air-quality-card">
-                        <div class="air-quality-title">🌬️ Air Quality & Density</div>
-                        <div class="air-quality-content">
-                            <div>Status: <span class="{status_class}">{air_status}</span></div>
-                            <div>Density: <span class="density-{density_level.lower()}">{density_level}</span></div>
-                            <div>Efficiency: <span class="efficiency">{max(0, 100 - counts[i] * 10)}%</span></div>
+                    col1, col2, col3, col4 = st.columns([4, 1, 2, 2])
+
+                    with col1:
+                        if camera_id in stamps:
+                            caption = f"Frame #{stamps[camera_id].frame_id}"
+                        else:
+                            caption = f"⚠️ Degraded for {health['down s']:.0f}s, showing the last frame"
+                        st.image(cv2.cvtColor(frames[camera_id], cv2.COLOR_BGR2RGB), channels="RGB",
+                                 use_container_width=True, caption=caption)
+
+                    state = controller.state(camera_id)
+                    rem = controller.remaining() if state == 'green' else None
+                    with col2:
+                        st.markdown(traffic_light_html(state, rem), unsafe_allow_html=True)
+
+                    with col3:
+                        st.markdown(f"""
+                        <div class="metric-card">
+                            <div class="metric-value">{counts[camera_id]}</div>
+                            <div class="metric-label">🚗 Active Vehicles</div>
                         </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                with col4:
-                    # Emissions
-                    st.markdown(f"""
-                    <div class="emissions-card">
-                        <div class="emissions-title">💨 Emissions Analysis</div>
-                        <div class="emissions-content">
-                            <div>CO2: <span class="emission-value">{emis_list[i]['CO2']:.1f} g/km</span></div>
-                            <div>NOx: <span class="emission-value">{emis_list[i]['NOx']:.2f} g/km</span></div>
-                            <div>PM2.5: <span class="emission-value">{emis_list[i]['PM2.5']:.3f} g/km</span></div>
+                        <div class="metric-card">
+                            <div class="metric-value">{unused_list[camera_id]:.1f}</div>
+                            <div class="metric-label">📏 Unused Area (m²)</div>
                         </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                    # Plant recommendations
-                    st.markdown(f"""
-                    <div class="plants-card">
-                        <div class="plants-title">🌱 Green Solutions</div>
-                        <div class="plants-content">
-                            <div><strong>Plants:</strong> {plant_info[i][3]}</div>
-                            <div><strong>Reduction:</strong> <span class="reduction-value">{plant_info[i][4]}%</span></div>
+                        <div class="metric-card">
+                            <div class="metric-value">{"—" if np.isnan(speed_list[camera_id]) else f"{speed_list[camera_id]:.0f}"}</div>
+                            <div class="metric-label">🏎️ Avg Speed (km/h)</div>
                         </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                st.markdown("</div>", unsafe_allow_html=True)
-
-        if current != last_summary:
-            summary = generate_summary(current, counts, unused_list, emis_list, plant_info)
+                        """, unsafe_allow_html=True)
+
+                        if lane_stats[camera_id]:
+                            lane_text = " · ".join(f"{lane['name']} {lane['occupancy']:.0%}"
+                                                   for lane in lane_stats[camera_id])
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <div class="metric-value">{demand[camera_id]}</div>
+                                <div class="metric-label">🚥 Queued Vehicles ({lane_text})</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+
+                        # Air quality with density
+                        air_status = plant_info[camera_id][1]
+                        status_class = "status-good" if air_status == "Good" else "status-moderate" if air_status == "Moderate" else "status-poor"
+                        density_level = "LOW" if counts[camera_id] <= 3 else "MEDIUM" if counts[camera_id] <= 7 else "HIGH"
+
+                        st.markdown(f"""
+                        <div class="air-quality-card">
+                            <div class="air-quality-title">🌬️ Air Quality & Density</div>
+                            <div class="air-quality-content">
+                                <div>Status: <span class="{status_class}">{air_status}</span></div>
+                                <div>Density: <span class="density-{density_level.lower()}">{density_level}</span></div>
+                                <div>Efficiency: <span class="efficiency">{max(0, 100 - counts[camera_id] * 10)}%</span></div>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                    with col4:
+                        # Emissions
+                        st.markdown(f"""
+                        <div class="emissions-card">
+                            <div class="emissions-title">💨 Emissions Analysis</div>
+                            <div class="emissions-content">
+                                <div>CO2: <span class="emission-value">{emis_list[camera_id]['CO2']:.1f} g/km</span></div>
+                                <div>NOx: <span class="emission-value">{emis_list[camera_id]['NOx']:.2f} g/km</span></div>
+                                <div>PM2.5: <span class="emission-value">{emis_list[camera_id]['PM2.5']:.3f} g/km</span></div>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                        # Plant recommendations
+                        st.markdown(f"""
+                        <div class="plants-card">
+                            <div class="plants-title">🌱 Green Solutions</div>
+                            <div class="plants-content">
+                                <div><strong>Plants:</strong> {plant_info[camera_id][3]}</div>
+                                {site_html(plant_info[camera_id][5], plant_info[camera_id][2])}
+                                <div><strong>Reduction:</strong> <span class="reduction-value">{plant_info[camera_id][4]}%</span></div>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                    st.markdown("</div>", unsafe_allow_html=True)
+        tick_laps.lap("render")
+        for stamp in stamps.values():
+            tracer.reached(stamp, "displayed")
+
+        if focus not in counts:
+            focus = next(iter(counts), None)
+        if focus is not None and focus != last_summary:
+            summary = generate_summary(cameras[focus]["name"], counts[focus], unused_list[focus], plant_info[focus])
+            congested_roads = ", ".join(road_name(cameras, road) for road in detector.active("congestion"))
             summary_box.markdown(f"""
             <div class="summary-box">
                 <div class="summary-title">📊 Real-time Analysis Report</div>
                 <div class="summary-content">
-                    <strong>🎯 Current Focus:</strong> Road {current + 1}<br>
+                    <strong>🎯 Current Focus:</strong> {cameras[focus]["name"]}<br>
                     <strong>📊 Analysis:</strong> {summary}<br>
-                    <strong>🚨 Total Vehicles:</strong> {total_vehicles} 
-                    {"<span class='alert-text'>⚠️ HIGH TRAFFIC ALERT!</span>" if total_vehicles > 30 else ""}
+                    <strong>🚨 Total Vehicles:</strong> {sum(counts.values())} 
+                    {f"<span class='alert-text'>⚠️ CONGESTION: {congested_roads}</span>" if congested_roads else ""}
                 </div>
             </div>
             """, unsafe_allow_html=True)
-            last_summary = current
+            last_summary = focus
+        tick_laps.lap("summary")
+
+        if st.session_state.show_latency and tick_ts - last_latency_render >= LATENCY_REFRESH_SECONDS:
+            with latency_box.container():
+                st.dataframe(metrics.table(), hide_index=True, use_container_width=True)
+                st.markdown("**Frame age since capture** (displayed = capture-to-screen)")
+                st.dataframe(tracer.ages.table(), hide_index=True, use_container_width=True)
+                st.markdown("**Camera health**")
+                st.dataframe([pipeline.cap.health() for pipeline in pipelines.values()], hide_index=True,
+                             use_container_width=True)
+                st.caption("Dropped frames: " + (", ".join(f"camera {camera} {point} {count}"
+                                                           for (point, camera), count in sorted(tracer.drops.items()))
+                                                 or "none"))
+            last_latency_render = tick_ts
+
+        memory.tick()
+        if st.session_state.memory_diagnostics and memory.samples and memory.samples[-1][0] != last_memory_sample:
+            last_memory_sample = memory.samples[-1][0]
+            with memory_box.container():
+                for flag in memory.flags:
+                    st.warning(f"⚠️ Possible leak: {flag}")
+                st.line_chart({"RSS (MB)": [rss / 2 ** 20 for _, rss, _, _ in memory.samples if rss is not None]},
+                              height=160)
+                col_stages, col_lines = st.columns(2)
+                with col_stages:
+                    st.markdown("**Memory left behind per stage**")
+                    st.dataframe(memory.stage_table(), hide_index=True, use_container_width=True)
+                with col_lines:
+                    st.markdown("**Top growth since tracing started**")
+                    st.dataframe([{"line": line, "KB": round(size / 1024, 1), "blocks": count}
+                                  for line, size, count in memory.top_growth],
+                                 hide_index=True, use_container_width=True)
 
         time.sleep(0.1)
+        tick_laps.lap("sleep")
+        metrics.record("tick", time.time() - tick_ts)
 
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -427,7 +769,9 @@ def main():
         initial_sidebar_state="collapsed"
     )
 
-    check_login()
+    started = time.perf_counter()
+    get_model_loader()
+    check_login(started)
     run_dashboard()
 
 
@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+SPEECH_CACHE_DIR = os.path.join('cache', 'speech')
+MAX_PENDING = 2               # queued announcements; the oldest is dropped beyond this
+MAX_AGE_SECONDS = 15.0        # announcements older than this are skipped, not read out late
+MEMORY_CACHE_PHRASES = 256
+SPEECH_RATE = 170             # words per minute; part of the cache key
+PHRASE_SPLIT = re.compile(r"(?:\.\.\.|[:,;.!?])(?:\s+|$)")
+ROAD_PHRASE = re.compile(r"Road \d+")
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+
+def split_phrases(text):
+    """Break an announcement at punctuation so fixed parts ("Road 2", plant names) repeat exactly"""
+    return [phrase.strip() for phrase in PHRASE_SPLIT.split(text) if phrase.strip()]
+
+
+class SpeechWorker:
+    """One long-lived text-to-speech thread fed by a small bounded queue
+
+    say() never blocks. An announcement with the same key as one still
+    waiting replaces it, and one with a newer same-key announcement queued
+    behind it stops between phrases, so phase changes don't pile up lagging
+    audio.
+
+    The phrase cache is Windows-only. There, each phrase is synthesized once
+    to a WAV kept in an LRU memory cache (and on disk when it recurs), and
+    repeats play from memory through winsound. Other platforms have no
+    player in the standard library or in requirements.txt, so the engine
+    reads each announcement directly and pays for synthesis every time;
+    split_phrases, _audio and SPEECH_CACHE_DIR go unused there.
+    """
+
+    def __init__(self, cache_dir=SPEECH_CACHE_DIR, max_pending=MAX_PENDING, max_age=MAX_AGE_SECONDS,
+                 rate=SPEECH_RATE):
+        self.cache_dir = cache_dir
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.rate = rate
+        self.dropped = 0
+        self._pending = deque()
+        self._memory = OrderedDict()
+        self._cond = threading.Condition()
+        self._engine = None
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+
+    def say(self, text, key=None):
+        """Queue an announcement; a pending one with the same key is replaced"""
+        with self._cond:
+            if key is not None:
+                for item in list(self._pending):
+                    if item[0] == key:
+                        self._pending.remove(item)
+                        self.dropped += 1
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((key, text, time.monotonic()))
+            self._cond.notify()
+
+    def _superseded(self, key):
+        with self._cond:
+            return key is not None and any(item[0] == key for item in self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key, text, queued = self._pending.popleft()
+            if time.monotonic() - queued > self.max_age:
+                self.dropped += 1
+                continue
+            try:
+                self._speak(key, text)
+            except Exception:
+                logger.exception("Speech output failed")
+                self._engine = None
+
+    def _get_engine(self):
+        if self._engine is None:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+            self._engine.setProperty('rate', self.rate)
+        return self._engine
+
+    def _speak(self, key, text):
+        # No in-memory WAV playback off Windows: speak uncached (see the class docstring)
+        if winsound is None:
+            engine = self._get_engine()
+            engine.say(text)
+            engine.runAndWait()
+            return
+        for phrase in split_phrases(text):
+            if self._superseded(key):
+                return
+            winsound.PlaySound(self._audio(phrase), winsound.SND_MEMORY)
+
+    def _audio(self, phrase):
+        """WAV bytes for a phrase: memory cache, then disk cache, then synthesis"""
+        audio = self._memory.get(phrase)
+        if audio is not None:
+            self._memory.move_to_end(phrase)
+            return audio
+
+        # Only phrases that recur go to disk; live figures ("12 vehicles") stay in memory
+        persistent = ROAD_PHRASE.fullmatch(phrase) or not any(c.isdigit() for c in phrase)
+        digest = hashlib.sha1(f"{self.rate}|{phrase}".encode('utf-8')).hexdigest()
+        path = os.path.join(self.cache_dir, digest + '.wav')
+        if not (persistent and os.path.exists(path)):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            engine = self._get_engine()
+            engine.save_to_file(phrase, path + '.tmp')
+            engine.runAndWait()
+            if persistent:
+                os.replace(path + '.tmp', path)
+            else:
+                path += '.tmp'
+        with open(path, 'rb') as f:
+            audio = f.read()
+        if not persistent:
+            os.remove(path)
+
+        self._memory[phrase] = audio
+        if len(self._memory) > MEMORY_CACHE_PHRASES:
+            self._memory.popitem(last=False)
+        return audio
@@ -0,0 +1,116 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+from auth import AuthService
+from speech import SpeechWorker
+from stub_detector import STUB_PREFIX, StubDetector
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+# Any YOLO weights file, or a stub detector spec such as 'stub:synthetic' (see stub_detector.py)
+MODEL_WEIGHTS = os.environ.get('TRAFFIC_DETECTOR', 'yolov8n.pt')
+# Imported in this order, each timed as its own stage; the entry points import cv2 only after login
+HEAVY_MODULES = ("cv2", "torch", "ultralytics")
+DETECTOR_MODULES = ("torch", "ultralytics")   # not needed by the stub detector
+
+
+class ModelLoader:
+    """Imports the ML stack and loads the detector on a background thread
+
+    Created as soon as an entry point starts, so OpenCV, torch and
+    ultralytics load while the login page is already up instead of before
+    it is drawn. The wall time of each stage, and of drawing the login page
+    itself (record()), is kept in `timings` and logged, to see where a cold
+    start goes. A failed load stays failed: entry points drop their cached
+    loader on error so the next rerun starts a fresh one.
+    """
+
+    def __init__(self, weights=MODEL_WEIGHTS, modules=HEAVY_MODULES):
+        self.weights = weights
+        self.modules = modules
+        self.timings = OrderedDict()
+        self.error = None
+        self._model = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+        self._thread.start()
+
+    def _stage(self, name, load):
+        start = time.perf_counter()
+        value = load()
+        self.timings[name] = time.perf_counter() - start
+        logger.info("Startup stage %s took %.2f s", name, self.timings[name])
+        return value
+
+    def record(self, name, started):
+        """Time a stage of the foreground since a perf_counter() reading, e.g. drawing the login page"""
+        self.timings[name] = time.perf_counter() - started
+        logger.info("Startup stage %s took %.2f s", name, self.timings[name])
+
+    def _run(self):
+        try:
+            stub = self.weights.startswith(STUB_PREFIX)
+            for module in self.modules:
+                # No torch needed for a stand-in detector (overhead benchmarks and CI)
+                if not (stub and module in DETECTOR_MODULES):
+                    self._stage(f"import {module}", lambda: importlib.import_module(module))
+            if stub:
+                self._model = self._stage(f"load {self.weights}", lambda: StubDetector.from_spec(self.weights))
+                return
+            from ultralytics import YOLO
+            self._model = self._stage(f"load {self.weights}", lambda: YOLO(self.weights))
+        except Exception as exc:
+            logger.exception("Detector failed to load")
+            self.error = exc
+        finally:
+            self._done.set()
+
+    def ready(self):
+        return self._done.is_set()
+
+    def model(self, timeout=None):
+        """The loaded detector, waiting for it if needed; re-raises a load failure"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.weights} is still loading")
+        if self.error is not None:
+            raise self.error
+        return self._model
+
+
+# --- Shared by the dashboard entry points ---
+@st.cache_resource
+def get_model_loader():
+    # Started before the login form so the ML stack loads while the user signs in
+    return ModelLoader()
+
+
+@st.cache_resource
+def get_auth_service():
+    # One connection pool and session cache per process instead of a connection per rerun
+    return AuthService()
+
+
+@st.cache_resource
+def get_speech_worker():
+    # One speech thread per process, shared across reruns and sessions
+    return SpeechWorker()
+
+
+def load_model():
+    """The detector behind a spinner; a failed load shows the error and a Retry button and stops the run"""
+    with st.spinner("Loading detection model..."):
+        try:
+            return get_model_loader().model()
+        except Exception as exc:
+            # Don't keep the failed loader cached: the next rerun starts a fresh load
+            get_model_loader.clear()
+            st.error(f"❌ Detection model failed to load: {exc}")
+            st.button("🔄 Retry")
+            st.stop()
@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from emissions import VEHICLE_CLASSES
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+STUB_PREFIX = 'stub:'
+STUB_BOXES = 12
+REPLAY_FILE = 'detections.jsonl'
+FINGERPRINT_STEP = 8          # every 8th pixel each way identifies a frame well enough
+
+
+def fingerprint(image):
+    """Short stable key for an image the detector is given (frame or crop)"""
+    sample = np.ascontiguousarray(image[::FINGERPRINT_STEP, ::FINGERPRINT_STEP])
+    return hashlib.blake2b(sample.tobytes() + str(image.shape).encode(), digest_size=8).hexdigest()
+
+
+class _HostArray(np.ndarray):
+    """ndarray with the .cpu().numpy() calls the YOLO result readers make"""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+
+class StubBoxes:
+    """The slice of ultralytics' Boxes the dashboards read: xyxy, cls, conf and iteration per box"""
+
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4).view(_HostArray)
+        self.cls = np.asarray(cls, dtype=np.float32).view(_HostArray)
+        self.conf = np.asarray(conf, dtype=np.float32).view(_HostArray)
+
+    def __len__(self):
+        return len(self.cls)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield StubBoxes(self.xyxy[i:i + 1], self.cls[i], self.conf[i])
+
+
+class StubResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubDetector:
+    """Stands in for YOLO('yolov8n.pt') where inference cost should not count
+
+    Called like the YOLO model and returns results with the same fields, so
+    it drops into every entry point, the pipeline and the tiler. Two modes:
+      synthetic  deterministic boxes derived from the image itself, so the
+                 same frame always gets the same detections
+      replay     detections a real model produced for the same image,
+                 looked up by fingerprint (see `record`); images that were
+                 never recorded get no boxes and are counted in `misses`
+    """
+
+    def __init__(self, mode="synthetic", boxes=STUB_BOXES, seed=0, replay=None):
+        self.mode = mode
+        self.boxes = boxes
+        self.seed = seed
+        self.replay = replay or {}
+        self.calls = 0
+        self.misses = 0
+
+    @classmethod
+    def from_spec(cls, spec):
+        """'stub:synthetic?boxes=20&seed=1' or 'stub:replay?path=detections.jsonl'"""
+        parsed = urlparse(spec[len(STUB_PREFIX):])
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        mode = parsed.path or "synthetic"
+        if mode == "replay":
+            return cls("replay", replay=load_replay(params.get("path", REPLAY_FILE)))
+        if mode != "synthetic":
+            raise ValueError(f"Unknown stub detector mode: {mode}")
+        return cls("synthetic", int(params.get("boxes", STUB_BOXES)), int(params.get("seed", 0)))
+
+    def _synthetic(self, image):
+        h, w = image.shape[:2]
+        rng = np.random.default_rng([self.seed, int(fingerprint(image), 16)])
+        n = rng.integers(self.boxes // 2, self.boxes + 1)
+        sizes = rng.uniform(0.05, 0.2, (n, 2)) * (w, h)
+        corners = rng.uniform(0, 1, (n, 2)) * ((w, h) - sizes)
+        xyxy = np.hstack([corners, corners + sizes])
+        # Mostly vehicles, with the odd person, like a road scene
+        cls = np.where(rng.uniform(size=n) < 0.9, rng.choice(VEHICLE_CLASSES, n), 0)
+        return xyxy, cls, rng.uniform(0.25, 0.95, n)
+
+    def _result(self, image):
+        if self.mode == "synthetic":
+            return StubResult(StubBoxes(*self._synthetic(image)))
+        found = self.replay.get(fingerprint(image))
+        if found is None:
+            self.misses += 1
+            return StubResult(StubBoxes(np.zeros((0, 4)), [], []))
+        return StubResult(StubBoxes(*found))
+
+    def __call__(self, image, **kwargs):
+        self.calls += 1
+        # A list is one batched call, as the tiler makes: one result per image, like YOLO
+        return [self._result(one) for one in (image if isinstance(image, list) else [image])]
+
+
+def load_replay(path):
+    replay = {}
+    with open(path, "r", encoding='utf-8') as f:
+        for line in f:
+            row = json.loads(line)
+            replay[row["key"]] = (row["xyxy"], row["cls"], row["conf"])
+    logger.info("Loaded %d recorded detections from %s", len(replay), path)
+    return replay
+
+
+class DetectionRecorder:
+    """Wraps a real detector and keeps what it returns, keyed by image fingerprint, for replay"""
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = {}
+
+    def __call__(self, image, **kwargs):
+        results = self.model(image, **kwargs)
+        for one, result in zip(image if isinstance(image, list) else [image], results):
+            boxes = result.boxes
+            self.rows[fingerprint(one)] = {"xyxy": np.round(boxes.xyxy.cpu().numpy(), 2).tolist(),
+                                           "cls": boxes.cls.cpu().numpy().astype(int).tolist(),
+                                           "conf": np.round(boxes.conf.cpu().numpy(), 4).tolist()}
+        return results
+
+    def save(self, path=REPLAY_FILE):
+        with open(path, "w", encoding='utf-8') as f:
+            for key, row in self.rows.items():
+                f.write(json.dumps({"key": key, **row}) + "\n")
+
+
+def record(clips, frames, weights, path=REPLAY_FILE, tiled=False):
+    """Run the real detector over the clips through the pipeline and save its detections"""
+    from benchmark import benchmark_camera
+    from pipeline import CameraPipeline
+    from startup import ModelLoader
+    from tiling import TileBudget
+
+    recorder = DetectionRecorder(ModelLoader(weights).model())
+    for clip in clips:
+        pipeline = CameraPipeline(benchmark_camera(clip), recorder, clip, TileBudget() if tiled else None)
+        for _ in range(frames):
+            pipeline.step(time.time(), tiled=tiled)
+        pipeline.cap.release()
+    recorder.save(path)
+    return len(recorder.rows)
+
+
+def main(argv=None):
+    from benchmark import BENCHMARK_CLIPS, BENCHMARK_FRAMES
+    from startup import MODEL_WEIGHTS
+
+    parser = argparse.ArgumentParser(description="Record real detections for the replaying stub detector.")
+    parser.add_argument("--clips", nargs="+", default=list(BENCHMARK_CLIPS))
+    parser.add_argument("--frames", type=int, default=BENCHMARK_FRAMES)
+    parser.add_argument("--weights", default=MODEL_WEIGHTS)
+    parser.add_argument("--tiled", action="store_true", help="also record far-field tile detections")
+    parser.add_argument("--output", default=REPLAY_FILE)
+    args = parser.parse_args(argv)
+    count = record(args.clips, args.frames, args.weights, args.output, args.tiled)
+    print(f"{count} detections written to {args.output}; replay with --weights 'stub:replay?path={args.output}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+SUMMARY_MODEL = "t5-small"
+SUMMARY_MAX_LENGTH = 100
+SUMMARY_MIN_LENGTH = 30
+SUMMARY_CACHE_SIZE = 512
+MAX_PENDING = 4               # newest requests win; older ones are dropped
+
+
+class BackgroundSummarizer:
+    """Model summaries computed off the render thread and memoized by input text
+
+    Nothing is imported or loaded until the first request; the transformers
+    pipeline is then built on a worker thread. summarize() only ever looks
+    up the cache: on a miss it queues the text and returns None, so callers
+    show their own template until result() has the model's version.
+    """
+
+    def __init__(self, model=SUMMARY_MODEL, max_length=SUMMARY_MAX_LENGTH, min_length=SUMMARY_MIN_LENGTH,
+                 cache_size=SUMMARY_CACHE_SIZE, max_pending=MAX_PENDING):
+        self.model = model
+        self.max_length = max_length
+        self.min_length = min_length
+        self.cache_size = cache_size
+        self.max_pending = max_pending
+        self.load_seconds = None
+        self.error = None
+        self._cache = OrderedDict()
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def result(self, text):
+        """Cached summary for `text`, or None"""
+        with self._cond:
+            summary = self._cache.get(text)
+            if summary is not None:
+                self._cache.move_to_end(text)
+            return summary
+
+    def summarize(self, text):
+        """Cached summary for `text`; on a miss queue it and return None"""
+        with self._cond:
+            summary = self._cache.get(text)
+            if summary is not None:
+                self._cache.move_to_end(text)
+                return summary
+            if self.error is not None:
+                return None
+            self._pending.pop(text, None)
+            self._pending[text] = None
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            self._cond.notify()
+        self.start()
+        return None
+
+    def start(self):
+        """Begin loading the model in the background ahead of the first request"""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="summarizer", daemon=True)
+                self._thread.start()
+
+    def _load(self):
+        start = time.perf_counter()
+        from transformers import pipeline
+        model = pipeline("summarization", model=self.model)
+        self.load_seconds = time.perf_counter() - start
+        logger.info("Loaded %s summarizer in %.1f s", self.model, self.load_seconds)
+        return model
+
+    def _run(self):
+        try:
+            model = self._load()
+        except Exception as exc:
+            logger.exception("Summarizer unavailable, keeping template summaries")
+            with self._cond:
+                self.error = exc
+                self._pending.clear()
+            return
+
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Newest first: that is the road state currently on screen
+                text, _ = self._pending.popitem(last=True)
+            try:
+                summary = model(text, max_length=self.max_length, min_length=self.min_length,
+                                do_sample=False)[0]['summary_text']
+            except Exception:
+                logger.exception("Summarization failed")
+                continue
+            with self._cond:
+                self._cache[text] = summary
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
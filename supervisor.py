@@ -0,0 +1,255 @@
+import logging
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+import cv2
+import numpy as np
+
+from synthetic import SYNTHETIC_SCHEME, open_source
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+CONNECT_WAIT_SECONDS = 5.0    # how long a standalone source's first open may hold up the caller
+OPEN_TIMEOUT_MS = 5000        # FFmpeg open/read timeouts for network streams, so a dead host can't hang a read
+READ_TIMEOUT_MS = 5000
+MAX_READ_FAILURES = 3         # consecutive failed reads before the source is reopened
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 60.0
+BACKOFF_JITTER = 0.2
+RECOVERIES_KEPT = 20
+STALE_READING_SECONDS = 10    # how long a degraded camera's last reading stands in for it
+
+
+def _open(source):
+    if isinstance(source, str) and "://" in source and not source.startswith(SYNTHETIC_SCHEME + "://") \
+            and hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+        return cv2.VideoCapture(source, cv2.CAP_ANY, [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, OPEN_TIMEOUT_MS,
+                                                      cv2.CAP_PROP_READ_TIMEOUT_MSEC, READ_TIMEOUT_MS])
+    return open_source(source)
+
+
+def no_signal_frame(size, message):
+    """A dark (width, height) card with a status line, for a camera with no frame to show"""
+    frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    cv2.putText(frame, message, (10, size[1] // 2), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return frame
+
+
+class CameraSource:
+    """A supervised capture: reads never raise or block on a broken feed
+
+    Behaves like cv2.VideoCapture for the pipeline. Files loop at their
+    end; any other failed read counts against the source, which is marked
+    degraded at once and reopened after MAX_READ_FAILURES in a row. Opens
+    run on a background thread with exponential backoff and jitter, so a
+    missing file or dead stream costs the loop nothing while it retries.
+    Recovery time is measured from the first failure to the next good frame.
+    """
+
+    def __init__(self, source, name=None, connect_wait=CONNECT_WAIT_SECONDS):
+        self.source = source
+        self.name = name if name is not None else source
+        self.state = "connecting"
+        self.error = None
+        self.cap = None
+        self.looping = False
+        self.failures = 0
+        self.attempts = 0
+        self.reconnects = 0
+        self.frames = 0
+        self.backoff = BACKOFF_INITIAL
+        self.retry_at = None
+        self.down_since = None
+        self.last_frame_ts = None
+        self.recoveries = deque(maxlen=RECOVERIES_KEPT)
+        self.closed = False
+        self._lock = threading.Lock()
+        self._connecting = None
+        connecting = self._connect()
+        if connect_wait:
+            connecting.join(connect_wait)
+
+    def _connect(self):
+        self.attempts += 1
+        self._connecting = threading.Thread(target=self._open, name=f"camera-connect-{self.name}", daemon=True)
+        self._connecting.start()
+        return self._connecting
+
+    def _open(self):
+        try:
+            cap = _open(self.source)
+            opened = cap.isOpened()
+        except Exception as exc:
+            cap, opened = None, False
+            self.error = str(exc)
+        with self._lock:
+            if self.closed or not opened:
+                if cap is not None:
+                    cap.release()
+                if not self.closed:
+                    self.error = self.error or f"cannot open {self.source}"
+                    self._schedule_retry()
+                return
+            old, self.cap = self.cap, cap
+            self.looping = cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0
+            self.failures = 0
+            self.retry_at = None
+            self.error = None
+        if old is not None:
+            old.release()
+
+    def _schedule_retry(self):
+        if self.state != "degraded":
+            self.state = "degraded"
+            self.down_since = self.down_since or time.time()
+            logger.warning("Camera %s degraded: %s", self.name, self.error)
+        delay = self.backoff * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        self.retry_at = time.monotonic() + delay
+        self.backoff = min(self.backoff * 2, BACKOFF_MAX)
+
+    def _failed(self, error):
+        self.failures += 1
+        self.error = error
+        if self.state != "degraded":
+            self.state = "degraded"
+            self.down_since = self.down_since or time.time()
+            logger.warning("Camera %s degraded: %s", self.name, error)
+        if self.failures >= MAX_READ_FAILURES and self.retry_at is None:
+            self._schedule_retry()
+
+    def _recovered(self):
+        now = time.time()
+        if self.down_since is not None:
+            seconds = now - self.down_since
+            self.recoveries.append((now, seconds))
+            logger.info("Camera %s recovered after %.1f s (%d attempts)", self.name, seconds, self.attempts)
+        self.state = "ok"
+        self.down_since = None
+        self.backoff = BACKOFF_INITIAL
+        self.attempts = 0
+
+    def read(self):
+        """(True, frame) or (False, None); never raises and only waits on the capture itself"""
+        if self._connecting is not None and self._connecting.is_alive():
+            return False, None
+        if self.retry_at is not None and time.monotonic() >= self.retry_at:
+            self.retry_at = None
+            self.reconnects += 1
+            self._connect()
+            return False, None
+        with self._lock:
+            cap = self.cap
+        if cap is None or (self.retry_at is not None and self.failures >= MAX_READ_FAILURES):
+            return False, None
+        try:
+            ret, frame = cap.read()
+            if not ret and self.looping:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = cap.read()
+        except cv2.error as exc:
+            ret, frame = False, None
+            self.error = str(exc)
+        if not ret or frame is None or not frame.size:
+            self._failed(self.error or "read failed")
+            return False, None
+        self.failures = 0
+        self.error = None
+        self.frames += 1
+        self.last_frame_ts = time.time()
+        if self.state != "ok":
+            self._recovered()
+        return True, frame
+
+    def grab(self):
+        with self._lock:
+            cap = self.cap
+        return cap is not None and self.state == "ok" and cap.grab()
+
+    def get(self, prop):
+        with self._lock:
+            cap = self.cap
+        return cap.get(prop) if cap is not None else 0.0
+
+    def set(self, prop, value):
+        with self._lock:
+            cap = self.cap
+        return cap is not None and cap.set(prop, value)
+
+    def isOpened(self):
+        return self.state == "ok"
+
+    def release(self):
+        with self._lock:
+            self.closed = True
+            self.state = "closed"
+            cap, self.cap = self.cap, None
+        if cap is not None:
+            cap.release()
+
+    def health(self):
+        now = time.time()
+        last_recovery = self.recoveries[-1][1] if self.recoveries else None
+        return {"camera": str(self.name), "state": self.state,
+                "down s": round(now - self.down_since, 1) if self.down_since else 0.0,
+                "retry in s": round(max(0.0, self.retry_at - time.monotonic()), 1) if self.retry_at else None,
+                "reconnects": self.reconnects,
+                "last recovery s": round(last_recovery, 1) if last_recovery is not None else None,
+                "frame age s": round(now - self.last_frame_ts, 1) if self.last_frame_ts else None,
+                "error": self.error or ""}
+
+
+class CameraSupervisor:
+    """Every open camera source in the process, for the health table and /metrics
+
+    Each open dashboard session opens and releases its own sources; the
+    supervisor only keeps weak references to them. It never releases a
+    source itself, so a second viewer can't close the feeds of the first,
+    and a closed session's sources go once nothing else holds them.
+    """
+
+    def __init__(self):
+        self.sources = []    # weak references, oldest first
+        self._lock = threading.Lock()
+
+    def open(self, camera_id, source, connect_wait=0):
+        """A new supervised source for a camera, released by whoever opened it
+
+        Doesn't wait for the first open by default: cameras are started one
+        after another, so a dead feed would hold up every camera after it.
+        The source reads as "connecting" until the open finishes.
+        """
+        opened = CameraSource(source, camera_id, connect_wait)
+        with self._lock:
+            self.sources.append(weakref.ref(opened))
+        return opened
+
+    def _live(self):
+        with self._lock:
+            live = [source for source in (ref() for ref in self.sources) if source is not None and not source.closed]
+            self.sources = [weakref.ref(source) for source in live]
+        return live
+
+    def degraded(self):
+        return sorted({source.name for source in self._live() if source.state != "ok"}, key=str)
+
+    def table(self):
+        return [source.health() for source in self._live()]
+
+    def prometheus(self):
+        lines = ["# HELP traffic_camera_up Whether the camera is delivering frames.",
+                 "# TYPE traffic_camera_up gauge"]
+        reconnects = ["# TYPE traffic_camera_reconnects_total counter"]
+        recovery = ["# HELP traffic_camera_recovery_seconds Time from failure to the next good frame, last outage.",
+                    "# TYPE traffic_camera_recovery_seconds gauge"]
+        # One series per camera, from its most recently opened source, however many sessions have it open
+        for source in {source.name: source for source in self._live()}.values():
+            label = f'camera="{source.name}"'
+            lines.append(f"traffic_camera_up{{{label}}} {int(source.state == 'ok')}")
+            reconnects.append(f"traffic_camera_reconnects_total{{{label}}} {source.reconnects}")
+            if source.recoveries:
+                recovery.append(f"traffic_camera_recovery_seconds{{{label}}} {source.recoveries[-1][1]:.3f}")
+        return "\n".join(lines + reconnects + recovery) + "\n"
@@ -0,0 +1,185 @@
+import time
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+# --- Constants ---
+SYNTHETIC_SCHEME = 'synthetic'
+SYNTHETIC_SIZE = (1280, 720)
+SYNTHETIC_FPS = 25.0
+SYNTHETIC_VEHICLES = 12
+SYNTHETIC_LANES = 4
+BUNDLED_CLIPS = ("Road_1.mp4", "Road_2.mp4", "Road_4.mp4")
+VEHICLE_COLOURS = ((40, 40, 200), (200, 200, 200), (30, 30, 30), (180, 120, 40), (60, 160, 220), (90, 90, 90))
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+class SyntheticCamera:
+    """A cv2.VideoCapture look-alike producing frames without a real feed
+
+    Two kinds, chosen by the source URI:
+      synthetic://scene?seed=3&vehicles=20&size=1280x720&fps=25
+        a procedural road: vehicle-sized boxes moving down the lanes, each
+        frame a pure function of the seed and frame index
+      synthetic://remix/Road_1.mp4?offset=120&flip=1&gain=1.2&bias=-10
+        a bundled clip, looped from a frame offset and flipped or shifted
+        in brightness, so many cameras can share a few clips without being
+        identical
+    Both report their own clock (frame index / fps) through CAP_PROP_POS_MSEC.
+    With realtime=1 read() waits for each frame's due time, like a live feed.
+    """
+
+    def __init__(self, uri):
+        parsed = urlparse(uri)
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        self.kind = parsed.netloc
+        self.size = parse_size(params["size"]) if "size" in params else None
+        self.fps = float(params.get("fps", SYNTHETIC_FPS))
+        self.realtime = params.get("realtime", "0") == "1"
+        self.index = 0
+        self.started = None
+        self._clip = None
+        if self.kind == "scene":
+            self.size = self.size or SYNTHETIC_SIZE
+            self._init_scene(int(params.get("seed", 0)), int(params.get("vehicles", SYNTHETIC_VEHICLES)))
+        elif self.kind == "remix":
+            self.path = parsed.path.lstrip("/")
+            self._clip = cv2.VideoCapture(self.path)
+            self.offset = int(params.get("offset", 0))
+            self.flip = params.get("flip", "0") == "1"
+            self.gain = float(params.get("gain", 1.0))
+            self.bias = float(params.get("bias", 0.0))
+            if self._clip.isOpened() and self.offset:
+                length = int(self._clip.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+                self._clip.set(cv2.CAP_PROP_POS_FRAMES, self.offset % length)
+        else:
+            raise ValueError(f"Unknown synthetic source: {uri}")
+
+    def _init_scene(self, seed, vehicles):
+        rng = np.random.default_rng(seed)
+        w, h = self.size
+        background = np.full((h, w, 3), 70, np.uint8)
+        background[:, : w // 8] = background[:, -w // 8:] = (60, 110, 60)   # verges
+        self.lane_x = np.linspace(w // 8, w - w // 8, SYNTHETIC_LANES + 1)
+        for x in self.lane_x[1:-1]:
+            for y in range(0, h, h // 12):
+                cv2.line(background, (int(x), y), (int(x), y + h // 24), (220, 220, 220), max(1, w // 400))
+        self.background = background
+        lane_width = self.lane_x[1] - self.lane_x[0]
+        self.lanes = rng.integers(0, SYNTHETIC_LANES, vehicles)
+        self.widths = rng.uniform(0.45, 0.75, vehicles) * lane_width
+        self.lengths = self.widths * rng.uniform(1.4, 2.6, vehicles)
+        self.speeds = rng.uniform(0.004, 0.015, vehicles) * h       # pixels per frame
+        self.phases = rng.uniform(0, 1, vehicles)
+        self.colours = rng.integers(0, len(VEHICLE_COLOURS), vehicles)
+
+    def boxes(self, index=None):
+        """Scene vehicles' (x1, y1, x2, y2) boxes in source pixels at a frame index (default: last read)"""
+        index = self.index - 1 if index is None else index
+        w, h = self.size
+        span = h + self.lengths
+        y2 = (self.phases * span + index * self.speeds) % span
+        centres = (self.lane_x[self.lanes] + self.lane_x[self.lanes + 1]) / 2
+        xyxy = np.stack([centres - self.widths / 2, y2 - self.lengths, centres + self.widths / 2, y2], axis=1)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, h)
+        return xyxy[xyxy[:, 3] - xyxy[:, 1] > 2]
+
+    def _render(self):
+        frame = self.background.copy()
+        for (x1, y1, x2, y2), colour in zip(self.boxes(self.index).astype(int), self.colours):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), VEHICLE_COLOURS[colour], -1)
+            cv2.rectangle(frame, (x1 + 3, y1 + 3), (x2 - 3, (y1 + y2) // 2), (30, 30, 30), -1)   # windscreen
+        return frame
+
+    def _remix(self):
+        ret, frame = self._clip.read()
+        if not ret:
+            self._clip.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._clip.read()
+            if not ret:
+                return None
+        if self.size is not None:
+            frame = cv2.resize(frame, self.size)
+        if self.flip:
+            frame = cv2.flip(frame, 1)
+        if self.gain != 1.0 or self.bias:
+            frame = cv2.convertScaleAbs(frame, alpha=self.gain, beta=self.bias)
+        return frame
+
+    def isOpened(self):
+        return self._clip is None or self._clip.isOpened()
+
+    def grab(self):
+        if self._clip is not None and not self._clip.grab():
+            return False
+        self.index += 1
+        return True
+
+    def read(self):
+        if self.realtime:
+            now = time.monotonic()
+            if self.started is None:
+                self.started = now - self.index / self.fps
+            time.sleep(max(0.0, self.started + self.index / self.fps - now))
+        frame = self._render() if self._clip is None else self._remix()
+        if frame is None:
+            return False, None
+        self.index += 1
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.index)
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.index / self.fps * 1000
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return -1.0     # endless, like a live feed
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.size[0]) if self.size else self._clip.get(prop)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.size[1]) if self.size else self._clip.get(prop)
+        return 0.0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        # Live-like sources don't rewind; a seek to 0 after a failed read is a no-op
+        if value and self._clip is None:
+            self.index = int(value)
+        return True
+
+    def release(self):
+        if self._clip is not None:
+            self._clip.release()
+
+
+def open_source(source):
+    """VideoCapture for a camera source: a file, device, stream URL or synthetic:// URI"""
+    if isinstance(source, str) and source.startswith(SYNTHETIC_SCHEME + "://"):
+        return SyntheticCamera(source)
+    return cv2.VideoCapture(source)
+
+
+def synthetic_cameras(n, kind="scene", size=None, fps=SYNTHETIC_FPS, realtime=False, resize=(400, 225)):
+    """N camera configs for load tests; remixes cycle the bundled clips with staggered offsets"""
+    cameras = []
+    for i in range(n):
+        query = f"fps={fps:g}&realtime={int(realtime)}"
+        if size is not None:
+            query += f"&size={size[0]}x{size[1]}"
+        if kind == "scene":
+            uri = f"{SYNTHETIC_SCHEME}://scene?seed={i}&{query}"
+        else:
+            clip = BUNDLED_CLIPS[i % len(BUNDLED_CLIPS)]
+            rng = np.random.default_rng(i)
+            uri = (f"{SYNTHETIC_SCHEME}://remix/{clip}?offset={i * 37}&flip={i // len(BUNDLED_CLIPS) % 2}"
+                   f"&gain={rng.uniform(0.8, 1.2):.2f}&bias={rng.uniform(-20, 20):.0f}&{query}")
+        cameras.append({"name": f"Synthetic {i + 1}", "source": uri, "resize": list(resize)})
+    return cameras
@@ -0,0 +1,35 @@
+import sqlite3
+
+from auth import AuthService
+
+
+def legacy_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE users (username TEXT, password TEXT)')
+    conn.executemany('INSERT INTO users VALUES (?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def service(path):
+    return AuthService(str(path), kdf="pbkdf2_sha256", work=1000, pool_size=1)
+
+
+def test_migration_keeps_distinct_duplicate_passwords(tmp_path):
+    path = tmp_path / "users.db"
+    legacy_db(path, [("ann", "secret"), ("ann", "secret"), ("ann", "Secret"), ("bob", "pw")])
+    auth = service(path)
+    assert auth.user_count() == 2
+    assert auth.verify("ann", "Secret")
+    # The first login with either password settles which one the user keeps
+    assert not auth.verify("ann", "secret")
+    assert auth.verify("bob", "pw")
+
+
+def test_logout_ends_the_session(tmp_path):
+    auth = service(tmp_path / "users.db")
+    auth.add_user("ann", "pw")
+    token = auth.login("ann", "pw")
+    assert auth.session_user(token) == "ann"
+    auth.logout(token)
+    assert auth.session_user(token) is None
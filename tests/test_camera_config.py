@@ -0,0 +1,40 @@
+import pytest
+import yaml
+
+from camera_config import ConfigWatcher, load_config
+
+
+def write(tmp_path, data):
+    path = tmp_path / "cameras.yaml"
+    path.write_text(yaml.safe_dump(data))
+    return str(path)
+
+
+def test_explicit_id_does_not_collide_with_positional_ids(tmp_path):
+    path = write(tmp_path, {"cameras": [{"name": "A", "source": "a.mp4", "id": 2},
+                                        {"name": "B", "source": "b.mp4"},
+                                        {"name": "C", "source": "c.mp4"}],
+                            "junctions": [{"name": "J", "approaches": ["A", "B", "A", "C"]}]})
+    cameras, junctions = load_config(path)
+    ids = [camera["id"] for camera in cameras]
+    assert len(set(ids)) == 3
+    assert junctions == [{"name": "J", "approaches": ids, "min_green": 5}]
+
+
+def test_repeated_id_is_rejected(tmp_path):
+    path = write(tmp_path, {"cameras": [{"name": "A", "source": "a.mp4", "id": 1},
+                                        {"name": "B", "source": "b.mp4", "id": 1}]})
+    with pytest.raises(ValueError, match="already used"):
+        load_config(path)
+
+
+@pytest.mark.parametrize("camera", [{"source": "a.mp4"}, {"name": "A"},
+                                    {"name": "A", "source": "a.mp4", "resize": [400]},
+                                    {"name": "A", "source": "a.mp4", "roi": [[0, 0], [1]]}])
+def test_broken_edit_keeps_running_config(tmp_path, camera):
+    path = write(tmp_path, {"cameras": [{"name": "A", "source": "a.mp4"}]})
+    watcher = ConfigWatcher(path, poll_seconds=0)
+    assert watcher.poll() is not None
+    write(tmp_path, {"cameras": [camera]})
+    watcher.mtime = -1   # the edit landed within the file system's mtime resolution
+    assert watcher.poll() is None
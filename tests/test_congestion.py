@@ -0,0 +1,37 @@
+import numpy as np
+
+from congestion import CongestionDetector
+
+TS = 1_700_000_000.0
+
+
+def feed(detector, counts, ticks, start=0):
+    events = []
+    for i in range(ticks):
+        events += detector.update(counts(i), ts=TS + start + i)
+    return events
+
+
+def test_high_volume_road_learns_its_baseline():
+    rng = np.random.default_rng(0)
+    detector = CongestionDetector(2, seasonal=False)
+    feed(detector, lambda _: [rng.integers(8, 15), rng.integers(0, 3)], 500)
+    assert detector.samples[0, 0] == 500
+    assert 10 < detector.mean[0, 0] < 12
+
+
+def test_high_volume_road_raises_congestion():
+    rng = np.random.default_rng(1)
+    detector = CongestionDetector(1, seasonal=False)
+    feed(detector, lambda _: [rng.integers(8, 15)], 500)
+    events = feed(detector, lambda _: [40], 20, start=500)
+    assert ("congestion", "start") in {(event.kind, event.state) for event in events}
+
+
+def test_lasting_level_shift_is_absorbed():
+    rng = np.random.default_rng(2)
+    detector = CongestionDetector(1, seasonal=False)
+    feed(detector, lambda _: [rng.integers(8, 15)], 500)
+    feed(detector, lambda _: [rng.integers(38, 43)], 2000, start=500)
+    assert detector.mean[0, 0] > 30
+    assert not detector.active("anomaly")
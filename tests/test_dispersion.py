@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from dispersion import DispersionGrid, plume_kernel
+
+JUNCTION = [[17.4382, 78.4483], [17.4375, 78.44905], [17.4368, 78.4483], [17.4375, 78.44755]]
+
+
+@pytest.mark.parametrize("wind_speed, wind_from", [(0.0, 0.0), (1.0, 90.0), (3.0, 225.0), (10.0, 0.0)])
+def test_kernel_holds_one_cells_emissions(wind_speed, wind_from):
+    assert plume_kernel(wind_speed, wind_from).sum() == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("wind_speed, wind_from", [(0.0, 0.0), (1.0, 90.0), (2.0, 300.0)])
+def test_grid_spreads_emissions_without_creating_or_losing_any(wind_speed, wind_from):
+    grid = DispersionGrid(JUNCTION)
+    emissions = [120.0, 0.0, 820.0, 65.0]
+    exposure = grid.update(emissions, wind_speed, wind_from)
+    assert exposure.sum() == pytest.approx(sum(emissions), rel=1e-6)
+
+
+def test_plume_drifts_downwind_and_roads_add_up():
+    grid = DispersionGrid(JUNCTION)
+    source_row = grid.road_cells[0] // grid.cols
+    # Wind from the north carries emissions south, where grid rows grow
+    exposure = grid.update([100.0, 0, 0, 0], 2.0, 0.0)
+    rows = np.arange(grid.rows)
+    assert (exposure.sum(axis=1) @ rows) / exposure.sum() > source_row + 2
+
+    each = sum(grid.update(np.eye(4)[k] * 50.0, 2.0, 0.0) for k in range(4))
+    assert grid.update([50.0] * 4, 2.0, 0.0) == pytest.approx(each, abs=1e-9)
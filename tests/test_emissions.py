@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from emissions import (EMISSION_FACTOR_MATRIX, REFERENCE_SPEED_KMH, class_counts, compute_emissions,
+                       recompute_history)
+from history import HistoryStore
+
+WRONG = {"CO2": -1.0, "NOx": -1.0, "PM2.5": -1.0}
+
+
+def test_totals_are_counts_times_per_class_factors():
+    # Two cars, one bus, one truck; people (0) and bicycles (1) are not vehicles
+    counts = class_counts([2, 2, 5, 7, 0, 1])
+    assert counts.tolist() == [2, 0, 1, 1]
+    emis = compute_emissions(counts)
+    assert emis == pytest.approx(2 * EMISSION_FACTOR_MATRIX[0] + EMISSION_FACTOR_MATRIX[2] + EMISSION_FACTOR_MATRIX[3])
+    assert emis[0] == pytest.approx(2 * 120.0 + 820.0 + 650.0)
+
+
+def test_batch_rows_match_single_rows_and_speed_scales_them():
+    counts = np.array([[1, 0, 0, 0], [0, 2, 0, 1], [3, 1, 1, 0]])
+    speeds = np.array([REFERENCE_SPEED_KMH, 10.0, np.nan])
+    batch = compute_emissions(counts, speeds)
+    assert batch[0] == pytest.approx(compute_emissions(counts[0]))
+    assert batch[2] == pytest.approx(compute_emissions(counts[2]))
+    # Stop-go traffic emits more per vehicle than traffic at the reference speed
+    assert (batch[1] > compute_emissions(counts[1])).all()
+
+
+def test_recompute_history_rewrites_stored_emissions_from_class_counts(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.record_metrics(1.0, 1, [1, 0, 0, 0], 5.0, WRONG)
+    store.record_metrics(2.0, 2, [0, 0, 2, 0], 5.0, WRONG, speed_kmh=REFERENCE_SPEED_KMH)
+    store.record_metrics(3.0, 3, [1, 1, 1, 1], 5.0, WRONG)
+
+    assert recompute_history(store, roads=[1, 2], batch_size=1) == 2
+    rows = [row for batch in store.iter_rows("road_metrics", columns=("road", "co2", "nox", "pm25"))
+            for row in batch]
+    store.close()
+    assert rows[0][1:] == pytest.approx(tuple(EMISSION_FACTOR_MATRIX[0]))
+    assert rows[1][1:] == pytest.approx(tuple(2 * EMISSION_FACTOR_MATRIX[2]))
+    # Outside the chosen roads nothing changes
+    assert rows[2][1:] == (-1.0, -1.0, -1.0)
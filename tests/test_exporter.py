@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+import pytest
+
+from exporter import stream_export
+from history import HistoryStore
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    for i in range(12):
+        # The first batches carry no speed or frame id, later ones do
+        store.record_metrics(1000.0 + i, 1, np.array([1, 0, 0, 0]), 10.0, {"CO2": 1.0, "NOx": 1.0, "PM2.5": 1.0},
+                             float('nan') if i < 6 else 30.0, None if i < 6 else i)
+    store.flush()
+    yield store
+    store.close()
+
+
+def read(chunks):
+    return pq.read_table(io.BytesIO(b"".join(chunks)))
+
+
+def test_parquet_schema_survives_all_null_first_batch(store):
+    table = read(stream_export(store, "road_metrics", "Parquet", batch_size=5))
+    assert table.num_rows == 12
+    assert table.column("frame_id").to_pylist()[5:7] == [None, 6]
+
+
+def test_empty_parquet_export_is_a_valid_file(store):
+    table = read(stream_export(store, "road_metrics", "Parquet", start=5000))
+    assert table.num_rows == 0
+    assert "speed_kmh" in table.column_names
+
+
+def test_export_file_is_accepted_by_the_download_button(store):
+    st = pytest.importorskip("streamlit")
+    from exporter import export_to_tempfile
+
+    chunks = stream_export(store, "road_metrics", "CSV")
+    export = export_to_tempfile(chunks, "CSV")
+    st.download_button("Download", data=export, file_name="road_metrics.csv", mime="text/csv")
+    export.seek(0)
+    assert export.read().startswith(b"ts,road,")
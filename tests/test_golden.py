@@ -0,0 +1,29 @@
+import golden
+from stub_detector import StubDetector
+
+CLIP = "synthetic://scene?width=640&height=360"
+CAMERA = {"name": "far", "source": CLIP, "resize": [400, 225], "far_field": [[0, 0, 200, 60]]}
+
+
+class CallRecorder(StubDetector):
+    """Synthetic stub that remembers which calls were batched tile calls"""
+
+    def __init__(self):
+        super().__init__("synthetic", boxes=20)
+        self.tile_calls = 0
+
+    def __call__(self, image, **kwargs):
+        self.tile_calls += isinstance(image, list)
+        return super().__call__(image, **kwargs)
+
+
+def test_tiled_run_detects_far_field_tiles_and_full_frame_run_does_not(monkeypatch):
+    monkeypatch.setattr(golden, "benchmark_camera", lambda clip: CAMERA)
+    full, tiled = CallRecorder(), CallRecorder()
+    full_results, _ = golden.run_clip(CLIP, full, 5)
+    tiled_results, _ = golden.run_clip(CLIP, tiled, 5, tiled=True)
+
+    assert full.tile_calls == 0
+    assert tiled.tile_calls > 0
+    assert len(full_results) == len(tiled_results) == 5
+    assert [r["boxes"] for r in full_results] != [r["boxes"] for r in tiled_results]
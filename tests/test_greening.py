@@ -0,0 +1,45 @@
+import pytest
+
+from greening import MIN_PLANNING_FRAMES, GreeningPlanner
+from heatmap import OccupancyHeatmap
+
+FRAME = (80, 40)
+CELL = 4
+TRAFFIC = [[20, 0, 48, 40]]   # cars over x 20-48 in every frame; x 0-20 and 48-80 stay free
+LEFT = [[0, 0, 20, 40]]
+
+
+def busy_heatmap(frames=MIN_PLANNING_FRAMES):
+    heatmap = OccupancyHeatmap(FRAME, cell=CELL)
+    for i in range(frames):
+        heatmap.add(TRAFFIC, float(i))
+    return heatmap
+
+
+def planner(heatmap):
+    return GreeningPlanner(CELL, heatmap.grid.shape, pixel_area=0.05)
+
+
+def test_free_patches_become_sites_ranked_by_area():
+    heatmap = busy_heatmap()
+    sites = planner(heatmap).update(heatmap, co2=600.0)
+    # 16 px² cells at 0.05 m² per pixel: 0.8 m² each; 5 and 8 columns of 10 cells
+    assert [site["area_m2"] for site in sites] == pytest.approx([64.0, 40.0])
+    assert [site["box"] for site in sites] == [(48, 0, 80, 40), (0, 0, 20, 40)]
+    assert all(site["exposure"] > 0 for site in sites)
+
+
+def test_no_sites_before_enough_frames():
+    heatmap = busy_heatmap(MIN_PLANNING_FRAMES - 1)
+    assert planner(heatmap).update(heatmap) == []
+
+
+def test_a_free_patch_occasionally_used_stays_a_site_with_its_id():
+    heatmap = busy_heatmap()
+    sites = planner(heatmap)
+    ids = {site["box"]: site["id"] for site in sites.update(heatmap)}
+    for i in range(20):
+        heatmap.add(TRAFFIC + LEFT, 1000.0 + i)
+    # Used in about 6% of frames: too busy to become a site, not busy enough to stop being one
+    assert {site["box"]: site["id"] for site in sites.update(heatmap)} == ids
+    assert len(planner(heatmap).update(heatmap)) == 1
@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import pytest
+
+from calibration import CameraCalibration
+from camera_config import load_cameras
+from ground_area import GroundAreaMap, pixel_area_map
+from lanes import rasterise
+
+CONFIG = os.path.join(os.path.dirname(__file__), "..", "cameras.yaml")
+CALIBRATED = [camera for camera in load_cameras(CONFIG) if camera.get("calibration")]
+
+
+def surveyed_area(ground_points):
+    x, y = np.asarray(ground_points, dtype=np.float64).T
+    return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+@pytest.mark.parametrize("camera", CALIBRATED, ids=lambda camera: camera["name"])
+def test_weights_inside_the_surveyed_quad_add_up_to_its_measured_area(camera):
+    calibration = CameraCalibration.from_config(camera)
+    weights = pixel_area_map(calibration, camera["resize"])
+    quad = rasterise(camera["calibration"]["image_points"], camera["resize"])
+    # Pixel-edge rounding along the quad's border is the only error
+    assert weights[quad].sum() == pytest.approx(surveyed_area(camera["calibration"]["ground_points"]), rel=0.03)
+
+
+def test_pixels_further_up_the_image_cover_more_ground():
+    camera = CALIBRATED[0]
+    weights = pixel_area_map(CameraCalibration.from_config(camera), camera["resize"])
+    x = camera["resize"][0] // 2
+    assert weights[50, x] > weights[200, x] > 0
+
+
+def test_integral_and_mask_free_area_agree_for_two_overlapping_boxes():
+    rng = np.random.default_rng(0)
+    area = GroundAreaMap(rng.uniform(0.01, 0.1, (90, 160)).astype(np.float32))
+    boxes = [[10, 10, 60, 50], [40, 30, 100, 80], [120, 0, 170, 20]]
+    assert area.free_area(boxes, use_integral=True) == pytest.approx(area.free_area(boxes), rel=1e-6)
+    assert area.free_area([]) == pytest.approx(area.weights.sum(dtype=np.float64))
@@ -0,0 +1,48 @@
+import numpy as np
+
+from heatmap import HEATMAP_DECAY_SECONDS, OccupancyHeatmap
+
+HOUR = 3600.0
+BOX = [[0, 0, 8, 8]]
+
+
+def test_counts_halve_after_a_week_not_an_hour():
+    heatmap = OccupancyHeatmap((40, 20), cell=4)
+    for i in range(4):
+        heatmap.add(BOX, i * HOUR)
+    heatmap.add(BOX, 24 * HOUR)
+    assert heatmap.frames == 5 and heatmap.grid[0, 0] == 5
+
+    heatmap.add([], HEATMAP_DECAY_SECONDS)
+    # Halved (5 -> 2), then this frame added with nothing in it
+    assert heatmap.frames == 3
+    assert heatmap.grid[0, 0] == 2
+    assert heatmap.grid[:2, :2].tolist() == [[2, 2], [2, 2]] and heatmap.grid[2:, 2:].sum() == 0
+
+
+def test_halving_keeps_occupancy_shares():
+    heatmap = OccupancyHeatmap((40, 20), cell=4, decay_seconds=10)
+    for i in range(8):
+        heatmap.add(BOX if i % 2 else [], float(i))
+    before = heatmap.occupancy()[0, 0]
+    heatmap.halve()
+    assert heatmap.occupancy()[0, 0] == before == 0.5
+
+
+def test_rollover_hands_over_the_period_and_starts_again():
+    periods = []
+    heatmap = OccupancyHeatmap((40, 20), cell=4, rollover_seconds=HOUR,
+                               on_rollover=lambda start, grid, frames: periods.append((start, grid.copy(), frames)))
+    heatmap.add(BOX, 0.0)
+    heatmap.add(BOX, 10.0)
+    heatmap.add([], HOUR)
+    assert [(start, frames) for start, _, frames in periods] == [(0.0, 2)]
+    assert periods[0][1][0, 0] == 2
+    assert heatmap.frames == 1 and not heatmap.grid.any()
+
+
+def test_a_saturating_grid_halves_instead_of_wrapping():
+    heatmap = OccupancyHeatmap((8, 8), cell=4, dtype=np.uint16)
+    heatmap.frames = heatmap.grid[:] = heatmap.limit
+    heatmap.add(BOX, 0.0)
+    assert heatmap.grid[0, 0] == heatmap.limit // 2 + 1
@@ -0,0 +1,28 @@
+import numpy as np
+
+from inference import detect, input_size
+from stub_detector import StubBoxes, StubResult
+
+
+class SizeRecorder:
+    def __init__(self):
+        self.imgsz = []
+
+    def __call__(self, image, imgsz=None, **kwargs):
+        self.imgsz.append(imgsz)
+        return [StubResult(StubBoxes(np.zeros((0, 4)), [], []))]
+
+
+def test_crop_runs_at_the_full_frame_scale_of_its_own_frame():
+    # Half the width of a frame gets half the model pixels the whole frame would, at any frame size
+    for width, height in ((400, 225), (1280, 720)):
+        model = SizeRecorder()
+        detect(model, np.zeros((height, width, 3), np.uint8), (0, 0, width // 2, height))
+        assert model.imgsz == [input_size(width // 2, height, 640 / width)]
+        assert model.imgsz[0][1] == 320
+
+
+def test_explicit_scale_wins_over_the_frame():
+    model = SizeRecorder()
+    detect(model, np.zeros((225, 400, 3), np.uint8), (0, 0, 200, 100), scale=1.0)
+    assert model.imgsz == [(128, 224)]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from lanes import LaneLayout
+
+# Two 50 px lanes side by side under a road ROI that leaves out the top 20 rows;
+# stop lines default to the bottom edge
+CAMERA = {"resize": [100, 100],
+          "roi": [[0, 20], [99, 20], [99, 99], [0, 99]],
+          "lanes": [{"name": "Left", "polygon": [[0, 0], [49, 0], [49, 99], [0, 99]]},
+                    {"name": "Right", "polygon": [[50, 0], [99, 0], [99, 99], [50, 99]]}]}
+
+
+@pytest.fixture
+def layout():
+    return LaneLayout.from_config(CAMERA, (100, 100))
+
+
+def test_boxes_go_to_the_lane_holding_most_of_them(layout):
+    boxes = [[10, 60, 30, 80], [60, 60, 90, 80], [35, 60, 55, 80], [45, 60, 95, 80]]
+    assert layout.assign(boxes).tolist() == [0, 1, 0, 1]
+    assert layout.in_roi([[10, 0, 30, 10], [10, 60, 30, 80]]).tolist() == [False, True]
+
+
+def test_occupancy_is_the_covered_share_of_each_lane(layout):
+    # 20x40 px in a 50x80 px lane
+    lanes = layout.measure([[10, 50, 30, 90]])
+    assert lanes[0]["vehicles"] == 1
+    assert lanes[0]["occupancy"] == pytest.approx(800 / 4000, rel=0.05)
+    assert lanes[1] == {"name": "Right", "vehicles": 0, "occupancy": 0.0, "queue_vehicles": 0,
+                        "queue_m": pytest.approx(float('nan'), nan_ok=True)}
+
+
+def test_queue_is_the_chain_of_slow_vehicles_back_from_the_stop_line(layout):
+    boxes = [[10, 85, 30, 95], [10, 60, 30, 70], [10, 35, 30, 45],   # left: 5, 30 and 55 px back
+             [15, 65, 25, 75],                                          # left, but moving
+             [60, 85, 80, 95], [60, 20, 80, 30]]                        # right: 5 px, then a 65 px gap
+    speeds = [0.0, 2.0, np.nan, 30.0, 0.0, 0.0]
+    left, right = layout.measure(boxes, speeds)
+    assert (left["vehicles"], left["queue_vehicles"]) == (4, 3)
+    assert (right["vehicles"], right["queue_vehicles"]) == (2, 1)
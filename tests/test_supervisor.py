@@ -0,0 +1,45 @@
+import gc
+import time
+
+import pytest
+
+from supervisor import CameraSupervisor
+
+SOURCE = "synthetic://scene?width=64&height=36"
+
+
+def first_frame(source, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        ok, frame = source.read()
+        if ok:
+            return frame
+        time.sleep(0.01)
+    pytest.fail(f"{source.name}: no frame ({source.state}: {source.error})")
+
+
+def test_two_sessions_opening_one_camera_keep_their_own_feeds():
+    supervisor = CameraSupervisor()
+    first = supervisor.open(1, SOURCE)
+    first_frame(first)
+    second = supervisor.open(1, SOURCE)
+    first_frame(second)
+    # Opening the camera again for another viewer must not close the first one's feed
+    assert not first.closed
+    assert first_frame(first) is not None
+    assert len(supervisor.table()) == 2
+    assert supervisor.prometheus().count('traffic_camera_up{camera="1"}') == 1
+
+    first.release()
+    assert first.state == "closed"
+    assert first_frame(second) is not None
+
+
+def test_released_or_dropped_sources_leave_the_health_table():
+    supervisor = CameraSupervisor()
+    kept, dropped = supervisor.open(1, SOURCE), supervisor.open(2, SOURCE)
+    first_frame(kept)
+    first_frame(dropped)
+    del dropped
+    gc.collect()
+    assert [row["camera"] for row in supervisor.table()] == ["1"]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import tiling
+from inference import Detections
+from tiling import TileBudget, make_tiles, merge_detections
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tiling.time, "monotonic", clock)
+    return clock
+
+
+def run(budget, clock, cameras, seconds, tick=0.1, wanted=10):
+    granted = dict.fromkeys(cameras, 0)
+    for _ in range(int(round(seconds / tick))):
+        clock.now += tick
+        for camera in cameras:
+            granted[camera] += budget.take(wanted, camera)
+    return granted
+
+
+def test_cameras_asking_later_in_the_tick_get_the_same_share(clock):
+    budget = TileBudget(rate=8.0, burst=4)
+    granted = run(budget, clock, ["first", "second", "third", "fourth"], 20)
+    # 8 tiles/s for 20 s split four ways; only what each bucket starts with differs
+    assert max(granted.values()) - min(granted.values()) <= 3, granted
+    assert 8 * 20 - 4 <= sum(granted.values()) <= 8 * 20 + 4 * budget.burst
+
+
+def test_an_idle_cameras_share_goes_back_to_the_rest(clock):
+    budget = TileBudget(rate=8.0, burst=4)
+    run(budget, clock, ["busy", "idle"], 5)
+    clock.now += tiling.BUDGET_IDLE_SECONDS
+    granted = run(budget, clock, ["busy"], 10)
+    assert abs(granted["busy"] - 80) <= 4
+
+
+def detections(rows):
+    rows = np.array(rows, dtype=np.float64)
+    return Detections(rows[:, :4], rows[:, 4].astype(np.int64), rows[:, 5])
+
+
+def test_merge_keeps_the_most_confident_of_each_same_class_cluster():
+    full = detections([[100, 100, 140, 130, 2, 0.6],    # car, seen whole
+                       [300, 50, 320, 60, 7, 0.5]])     # distant truck
+    tile = detections([[101, 99, 141, 131, 2, 0.9],     # same car from the tile, more confident
+                       [100, 100, 118, 130, 2, 0.4],    # the car cut by a tile edge
+                       [100, 100, 140, 130, 3, 0.7]])   # different class at the same place
+    merged = merge_detections([full, tile])
+    assert sorted(zip(merged.cls.tolist(), merged.conf.tolist())) == [(2, 0.9), (3, 0.7), (7, 0.5)]
+
+
+def test_tiles_cover_a_region_with_overlap():
+    tiles = make_tiles((0, 0, 700, 300), tile=320, overlap=0.2)
+    assert tiles[0] == (0, 0, 320, 300) and tiles[-1] == (380, 0, 700, 300)
+    assert all(b[0] < a[2] for a, b in zip(tiles, tiles[1:]))
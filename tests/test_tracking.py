@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from calibration import CameraCalibration
+from tracking import SpeedEstimator
+
+# 10 px per metre, square to the road
+CALIBRATION = CameraCalibration([[0, 0], [400, 0], [400, 200], [0, 200]],
+                                [[0, 0], [40, 0], [40, 20], [0, 20]], (400, 200))
+
+
+def box_at(x, y):
+    """A 20x10 px box whose ground contact point is (x, y)"""
+    return [x - 10, y - 10, x + 10, y]
+
+
+def test_speed_from_known_ground_displacement():
+    estimator = SpeedEstimator(CALIBRATION)
+    speeds = []
+    for i in range(8):
+        # 10 px = 1 m every 0.1 s: 10 m/s
+        speeds = estimator.update([box_at(50 + 10 * i, 100)], i * 0.1)
+    assert speeds == pytest.approx([36.0])
+
+
+def test_new_tracks_never_take_a_live_tracks_row():
+    estimator = SpeedEstimator(CALIBRATION, max_tracks=4)
+    moving = []
+    for i in range(8):
+        # A long-lived vehicle (id 0), plus a new vehicle every frame whose id is a multiple
+        # of max_tracks: with id % max_tracks rows each would wipe the first vehicle's history
+        boxes = [box_at(50 + 10 * i, 100), box_at(150 + 45 * i, 180)]
+        estimator.tracker.next_id = -(-estimator.tracker.next_id // 4) * 4
+        moving = estimator.update(boxes, i * 0.1)
+    assert moving[0] == pytest.approx(36.0)
+    assert len(estimator.slots) <= 4
+
+
+def test_more_vehicles_than_rows_go_without_speed():
+    estimator = SpeedEstimator(CALIBRATION, max_tracks=2)
+    boxes = [box_at(50 + 60 * n, 100) for n in range(3)]
+    speeds = estimator.update(boxes, 0.0)
+    assert len(speeds) == 3 and np.isnan(speeds).all()
+    assert len(estimator.slots) == 2
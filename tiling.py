@@ -0,0 +1,127 @@
+import threading
+import time
+
+import numpy as np
+
+from inference import Detections, from_results
+
+# --- Constants ---
+TILE_BUDGET_PER_SECOND = 8.0   # high-resolution tiles across all cameras
+TILE_BURST = 4
+BUDGET_IDLE_SECONDS = 10.0     # a camera that hasn't asked for tiles this long gives up its share
+TILE_SIZE = 320                # source pixels per tile side
+TILE_OVERLAP = 0.2
+TILE_IMGSZ = 640
+MERGE_IOU = 0.5
+MERGE_IOS = 0.8                # intersection over the smaller box: a vehicle cut by a tile edge
+
+
+class TileBudget:
+    """Token bucket capping how many tiles per second the whole process runs
+
+    The rate is shared fairly: each camera asking for tiles gets its own
+    bucket filling at rate / cameras, so the cameras served first in a tick
+    can't drain what the later ones need. Cameras that stop asking are
+    forgotten after BUDGET_IDLE_SECONDS and their share goes to the rest.
+    """
+
+    def __init__(self, rate=TILE_BUDGET_PER_SECOND, burst=TILE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}     # camera -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def take(self, wanted, camera=None):
+        """Grant up to `wanted` tiles to a camera now; returns how many were granted"""
+        with self._lock:
+            now = time.monotonic()
+            self.buckets = {key: bucket for key, bucket in self.buckets.items()
+                            if now - bucket[1] < BUDGET_IDLE_SECONDS}
+            share = len(self.buckets) + (camera not in self.buckets)
+            # A share of the burst, but always room for one whole tile
+            burst = max(1.0, self.burst / share)
+            tokens, last = self.buckets.get(camera, (burst, now))
+            tokens = min(burst, tokens + (now - last) * self.rate / share)
+            granted = min(int(tokens), wanted)
+            self.buckets[camera] = [tokens - granted, now]
+            return granted
+
+
+def make_tiles(region, tile=TILE_SIZE, overlap=TILE_OVERLAP):
+    """Cover an (x1, y1, x2, y2) region with overlapping tiles of at most `tile` pixels"""
+    x1, y1, x2, y2 = region
+    step = max(1, int(tile * (1 - overlap)))
+
+    def starts(lo, hi):
+        if hi - lo <= tile:
+            return [lo]
+        return list(range(lo, hi - tile, step)) + [hi - tile]
+
+    return [(x, y, min(x + tile, x2), min(y + tile, y2)) for y in starts(y1, y2) for x in starts(x1, x2)]
+
+
+def merge_detections(parts, iou=MERGE_IOU, ios=MERGE_IOS):
+    """Class-aware greedy NMS across full-frame and tile detections"""
+    xyxy = np.concatenate([part.xyxy for part in parts])
+    cls = np.concatenate([part.cls for part in parts])
+    conf = np.concatenate([part.conf for part in parts])
+    area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+
+    order = np.argsort(-conf)
+    keep = []
+    while len(order):
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        w = np.clip(np.minimum(xyxy[i, 2], xyxy[rest, 2]) - np.maximum(xyxy[i, 0], xyxy[rest, 0]), 0, None)
+        h = np.clip(np.minimum(xyxy[i, 3], xyxy[rest, 3]) - np.maximum(xyxy[i, 1], xyxy[rest, 1]), 0, None)
+        inter = w * h
+        with np.errstate(divide='ignore', invalid='ignore'):
+            overlap = (inter / (area[i] + area[rest] - inter) > iou) | (inter / np.minimum(area[i], area[rest]) > ios)
+        order = rest[~(overlap & (cls[rest] == cls[i]))]
+    keep = np.array(keep, dtype=np.int64)
+    return Detections(xyxy[keep], cls[keep], conf[keep])
+
+
+class TiledDetector:
+    """Extra high-resolution passes over one camera's far-field regions
+
+    Tiles are cut from the full-resolution source frame, so distant vehicles
+    keep the pixels that downscaling to the display size throws away. When
+    the camera's share of the budget runs short its tiles are visited
+    round-robin.
+    """
+
+    def __init__(self, camera, budget):
+        self.regions = camera.get("far_field") or []
+        self.resize = tuple(camera["resize"])
+        self.budget = budget
+        self.tiles = None
+        self.source_size = None
+        self.cursor = 0
+
+    def _prepare(self, source_size):
+        # Far-field regions are configured in resized-frame pixels; tiles live in source pixels
+        sx, sy = source_size[0] / self.resize[0], source_size[1] / self.resize[1]
+        self.tiles = [tile for x1, y1, x2, y2 in self.regions
+                      for tile in make_tiles((int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy)))]
+        self.source_size = source_size
+
+    def detect(self, model, source, frame_size, **kwargs):
+        """Tile detections mapped into (width, height) frame coordinates"""
+        source_size = (source.shape[1], source.shape[0])
+        if self.source_size != source_size:
+            self._prepare(source_size)
+        granted = self.budget.take(len(self.tiles), self)
+        if not granted:
+            return []
+        sx, sy = frame_size[0] / source_size[0], frame_size[1] / source_size[1]
+
+        tiles = [self.tiles[(self.cursor + i) % len(self.tiles)] for i in range(granted)]
+        self.cursor += granted
+        # Every granted tile in one batched call
+        results = model([source[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles], imgsz=TILE_IMGSZ, **kwargs)
+        parts = []
+        for result, (x1, y1, _, _) in zip(results, tiles):
+            found = from_results([result], offset=(x1, y1))
+            parts.append(Detections(found.xyxy * [sx, sy, sx, sy], found.cls, found.conf))
+        return parts
@@ -0,0 +1,153 @@
+import numpy as np
+
+# --- Constants ---
+MAX_MATCH_DISTANCE = 40.0   # pixels between a track's last point and a new detection
+MAX_MISSED_FRAMES = 5
+MAX_TRACKS = 256
+HISTORY = 16                # ground positions kept per track
+MIN_SPEED_SAMPLES = 4
+MAX_SPEED_KMH = 200.0
+
+
+def ground_contact_points(boxes):
+    """Bottom-centre of each (N, 4) xyxy box: the point that actually touches the road"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]])
+
+
+class CentroidTracker:
+    """Greedy nearest-neighbour tracker assigning stable ids to per-frame points"""
+
+    def __init__(self, max_distance=MAX_MATCH_DISTANCE, max_missed=MAX_MISSED_FRAMES):
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.ids = np.empty(0, dtype=np.int64)
+        self.points = np.empty((0, 2))
+        self.missed = np.empty(0, dtype=np.int64)
+        self.next_id = 0
+
+    def reset(self):
+        self.__init__(self.max_distance, self.max_missed)
+
+    def update(self, points):
+        """Match this frame's (N, 2) points to tracks; returns an id per point"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        assigned = np.full(len(points), -1, dtype=np.int64)
+        matched = np.zeros(len(self.ids), dtype=bool)
+
+        if len(self.ids) and len(points):
+            dist = np.linalg.norm(self.points[:, None, :] - points[None, :, :], axis=2)
+            order = np.argsort(dist, axis=None)
+            order = order[dist.flat[order] <= self.max_distance]
+            for track, det in zip(*np.unravel_index(order, dist.shape)):
+                if not matched[track] and assigned[det] < 0:
+                    matched[track] = True
+                    assigned[det] = track
+
+        hit = assigned >= 0
+        tracks = assigned[hit]
+        self.points[tracks] = points[hit]
+        self.missed[tracks] = 0
+        self.missed[~matched] += 1
+        ids = np.empty(len(points), dtype=np.int64)
+        ids[hit] = self.ids[tracks]
+
+        new = np.flatnonzero(~hit)
+        ids[new] = np.arange(self.next_id, self.next_id + len(new))
+        self.next_id += len(new)
+
+        keep = self.missed <= self.max_missed
+        self.ids = np.concatenate([self.ids[keep], ids[new]])
+        self.points = np.concatenate([self.points[keep], points[new]])
+        self.missed = np.concatenate([self.missed[keep], np.zeros(len(new), dtype=np.int64)])
+        return ids
+
+
+class SpeedEstimator:
+    """Per-camera vehicle speeds from tracked ground-contact points
+
+    Tracks live in fixed-size ring buffers of (time, ground x, ground y); each
+    frame's detections are projected through the camera homography in one
+    batch and speeds come from the displacement across each ring. A track
+    holds its row until the tracker drops it; when every row is taken the
+    oldest track not seen this frame gives its row up.
+    """
+
+    def __init__(self, calibration, max_tracks=MAX_TRACKS, history=HISTORY,
+                 min_samples=MIN_SPEED_SAMPLES):
+        self.calibration = calibration
+        self.tracker = CentroidTracker()
+        self.history = history
+        self.min_samples = min_samples
+        self.times = np.zeros((max_tracks, history))
+        self.ground = np.zeros((max_tracks, history, 2))
+        self.samples = np.zeros(max_tracks, dtype=np.int64)
+        self.slots = {}                               # track id -> its row in the ring buffers
+        self.free = list(range(max_tracks - 1, -1, -1))
+        self.last_ts = None
+
+    def reset(self):
+        self.tracker.reset()
+        self.samples[:] = 0
+        self.slots = {}
+        self.free = list(range(len(self.samples) - 1, -1, -1))
+        self.last_ts = None
+
+    def _assign(self, ids):
+        # Rows of tracks the tracker has dropped go back on the free list
+        live = set(self.tracker.ids.tolist())
+        for track in [track for track in self.slots if track not in live]:
+            self.free.append(self.slots.pop(track))
+        current = set(ids)
+        slots = []
+        for track in ids:
+            slot = self.slots.get(track)
+            if slot is None:
+                if not self.free:
+                    evictable = [old for old in self.slots if old not in current]
+                    if not evictable:
+                        # More vehicles in this frame than rows: this one goes without a speed
+                        slots.append(-1)
+                        continue
+                    self.free.append(self.slots.pop(min(evictable)))
+                slot = self.slots[track] = self.free.pop()
+                self.samples[slot] = 0
+            slots.append(slot)
+        return np.array(slots, dtype=np.int64)
+
+    def update(self, boxes, ts):
+        """Speeds in km/h for this frame's (N, 4) xyxy boxes (nan until a track has history)"""
+        if self.last_ts is not None and ts <= self.last_ts:
+            # Source looped or restarted: old tracks no longer mean anything
+            self.reset()
+        self.last_ts = ts
+
+        pixels = ground_contact_points(boxes)
+        ids = self.tracker.update(pixels)
+        if not len(ids):
+            return np.empty(0)
+
+        speeds = np.full(len(ids), np.nan)
+        slots = self._assign(ids.tolist())
+        has_slot = slots >= 0
+        slots, pixels = slots[has_slot], pixels[has_slot]
+        head = self.samples[slots] % self.history
+        self.times[slots, head] = ts
+        self.ground[slots, head] = self.calibration.to_ground(pixels)
+        self.samples[slots] += 1
+
+        n = np.minimum(self.samples[slots], self.history)
+        tail = (head - n + 1) % self.history
+        dt = self.times[slots, head] - self.times[slots, tail]
+        dist = np.linalg.norm(self.ground[slots, head] - self.ground[slots, tail], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            found = dist / dt * 3.6
+        found[(n < self.min_samples) | (dt <= 0) | (found > MAX_SPEED_KMH)] = np.nan
+        speeds[has_slot] = found
+        return speeds
+
+
+def road_speed(speeds):
+    """Median speed over the vehicles with an estimate, nan if none"""
+    speeds = speeds[~np.isnan(speeds)]
+    return float(np.median(speeds)) if len(speeds) else float('nan')